@@ -0,0 +1,30 @@
+"""Проверки конфигурации: manage.py check и старт процесса."""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Кеши, данные которых видит только свой процесс.
+PROCESS_LOCAL_CACHES = frozenset((
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+))
+REPLICA_CACHE_MESSAGE = (
+    'DB_REPLICAS задан, а кеш default не общий для процессов: метка '
+    'read-your-writes для токена видна только воркеру, принявшему запись, '
+    'и чтения в других воркерах идут в отстающую реплику.'
+)
+
+
+def shared_cache():
+    """Кеш default общий для процессов (не LocMem/Dummy)."""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches, Tags.database)
+def check_replica_cache(app_configs, **kwargs):
+    if settings.DATABASE_REPLICAS and not shared_cache():
+        return [Warning(
+            REPLICA_CACHE_MESSAGE,
+            hint='Задайте REDIS_URL или запускайте один процесс.',
+            id='api.W001',
+        )]
+    return []
@@ -0,0 +1,478 @@
+"""
+Инвертированный индекс «ингредиент → рецепты» для подбора рецептов
+по имеющимся продуктам.
+
+Рецепты нумеруются плотными индексами. Для редкого ингредиента хранится
+отсортированный массив индексов его рецептов, для частого (больше 1/32
+рецептов: соль, вода) — битовая карта, она компактнее массива. Запрос
+складывает вхождения выбранных ингредиентов в счетчик на рецепт и
+сравнивает его с числом ингредиентов рецепта, так что стоимость зависит от
+длины списков, а не от размера таблицы IngredientInRecipe. Без NumPy
+используются только списки Python.
+
+Индекс живет в памяти процесса и строится до первого запроса (warm_up в
+gunicorn.conf.py). Запись рецепта добавляет строку в журнал RecipeChange в
+своей транзакции. Каждый поиск читает строки журнала после версии индекса
+(наибольшего примененного id) и CATCH_UP_LOOKBACK строк до нее:
+параллельные транзакции фиксируются не по порядку id, и строка с меньшим
+id может появиться позже большей. Строки, которых нет среди примененных,
+применяются, перечитав состав только измененных рецептов, в новый снимок.
+При большом отставании или устаревшем индексе процесс пересобирает его в
+фоне, продолжая отвечать по старому.
+"""
+import bisect
+import heapq
+import logging
+import threading
+import time
+from collections import Counter
+from importlib.util import find_spec
+from itertools import chain
+
+from django.conf import settings
+from django.db import connections
+
+from api import metrics
+from recipes.models import IngredientInRecipe, RecipeChange
+
+# NumPy необязателен и импортируется при первом построении индекса, а не
+# при старте процесса (см. _load_numpy).
+HAS_NUMPY = find_spec('numpy') is not None
+np = None
+
+
+logger = logging.getLogger(__name__)
+
+# Отставание от журнала, которое догоняется по изменениям; больше —
+# полная пересборка. Строки журнала старше этого не нужны и удаляются.
+CATCH_UP_LIMIT = 1000
+# Журнал чистится на каждой PRUNE_EVERY-й записи.
+PRUNE_EVERY = 100
+# Сколько id до версии индекса перечитывается: транзакция, получившая id
+# раньше, но зафиксированная позже, попадает в индекс, если за это время
+# выдано не больше CATCH_UP_LOOKBACK id; иначе — при пересборке по TTL.
+CATCH_UP_LOOKBACK = 100
+# Ингредиент хранится битовой картой, если входит в большую долю рецептов.
+BITMAP_FRACTION = 1 / 32
+# Запас битовых карт под новые рецепты, чтобы не расширять их на каждой
+# записи.
+BITMAP_HEADROOM = 1 / 8
+
+
+def _load_numpy():
+    """Импортирует NumPy; массивы появляются только после построения."""
+    global np
+    if np is None:
+        import numpy
+
+        np = numpy
+
+
+class _State:
+    """
+    Снимок индекса. Опубликованный снимок не меняется: изменения журнала
+    применяются к копии (copy), которая затем заменяет его целиком.
+    """
+
+    def __init__(
+        self, ids, sizes, postings, version, applied, bitmaps=None
+    ):
+        self.ids = ids
+        self.sizes = sizes
+        self.postings = postings
+        self.bitmaps = bitmaps if bitmaps is not None else {}
+        # Наибольший примененный id журнала и примененные id в окне
+        # CATCH_UP_LOOKBACK под ним.
+        self.version = version
+        self.applied = applied
+        self.built_at = time.monotonic()
+        self.size = len(ids)
+
+    def copy(self):
+        """
+        Копия для изменений: массивы рецептов копируются, списки и карты
+        ингредиентов заменяются новыми при изменении (см. CookIndex._apply).
+        """
+        state = _State(
+            self.ids.copy(), self.sizes.copy(), dict(self.postings),
+            self.version, self.applied, dict(self.bitmaps),
+        )
+        state.built_at = self.built_at
+        state.size = self.size
+        return state
+
+
+class CookIndex:
+    """Индекс ингредиентов рецептов с подбором по покрытию."""
+
+    def __init__(self, use_numpy=None):
+        self.use_numpy = HAS_NUMPY if use_numpy is None else use_numpy
+        self._state = None
+        self._lock = threading.RLock()
+        self._rebuilding = False
+
+    # region построение
+    def build(self):
+        """Синхронно пересобирает индекс из IngredientInRecipe."""
+        # Журнал до чтения состава: изменения, попавшие между ними,
+        # применятся повторно, это безопасно.
+        recent = list(
+            RecipeChange.objects.order_by('-id')
+            .values_list('id', flat=True)[:CATCH_UP_LOOKBACK]
+        )
+        version = recent[0] if recent else 0
+        applied = frozenset(recent)
+        pairs = IngredientInRecipe.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator(chunk_size=100000)
+        if self.use_numpy:
+            state = self._build_numpy(pairs, version, applied)
+        else:
+            state = self._build_python(pairs, version, applied)
+        with self._lock:
+            self._state = state
+        return state
+
+    def _build_numpy(self, pairs, version, applied):
+        _load_numpy()
+        flat = np.fromiter(chain.from_iterable(pairs), dtype=np.int64)
+        recipes, ingredients = flat[0::2], flat[1::2]
+        ids = np.unique(recipes)
+        dense = np.searchsorted(ids, recipes).astype(np.int32)
+        sizes = np.bincount(dense, minlength=len(ids)).astype(np.int32)
+        order = np.lexsort((dense, ingredients))
+        ingredients, dense = ingredients[order], dense[order]
+        keys, starts = np.unique(ingredients, return_index=True)
+        bounds = list(starts[1:]) + [len(dense)]
+        capacity = _bitmap_bytes(len(ids))
+        postings, bitmaps = {}, {}
+        for key, start, stop in zip(keys, starts, bounds):
+            posting = dense[start:stop]
+            if len(posting) > len(ids) * BITMAP_FRACTION:
+                bitmap = np.zeros(capacity * 8, dtype=bool)
+                bitmap[posting] = True
+                bitmaps[int(key)] = np.packbits(bitmap)
+            else:
+                postings[int(key)] = posting
+        return _State(ids, sizes, postings, version, applied, bitmaps)
+
+    def _build_python(self, pairs, version, applied):
+        by_recipe = {}
+        for recipe_id, ingredient_id in pairs:
+            by_recipe.setdefault(recipe_id, []).append(ingredient_id)
+        ids = sorted(by_recipe)
+        sizes = [len(by_recipe[recipe_id]) for recipe_id in ids]
+        postings = {}
+        for position, recipe_id in enumerate(ids):
+            for ingredient_id in by_recipe[recipe_id]:
+                postings.setdefault(ingredient_id, []).append(position)
+        return _State(ids, sizes, postings, version, applied)
+
+    def warm_up(self):
+        """Строит индекс заранее; без БД — при первом запросе."""
+        try:
+            self.build()
+        except Exception:
+            logger.exception('Не удалось построить индекс рецептов')
+
+    def _rebuild_in_background(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def rebuild():
+            try:
+                self.build()
+            except Exception:
+                logger.exception('Не удалось пересобрать индекс рецептов')
+            finally:
+                self._rebuilding = False
+                connections.close_all()
+
+        threading.Thread(target=rebuild, daemon=True).start()
+
+    def _current(self):
+        """
+        Текущий снимок, догнавший журнал; при большом отставании или по
+        COOK_INDEX_TTL запускает фоновую пересборку.
+        """
+        state = self._state
+        if state is None:
+            return self.build()
+        caught_up = self._catch_up()
+        state = self._state
+        stale = (
+            not caught_up
+            or time.monotonic() - state.built_at > settings.COOK_INDEX_TTL
+        )
+        metrics.record_cache('cook_index', not stale)
+        if stale:
+            self._rebuild_in_background()
+        return state
+    # endregion
+
+    # region изменения
+    @staticmethod
+    def record_change(recipe_id):
+        """
+        Записывает изменение состава рецепта в журнал; вызывается в
+        транзакции записи рецепта.
+        """
+        change = RecipeChange.objects.create(recipe_id=recipe_id)
+        if change.id % PRUNE_EVERY == 0:
+            RecipeChange.objects.filter(
+                id__lte=change.id - CATCH_UP_LIMIT
+            ).delete()
+
+    @staticmethod
+    def record_changes(recipe_ids):
+        """
+        Журнал массовой загрузки рецептов (seed_demo, generate_dataset).
+        Больше CATCH_UP_LIMIT изменений индекс все равно пересоберет
+        целиком, поэтому пишутся только последние CATCH_UP_LIMIT.
+        """
+        recipe_ids = sorted(heapq.nlargest(CATCH_UP_LIMIT, recipe_ids))
+        if not recipe_ids:
+            return
+        RecipeChange.objects.bulk_create(
+            RecipeChange(recipe_id=recipe_id) for recipe_id in recipe_ids
+        )
+        RecipeChange.objects.filter(
+            id__lte=RecipeChange.current_version() - CATCH_UP_LIMIT
+        ).delete()
+
+    def _catch_up(self):
+        """
+        Применяет к снимку непримененные строки журнала. False — снимок
+        не догнать (отстал больше CATCH_UP_LIMIT или нарушен порядок id
+        рецептов), нужна пересборка.
+        """
+        with self._lock:
+            state = self._state
+            if state.version < 0:
+                return False
+            changes = list(
+                RecipeChange.objects.filter(
+                    id__gt=state.version - CATCH_UP_LOOKBACK
+                ).order_by('id')
+                .values_list('id', 'recipe_id')[:CATCH_UP_LIMIT]
+            )
+            recipe_ids = {
+                recipe_id for change_id, recipe_id in changes
+                if change_id not in state.applied
+            }
+            if not recipe_ids:
+                return True
+            if len(changes) == CATCH_UP_LIMIT:
+                return False
+            compositions = {recipe_id: set() for recipe_id in recipe_ids}
+            for recipe_id, ingredient_id in (
+                IngredientInRecipe.objects.filter(recipe_id__in=recipe_ids)
+                .values_list('recipe_id', 'ingredient_id')
+            ):
+                compositions[recipe_id].add(ingredient_id)
+            updated = state.copy()
+            # Новые рецепты добавляются в конец по возрастанию id.
+            for recipe_id in sorted(compositions):
+                if not self._apply(
+                    updated, recipe_id, compositions[recipe_id]
+                ):
+                    # Поиски, которые ждут блокировки, не повторяют
+                    # догонку до пересборки.
+                    state.version = -1
+                    return False
+            updated.version = max(state.version, changes[-1][0])
+            updated.applied = frozenset(
+                change_id for change_id, _ in changes
+                if change_id > updated.version - CATCH_UP_LOOKBACK
+            )
+            self._state = updated
+            return True
+
+    def _apply(self, state, recipe_id, ingredient_ids):
+        """
+        Новый состав рецепта в копии снимка; измененные списки и карты
+        заменяются новыми. False — нужна пересборка.
+        """
+        size = state.size
+        position = self._position(state, recipe_id, bool(ingredient_ids))
+        if position is None:
+            return state.version >= 0
+        if position < size:
+            # Старый состав не хранится: ищем рецепт во всех списках.
+            for ingredient_id, posting in list(state.postings.items()):
+                if ingredient_id in ingredient_ids:
+                    continue
+                updated = self._discard(posting, position)
+                if updated is not None:
+                    state.postings[ingredient_id] = updated
+            for ingredient_id, bitmap in list(state.bitmaps.items()):
+                if ingredient_id not in ingredient_ids:
+                    state.bitmaps[ingredient_id] = _set_bit(
+                        bitmap, position, False
+                    )
+        for ingredient_id in ingredient_ids:
+            bitmap = state.bitmaps.get(ingredient_id)
+            if bitmap is not None:
+                state.bitmaps[ingredient_id] = _set_bit(
+                    bitmap, position, True
+                )
+                continue
+            posting = state.postings.get(ingredient_id)
+            state.postings[ingredient_id] = self._insert(posting, position)
+        state.sizes[position] = len(ingredient_ids)
+        return True
+
+    def _position(self, state, recipe_id, create):
+        """Плотный индекс рецепта; новый рецепт добавляется в конец."""
+        if self.use_numpy:
+            position = int(np.searchsorted(state.ids, recipe_id))
+        else:
+            position = bisect.bisect_left(state.ids, recipe_id)
+        if position < state.size and state.ids[position] == recipe_id:
+            return position
+        if not create:
+            return None
+        if position != state.size:
+            # id меньше последнего (параллельные транзакции): порядок
+            # нарушился бы — оставляем до полной пересборки.
+            state.version = -1
+            return None
+        if self.use_numpy:
+            state.ids = np.append(state.ids, recipe_id)
+            state.sizes = np.append(state.sizes, np.int32(0))
+            capacity = _bitmap_bytes(position + 1)
+            for ingredient_id, bitmap in list(state.bitmaps.items()):
+                if len(bitmap) * 8 <= position:
+                    state.bitmaps[ingredient_id] = np.concatenate((
+                        bitmap,
+                        np.zeros(capacity - len(bitmap), dtype=np.uint8),
+                    ))
+        else:
+            state.ids.append(recipe_id)
+            state.sizes.append(0)
+        state.size += 1
+        return position
+
+    def _insert(self, posting, position):
+        if self.use_numpy:
+            if posting is None:
+                return np.array([position], dtype=np.int32)
+            index = np.searchsorted(posting, position)
+            if index < len(posting) and posting[index] == position:
+                return posting
+            return np.insert(posting, index, position)
+        posting = list(posting or ())
+        index = bisect.bisect_left(posting, position)
+        if index == len(posting) or posting[index] != position:
+            posting.insert(index, position)
+        return posting
+
+    def _discard(self, posting, position):
+        """Новый список без position или None, если его там не было."""
+        if self.use_numpy:
+            index = np.searchsorted(posting, position)
+            if index < len(posting) and posting[index] == position:
+                return np.delete(posting, index)
+            return None
+        index = bisect.bisect_left(posting, position)
+        if index < len(posting) and posting[index] == position:
+            return posting[:index] + posting[index + 1:]
+        return None
+    # endregion
+
+    def search(self, ingredient_ids, max_missing=0, limit=20):
+        """
+        Рецепты, где есть хотя бы один из ingredient_ids и не хватает не
+        больше max_missing ингредиентов. Возвращает (всего, список
+        (recipe_id, недостает, совпало)) по возрастанию недостающих.
+        """
+        state = self._current()
+        ingredient_ids = set(ingredient_ids)
+        postings = [
+            state.postings[ingredient_id]
+            for ingredient_id in ingredient_ids
+            if ingredient_id in state.postings
+        ]
+        bitmaps = [
+            state.bitmaps[ingredient_id]
+            for ingredient_id in ingredient_ids
+            if ingredient_id in state.bitmaps
+        ]
+        if not postings and not bitmaps:
+            return 0, []
+        if self.use_numpy:
+            return self._search_numpy(
+                state, postings, bitmaps, max_missing, limit
+            )
+        return self._search_python(state, postings, max_missing, limit)
+
+    def _search_numpy(self, state, postings, bitmaps, max_missing, limit):
+        # Индексы в одном списке не повторяются, поэтому hits[p] += 1
+        # корректно; счетчик uint8 хватает на COOK_MAX_INGREDIENTS.
+        size = state.size
+        hits = np.zeros(size, dtype=np.uint8)
+        for bitmap in bitmaps:
+            hits += np.unpackbits(bitmap, count=size)
+        for posting in postings:
+            hits[posting] += 1
+        # Маска по всему массиву дешевле выборок по кандидатам.
+        missing = state.sizes[:size] - hits
+        candidates = np.flatnonzero((hits > 0) & (missing <= max_missing))
+        have = hits[candidates].astype(np.int32)
+        missing = missing[candidates]
+        total = len(candidates)
+        # Порядок: меньше недостающих, больше совпавших, новее рецепт (больше
+        # позиция). Ключ однозначен, поэтому argpartition не зависит от
+        # порядка равных.
+        key = (
+            (missing.astype(np.int64) << 40)
+            + ((255 - have.astype(np.int64)) << 32)
+            + (0xFFFFFFFF - candidates)
+        )
+        if total > limit:
+            best = np.argpartition(key, limit - 1)[:limit]
+            candidates, have, missing, key = (
+                candidates[best], have[best], missing[best], key[best]
+            )
+        order = np.argsort(key)
+        return total, list(zip(
+            state.ids[candidates[order]].tolist(),
+            missing[order].tolist(),
+            have[order].tolist(),
+        ))
+
+    def _search_python(self, state, postings, max_missing, limit):
+        hits = Counter(chain.from_iterable(postings))
+        ranked = []
+        for position, have in hits.items():
+            missing = state.sizes[position] - have
+            if state.sizes[position] and missing <= max_missing:
+                ranked.append((missing, -have, -state.ids[position]))
+        best = sorted(ranked)[:limit]
+        return len(ranked), [
+            (-recipe_id, missing, -have) for missing, have, recipe_id in best
+        ]
+
+
+def _set_bit(bitmap, position, value):
+    """Карта с битом position, равным value; копия, только если он другой."""
+    mask = np.uint8(0x80 >> (position & 7))
+    byte = position >> 3
+    if bool(bitmap[byte] & mask) == value:
+        return bitmap
+    bitmap = bitmap.copy()
+    if value:
+        bitmap[byte] |= mask
+    else:
+        bitmap[byte] &= ~mask
+    return bitmap
+
+
+def _bitmap_bytes(size):
+    """Размер битовой карты в байтах с запасом под новые рецепты."""
+    return (int(size * (1 + BITMAP_HEADROOM)) + 8) // 8
+
+
+cook_index = CookIndex()
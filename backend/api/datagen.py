@@ -0,0 +1,314 @@
+"""
+Генератор крупного синтетического набора данных для планирования мощностей.
+
+Ингредиенты берутся из реального каталога data/ingredients.csv, их
+популярность распределена по закону Ципфа; авторы, активность пользователей
+и граф подписок подчиняются степенному закону. Результат детерминирован
+для заданного seed.
+"""
+import csv
+import os
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from api.cook_index import cook_index
+from foodgram_backend.bulk import ChunkWriter, reset_sequences
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientInRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag
+)
+from users.models import Subscription, User
+
+
+DEFAULT_TAGS = (
+    ('Завтрак', 'breakfast'),
+    ('Обед', 'lunch'),
+    ('Ужин', 'dinner'),
+)
+DISHES = (
+    'Салат', 'Суп', 'Рагу', 'Запеканка', 'Паста', 'Омлет', 'Пирог',
+    'Каша', 'Плов', 'Сэндвич', 'Смузи', 'Гратен', 'Ризотто', 'Котлеты',
+)
+TEXTS = (
+    'Подготовьте ингредиенты, смешайте и доведите до готовности.',
+    'Обжарьте основу, добавьте остальные продукты и тушите под крышкой.',
+    'Запекайте в разогретой духовке до золотистой корочки.',
+    'Отварите, остудите и подавайте со свежей зеленью.',
+)
+PLACEHOLDER_IMAGE = 'recipes/images/placeholder.png'
+DEFAULT_PASSWORD = 'Generated-Password-123'
+
+
+def zipf_cum_weights(size, exponent):
+    """Кумулятивные веса распределения Ципфа для рангов 1..size."""
+    total = 0.0
+    weights = []
+    for rank in range(1, size + 1):
+        total += rank ** -exponent
+        weights.append(total)
+    return weights
+
+
+def read_ingredient_catalog(data_dir):
+    """Читает пары (название, единица измерения) из ingredients.csv."""
+    path = os.path.join(data_dir, 'ingredients.csv')
+    with open(path, encoding='utf-8') as csvfile:
+        for row in csv.reader(csvfile):
+            if len(row) < 2:
+                continue
+            name, unit = row[0].strip(), row[1].strip()
+            if name and unit:
+                yield name, unit
+
+
+class DatasetGenerator:
+    """Генерирует пользователей, рецепты, избранное, корзины и подписки."""
+
+    def __init__(
+        self,
+        *,
+        users,
+        recipes,
+        favorites,
+        cart_items,
+        subscriptions,
+        tags=len(DEFAULT_TAGS),
+        ingredients_per_recipe=8,
+        zipf_exponent=1.1,
+        seed=42,
+        chunk_size=10000,
+        use_copy=None,
+        days=365,
+        username_prefix=None,
+        email_domain='generated.example.org',
+        data_dir=None,
+        progress=None,
+    ):
+        self.users = users
+        self.recipes = recipes
+        self.favorites = favorites
+        self.cart_items = cart_items
+        self.subscriptions = subscriptions
+        self.tags = tags
+        self.ingredients_per_recipe = ingredients_per_recipe
+        self.zipf_exponent = zipf_exponent
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.use_copy = use_copy
+        self.days = days
+        self.username_prefix = username_prefix or f'gen{seed}_'
+        self.email_domain = email_domain
+        self.data_dir = data_dir or os.path.abspath(
+            os.path.join(settings.BASE_DIR, '..', 'data')
+        )
+        self.progress = progress or (lambda message: None)
+        self.rng = random.Random(seed)
+        self.now = timezone.now()
+
+    def exists(self):
+        return User.objects.filter(
+            username__startswith=self.username_prefix
+        ).exists()
+
+    def run(self):
+        """Создает набор данных и возвращает количество записанных строк."""
+        ingredient_ids = self._ensure_ingredients()
+        tag_ids = self._ensure_tags()
+        user_ids = self._write_users()
+        recipe_ids = self._write_recipes(user_ids, ingredient_ids, tag_ids)
+        counts = {
+            'users': len(user_ids),
+            'recipes': len(recipe_ids),
+            'favorites': self._write_relations(
+                Favorite, user_ids, recipe_ids, self.favorites
+            ),
+            'shopping_cart': self._write_relations(
+                ShoppingCart, user_ids, recipe_ids, self.cart_items
+            ),
+            'subscriptions': self._write_subscriptions(user_ids),
+        }
+        return counts
+
+    def _writer(self, model, fields):
+        return ChunkWriter(
+            model, fields, chunk_size=self.chunk_size, use_copy=self.use_copy
+        )
+
+    def _report(self, label, done, total):
+        if done == total or done % (self.chunk_size * 10) == 0:
+            self.progress(f'{label}: {done}/{total}')
+
+    def _popularity(self, ids):
+        """Случайно ранжирует id и возвращает их вместе с весами Ципфа."""
+        ranked = list(ids)
+        self.rng.shuffle(ranked)
+        return ranked, zipf_cum_weights(len(ranked), self.zipf_exponent)
+
+    @staticmethod
+    def _sample_limit(size):
+        """
+        Ограничивает выборку без повторов половиной популяции: иначе
+        добор редких элементов хвоста Ципфа занимает слишком много попыток.
+        """
+        return max(size // 2, min(size, 1))
+
+    def _distribute(self, total, size):
+        """Распределяет total событий по size участникам по закону Ципфа."""
+        counts = [0] * size
+        ranks, weights = self._popularity(range(size))
+        for index in self.rng.choices(ranks, cum_weights=weights, k=total):
+            counts[index] += 1
+        return counts
+
+    def _ensure_ingredients(self):
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in read_ingredient_catalog(self.data_dir)
+            ),
+            batch_size=self.chunk_size,
+            ignore_conflicts=True,
+        )
+        return list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+
+    def _ensure_tags(self):
+        extra = [
+            (f'Тег {number}', f'tag-{number}')
+            for number in range(len(DEFAULT_TAGS) + 1, self.tags + 1)
+        ]
+        for name, slug in (*DEFAULT_TAGS, *extra):
+            Tag.objects.get_or_create(slug=slug, defaults={'name': name})
+        return list(Tag.objects.order_by('id').values_list('id', flat=True))
+
+    @transaction.atomic
+    def _write_users(self):
+        start = (User.objects.aggregate(top=Max('id'))['top'] or 0) + 1
+        password = make_password(DEFAULT_PASSWORD)
+        writer = self._writer(User, (
+            'id', 'password', 'is_superuser', 'username', 'first_name',
+            'last_name', 'email', 'is_staff', 'is_active', 'date_joined',
+            'avatar',
+        ))
+        for offset in range(self.users):
+            username = f'{self.username_prefix}{offset:07d}'
+            writer.add((
+                start + offset, password, False, username, 'Имя',
+                f'Фамилия {offset}', f'{username}@{self.email_domain}',
+                False, True, self.now, '',
+            ))
+            self._report('users', offset + 1, self.users)
+        writer.flush()
+        reset_sequences(User)
+        return list(range(start, start + self.users))
+
+    @transaction.atomic
+    def _write_recipes(self, user_ids, ingredient_ids, tag_ids):
+        start = (Recipe.objects.aggregate(top=Max('id'))['top'] or 0) + 1
+        authors, author_weights = self._popularity(user_ids)
+        ingredients, ingredient_weights = self._popularity(ingredient_ids)
+        names = dict(Ingredient.objects.values_list('id', 'name'))
+        recipe_writer = self._writer(Recipe, (
+            'id', 'author', 'name', 'image', 'text', 'created_at',
+            'cooking_time',
+        ))
+        amount_writer = self._writer(
+            IngredientInRecipe, ('recipe', 'ingredient', 'amount')
+        )
+        tag_writer = self._writer(Recipe.tags.through, ('recipe', 'tag'))
+        rng = self.rng
+        recipe_authors = rng.choices(
+            authors, cum_weights=author_weights, k=self.recipes
+        )
+        for offset, author_id in enumerate(recipe_authors):
+            recipe_id = start + offset
+            size = max(1, min(
+                int(rng.gauss(self.ingredients_per_recipe, 3)),
+                self._sample_limit(len(ingredients)),
+            ))
+            chosen = set()
+            while len(chosen) < size:
+                chosen.update(rng.choices(
+                    ingredients,
+                    cum_weights=ingredient_weights,
+                    k=size - len(chosen),
+                ))
+            main = names[next(iter(chosen))]
+            recipe_writer.add((
+                recipe_id, author_id,
+                f'{rng.choice(DISHES)}: {main} №{recipe_id}',
+                PLACEHOLDER_IMAGE, rng.choice(TEXTS),
+                self.now - timedelta(seconds=rng.randint(
+                    0, self.days * 86400
+                )),
+                rng.randint(5, 180),
+            ))
+            for ingredient_id in chosen:
+                amount_writer.add(
+                    (recipe_id, ingredient_id, rng.randint(1, 500))
+                )
+            for tag_id in rng.sample(tag_ids, rng.randint(1, 2)):
+                tag_writer.add((recipe_id, tag_id))
+            self._report('recipes', offset + 1, self.recipes)
+        for writer in (recipe_writer, amount_writer, tag_writer):
+            writer.flush()
+        reset_sequences(Recipe)
+        # Подбор по продуктам узнает о новых рецептах из журнала.
+        cook_index.record_changes(range(start, start + self.recipes))
+        return range(start, start + self.recipes)
+
+    @transaction.atomic
+    def _write_relations(self, model, user_ids, recipe_ids, total):
+        if not recipe_ids:
+            return 0
+        recipes, weights = self._popularity(recipe_ids)
+        writer = self._writer(model, ('user', 'recipe'))
+        per_user = self._distribute(total, len(user_ids))
+        label = model._meta.model_name
+        for index, (user_id, count) in enumerate(zip(user_ids, per_user)):
+            count = min(count, self._sample_limit(len(recipes)))
+            chosen = set()
+            while len(chosen) < count:
+                chosen.update(self.rng.choices(
+                    recipes, cum_weights=weights, k=count - len(chosen)
+                ))
+            for recipe_id in chosen:
+                writer.add((user_id, recipe_id))
+            self._report(label, index + 1, len(user_ids))
+        writer.flush()
+        return writer.written
+
+    @transaction.atomic
+    def _write_subscriptions(self, user_ids):
+        if len(user_ids) < 2:
+            return 0
+        authors, weights = self._popularity(user_ids)
+        writer = self._writer(Subscription, ('user', 'author'))
+        per_user = self._distribute(self.subscriptions, len(user_ids))
+        for index, (user_id, count) in enumerate(zip(user_ids, per_user)):
+            count = min(count, self._sample_limit(len(authors) - 1))
+            chosen = set()
+            while len(chosen) < count:
+                chosen.update(
+                    author_id
+                    for author_id in self.rng.choices(
+                        authors, cum_weights=weights, k=count - len(chosen)
+                    )
+                    if author_id != user_id
+                )
+            for author_id in chosen:
+                writer.add((user_id, author_id))
+            self._report('subscriptions', index + 1, len(user_ids))
+        writer.flush()
+        return writer.written
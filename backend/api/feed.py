@@ -0,0 +1,224 @@
+"""
+Лента рецептов авторов, на которых подписан пользователь.
+
+Гибридная схема: новый рецепт раскладывается во входящие (FeedEntry)
+всем подписчикам автора, если их не больше FEED_FANOUT_LIMIT. Рецепты
+авторов с бо́льшим числом подписчиков («популярных») во входящие не
+пишутся, а подмешиваются при чтении. Обе выборки идут по ключу
+(created_at, id) и сливаются, поэтому страница ленты стоит несколько
+индексных запросов независимо от числа подписок. Автор, опустившийся до
+FEED_FANOUT_LIMIT подписчиков, снова раскладывается при записи, а его
+последние рецепты дописываются во входящие всех подписчиков
+(backfill_author): иначе рецепты, вышедшие, пока он был популярным,
+пропали бы из лент.
+"""
+import heapq
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from api import metrics
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription
+
+
+CELEBRITIES_CACHE_KEY = 'feed:celebrities'
+
+
+def celebrity_author_ids():
+    """Авторы, у которых подписчиков больше FEED_FANOUT_LIMIT (с кешем)."""
+    authors = cache.get(CELEBRITIES_CACHE_KEY)
+    metrics.record_cache('feed_celebrities', authors is not None)
+    if authors is None:
+        authors = frozenset(
+            Subscription.objects.values('author_id')
+            .annotate(subscribers=Count('id'))
+            .filter(subscribers__gt=settings.FEED_FANOUT_LIMIT)
+            .values_list('author_id', flat=True)
+        )
+        cache.set(
+            CELEBRITIES_CACHE_KEY, authors, settings.FEED_CELEBRITIES_TTL
+        )
+    return authors
+
+
+def fan_out_recipe(recipe):
+    """Кладет новый рецепт во входящие подписчиков автора."""
+    if recipe.author_id in celebrity_author_ids():
+        return 0
+    subscribers = Subscription.objects.filter(
+        author_id=recipe.author_id
+    ).values_list('user_id', flat=True)
+    entries = [
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe.id,
+            author_id=recipe.author_id,
+            created_at=recipe.created_at,
+        )
+        for user_id in subscribers
+    ]
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(entries)
+
+
+def backfill_subscription(user_id, author_id):
+    """Добавляет во входящие последние рецепты нового автора."""
+    if author_id in celebrity_author_ids():
+        return 0
+    recipes = Recipe.objects.filter(author_id=author_id).order_by(
+        '-created_at', '-id'
+    ).values_list('id', 'created_at')[:settings.FEED_BACKFILL_SIZE]
+    entries = [
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            created_at=created_at,
+        )
+        for recipe_id, created_at in recipes
+    ]
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    return len(entries)
+
+
+def backfill_author(author_id):
+    """Добавляет последние рецепты автора во входящие всех подписчиков."""
+    recipes = list(
+        Recipe.objects.filter(author_id=author_id).order_by(
+            '-created_at', '-id'
+        ).values_list('id', 'created_at')[:settings.FEED_BACKFILL_SIZE]
+    )
+    entries = [
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            created_at=created_at,
+        )
+        for user_id in Subscription.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True).iterator()
+        for recipe_id, created_at in recipes
+    ]
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=1000, ignore_conflicts=True
+    )
+    return len(entries)
+
+
+def left_celebrities(author_id):
+    """
+    Перестал ли автор быть популярным: после отписки у него ровно
+    FEED_FANOUT_LIMIT подписчиков, а до нее было больше. Массовое
+    удаление пользователей может перескочить эту границу — тогда ленты
+    восстанавливает manage.py rebuild_feed.
+    """
+    limit = settings.FEED_FANOUT_LIMIT
+    if limit <= 0:
+        return False
+    # Счет ограничен границей: у популярного автора подписчиков много.
+    edge = Subscription.objects.filter(author_id=author_id).values_list(
+        'id', flat=True
+    )[limit - 1:limit + 1]
+    return len(edge) == 1
+
+
+def remove_subscription(user_id, author_id):
+    """
+    Убирает из входящих рецепты автора после отписки; если автор
+    перестал быть популярным, раскладывает его рецепты подписчикам.
+    """
+    removed = FeedEntry.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).delete()[0]
+    if left_celebrities(author_id):
+        cache.delete(CELEBRITIES_CACHE_KEY)
+        backfill_author(author_id)
+    return removed
+
+
+def _after(cursor, created_field, id_field):
+    """Условие «строго после курсора» для сортировки по убыванию."""
+    if cursor is None:
+        return Q()
+    created_at, pk = cursor
+    return Q(**{f'{created_field}__lt': created_at}) | Q(
+        **{created_field: created_at, f'{id_field}__lt': pk}
+    )
+
+
+def feed_keys(user, cursor=None, limit=10):
+    """
+    Возвращает до limit ключей (created_at, recipe_id) ленты после cursor
+    в порядке убывания.
+    """
+    inbox = FeedEntry.objects.filter(
+        _after(cursor, 'created_at', 'recipe_id'), user=user
+    ).order_by('-created_at', '-recipe_id').values_list(
+        'created_at', 'recipe_id'
+    )[:limit]
+    sources = [list(inbox)]
+
+    celebrities = celebrity_author_ids()
+    if celebrities:
+        followed = Subscription.objects.filter(
+            user=user, author_id__in=celebrities
+        ).values_list('author_id', flat=True)
+        sources.append(list(
+            Recipe.objects.filter(
+                _after(cursor, 'created_at', 'id'), author_id__in=followed
+            ).order_by('-created_at', '-id').values_list(
+                'created_at', 'id'
+            )[:limit]
+        ))
+
+    keys = []
+    seen = set()
+    for key in heapq.merge(*sources, reverse=True):
+        # Рецепт автора, ставшего популярным, может быть в обеих выборках.
+        if key[1] in seen:
+            continue
+        seen.add(key[1])
+        keys.append(key)
+        if len(keys) == limit:
+            break
+    return keys
+
+
+@transaction.atomic
+def rebuild_inboxes():
+    """
+    Пересобирает все входящие одним INSERT ... SELECT — для данных,
+    загруженных массовой вставкой в обход сигналов.
+    """
+    FeedEntry.objects.all().delete()
+    cache.delete(CELEBRITIES_CACHE_KEY)
+    celebrities = celebrity_author_ids()
+    quote = connection.ops.quote_name
+    subscriptions = Subscription._meta.db_table
+    recipes = Recipe._meta.db_table
+    exclude = ''
+    params = []
+    if celebrities:
+        exclude = (
+            f'WHERE s.{quote("author_id")} NOT IN '
+            f'({", ".join(["%s"] * len(celebrities))})'
+        )
+        params = list(celebrities)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(FeedEntry._meta.db_table)} '
+            f'({quote("user_id")}, {quote("recipe_id")}, '
+            f'{quote("author_id")}, {quote("created_at")}) '
+            f'SELECT s.{quote("user_id")}, r.{quote("id")}, '
+            f'r.{quote("author_id")}, r.{quote("created_at")} '
+            f'FROM {quote(subscriptions)} s '
+            f'JOIN {quote(recipes)} r '
+            f'ON r.{quote("author_id")} = s.{quote("author_id")} '
+            f'{exclude}',
+            params,
+        )
+        return cursor.rowcount
@@ -0,0 +1,168 @@
+"""Статистика запросов к БД и времени ответа по эндпоинтам API."""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.db import connections
+
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS_BYTES = (
+    512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304
+)
+
+
+class QueryCounter:
+    """Обертка execute_wrapper: считает запросы и время, проведенное в БД."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._stack.__exit__(*exc_info)
+
+    @property
+    def duration_ms(self):
+        return self.duration * 1000
+
+
+class Histogram:
+    """Гистограмма с фиксированными верхними границами корзин."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Оценивает квантиль по верхней границе корзины."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bound, round(self.max, 2))
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'avg': round(self.total / self.count, 2) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': round(self.max, 2),
+            'buckets': dict(zip(
+                [str(bound) for bound in self.buckets] + ['+Inf'],
+                self.counts,
+            )),
+        }
+
+
+class EndpointStats:
+    """Набор гистограмм для одного эндпоинта (view + action)."""
+
+    def __init__(self):
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.serialize_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.total_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.size_bytes = Histogram(SIZE_BUCKETS_BYTES)
+        self.budget_violations = 0
+
+    def as_dict(self):
+        return {
+            'queries': self.queries.as_dict(),
+            'db_ms': self.db_ms.as_dict(),
+            'serialize_ms': self.serialize_ms.as_dict(),
+            'total_ms': self.total_ms.as_dict(),
+            'size_bytes': self.size_bytes.as_dict(),
+            'budget_violations': self.budget_violations,
+        }
+
+
+class StatsRegistry:
+    """Потокобезопасное хранилище статистики текущего процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, *, queries, db_ms, serialize_ms, total_ms,
+               size_bytes, violated=False):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+            stats.queries.observe(queries)
+            stats.db_ms.observe(db_ms)
+            stats.serialize_ms.observe(serialize_ms)
+            stats.total_ms.observe(total_ms)
+            if size_bytes is not None:
+                stats.size_bytes.observe(size_bytes)
+            if violated:
+                stats.budget_violations += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: stats.as_dict()
+                for endpoint, stats in sorted(self._endpoints.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+registry = StatsRegistry()
+
+
+def resolve_endpoint(request, view_func):
+    """Возвращает имя эндпоинта: basename.action для DRF, иначе view_name."""
+    actions = getattr(view_func, 'actions', None)
+    initkwargs = getattr(view_func, 'initkwargs', None) or {}
+    basename = initkwargs.get('basename')
+    if actions and basename:
+        action = actions.get(request.method.lower(), request.method.lower())
+        return f'{basename}.{action}'
+    match = getattr(request, 'resolver_match', None)
+    if match and match.view_name:
+        return match.view_name
+    return getattr(view_func, '__name__', 'unknown')
+
+
+def check_budget(budget, *, queries, db_ms, total_ms):
+    """Возвращает список превышенных лимитов бюджета эндпоинта."""
+    measured = {'queries': queries, 'db_ms': db_ms, 'total_ms': total_ms}
+    return [
+        f'{name}={round(value, 2)} > {budget[name]}'
+        for name, value in measured.items()
+        if budget.get(name) is not None and value > budget[name]
+    ]
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from api.recommendations import SimilarityBuilder
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие рецепты (top-K соседей) по совместному\n'
+        'добавлению в избранное/список покупок и общим ингредиентам.\n'
+        'Запускается по расписанию: python manage.py build_recommendations'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=20)
+        parser.add_argument(
+            '--alpha', type=float, default=0.7,
+            help='Доля коллаборативной близости против ингредиентной.',
+        )
+        parser.add_argument(
+            '--block-size', type=int, default=2000,
+            help='Сколько рецептов обрабатывать за одно умножение матриц.',
+        )
+        parser.add_argument(
+            '--max-df', type=float, default=0.05,
+            help='Игнорировать ингредиенты, входящие в большую долю рецептов.',
+        )
+        parser.add_argument(
+            '--max-user-items', type=int, default=500,
+            help='Игнорировать пользователей с большим числом рецептов.',
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options['alpha'] <= 1:
+            raise CommandError('--alpha должен быть в диапазоне [0, 1].')
+        builder = SimilarityBuilder(
+            top_k=options['top_k'],
+            alpha=options['alpha'],
+            block_size=options['block_size'],
+            max_df=options['max_df'],
+            max_user_items=options['max_user_items'],
+            progress=self.stdout.write,
+        )
+        started = time.monotonic()
+        written = builder.run()
+        self.stdout.write(self.style.SUCCESS(
+            f'Похожие рецепты пересчитаны за '
+            f'{time.monotonic() - started:.1f} с, записей: {written}'
+        ))
@@ -0,0 +1,216 @@
+import json
+import re
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+
+HOT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?author={author}',
+    '/api/recipes/?tags={tag}',
+    '/api/recipes/?is_favorited=1',
+    '/api/recipes/?is_in_shopping_cart=1',
+    '/api/recipes/{recipe}/',
+    '/api/recipes/feed/',
+    '/api/ingredients/?name={prefix}',
+    '/api/users/subscriptions/',
+    '/api/recipes/download_shopping_cart/',
+)
+# Индексы миграции 0007, которые должны быть в планах пути (по СУБД);
+# их пропажа из плана — такая же ошибка, как последовательное чтение.
+# На PostgreSQL индекс тег → рецепт выигрывает у индекса внешнего ключа
+# только как чтение одного индекса, то есть после VACUUM.
+EXPECTED_INDEXES = {
+    '/api/recipes/?author={author}': {
+        'sqlite': ('recipe_author_created_idx',),
+        'postgresql': ('recipe_author_created_idx',),
+    },
+    '/api/recipes/?tags={tag}': {
+        'sqlite': ('recipe_tags_tag_recipe_idx',),
+        'postgresql': ('recipe_tags_tag_recipe_idx',),
+    },
+}
+# COUNT(*) всей таблицы для пагинации читает ее целиком при любом плане.
+FULL_COUNT_RE = re.compile(r'^SELECT COUNT\(\*\) AS "__count" FROM "\w+"$')
+SQLITE_SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+# Псевдонимы подзапросов Django: FROM "recipes_favorite" U0.
+ALIAS_RE = re.compile(r'"(\w+)" (U\d+)\b')
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет горячие запросы API и проверяет планы (EXPLAIN) всех\n'
+        'выполненных SELECT: последовательное чтение таблицы больше\n'
+        '--min-rows строк считается ошибкой. Запускайте на синтетическом\n'
+        'наборе (generate_dataset) после VACUUM ANALYZE. Для путей по\n'
+        'умолчанию проверяется и то, что в планах есть индексы из\n'
+        'EXPECTED_INDEXES.\n'
+        'Запуск: python manage.py check_query_plans --user admin@example.org'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Путь запроса (можно указать несколько раз).',
+        )
+        parser.add_argument(
+            '--user',
+            help='Email пользователя (по умолчанию — первый пользователь).',
+        )
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=10000,
+            help='Таблицы меньше этого размера можно читать целиком.',
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Вывести SQL и план каждого запроса.',
+        )
+
+    def handle(self, *args, **options):
+        user = self._user(options['user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        headers = {
+            'HTTP_HOST': 'localhost',
+            'HTTP_AUTHORIZATION': f'Token {token.key}',
+        }
+        if options['paths']:
+            paths = [(path, ()) for path in options['paths']]
+        else:
+            samples = self._samples()
+            paths = [
+                (
+                    template.format(**samples),
+                    EXPECTED_INDEXES.get(template, {}).get(
+                        connection.vendor, ()
+                    ),
+                )
+                for template in HOT_PATHS
+            ]
+        self._rows = {}
+        client = Client(raise_request_exception=False)
+        problems = []
+        for path, expected in paths:
+            with override_settings(QUERY_BUDGET_RAISE=False):
+                with CaptureQueriesContext(connection) as captured:
+                    client.get(path, **headers)
+            selects = [
+                query['sql'] for query in captured.captured_queries
+                if query['sql'].lstrip().upper().startswith('SELECT')
+            ]
+            scans = []
+            plans = []
+            for sql in selects:
+                plan, tables = self._explain(sql)
+                plans.append(plan)
+                if options['verbose_plans']:
+                    self.stdout.write(f'{sql}\n{plan}\n')
+                large = [
+                    table for table in tables
+                    if self._table_rows(table) >= options['min_rows']
+                ]
+                if large and not FULL_COUNT_RE.match(sql):
+                    scans.append((sql, large))
+            missing = [
+                index for index in expected
+                if not any(index in plan for plan in plans)
+            ]
+            if scans:
+                status = self.style.ERROR('SEQ SCAN')
+            elif missing:
+                status = self.style.ERROR('NO INDEX')
+            else:
+                status = self.style.SUCCESS('ok')
+            self.stdout.write(f'{path:<45} {len(selects):>3} SELECT  {status}')
+            for sql, tables in scans:
+                self.stdout.write(f'    {", ".join(tables)}: {sql[:300]}')
+            for index in missing:
+                self.stdout.write(f'    индекс {index} не используется')
+            problems.extend(scans)
+            problems.extend(missing)
+        if problems:
+            raise CommandError(
+                f'Проблем в планах запросов: {len(problems)} '
+                '(последовательное чтение или неиспользуемый индекс).'
+            )
+
+    def _user(self, email):
+        if email:
+            try:
+                return User.objects.get(email=email)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь {email} не найден.')
+        user = User.objects.order_by('id').first()
+        if user is None:
+            raise CommandError('В базе нет пользователей.')
+        return user
+
+    def _samples(self):
+        """Значения параметров для путей: реальные id из базы."""
+        recipe = Recipe.objects.order_by('-id').values(
+            'id', 'author_id'
+        ).first() or {'id': 0, 'author_id': 0}
+        tag = Tag.objects.values_list('slug', flat=True).first() or ''
+        name = Ingredient.objects.values_list('name', flat=True).first()
+        return {
+            'recipe': recipe['id'],
+            'author': recipe['author_id'],
+            'tag': tag,
+            'prefix': (name or 'а')[:2],
+        }
+
+    def _explain(self, sql):
+        """План запроса и таблицы, которые он читает целиком."""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return json.dumps(plan, indent=1), sorted(
+                    set(self._pg_seq_scans(plan[0]['Plan']))
+                )
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            details = [row[-1] for row in cursor.fetchall()]
+        tables = set(connection.introspection.table_names())
+        aliases = {alias: table for table, alias in ALIAS_RE.findall(sql)}
+        scanned = {
+            aliases.get(match[1], match[1])
+            for match in map(SQLITE_SCAN_RE.match, details) if match
+        } & tables
+        return '\n'.join(details), sorted(scanned)
+
+    def _pg_seq_scans(self, node):
+        if node['Node Type'] == 'Seq Scan':
+            yield node['Relation Name']
+        for child in node.get('Plans', ()):
+            yield from self._pg_seq_scans(child)
+
+    def _table_rows(self, table):
+        if table not in self._rows:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    # Оценка планировщика: COUNT(*) по большим таблицам долог.
+                    cursor.execute(
+                        'SELECT reltuples FROM pg_class WHERE relname = %s',
+                        [table],
+                    )
+                else:
+                    cursor.execute(
+                        f'SELECT COUNT(*) FROM '
+                        f'{connection.ops.quote_name(table)}'
+                    )
+                row = cursor.fetchone()
+            self._rows[table] = int(row[0]) if row else 0
+        return self._rows[table]
@@ -0,0 +1,119 @@
+import os
+import posixpath
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management import BaseCommand
+
+from foodgram_backend import storage
+
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из MEDIA_ROOT файлы, на которые не ссылается ни одна\n'
+        'строка (FileField в HashedFileSystemStorage), кроме сохраненных\n'
+        'за последние --grace секунд и скрытых (.имя). С --rehash сначала\n'
+        'переименовывает файлы со старыми именами по хешу содержимого:\n'
+        'дубликаты сливаются в один файл.\n'
+        'Запуск: python manage.py gc_media --rehash --dry-run'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=settings.MEDIA_ORPHAN_GRACE,
+            help='Не удалять файлы моложе стольких секунд.',
+        )
+        parser.add_argument(
+            '--rehash',
+            action='store_true',
+            help='Перевести файлы со старыми именами на имена по хешу.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет удалено.',
+        )
+
+    def handle(self, *args, **options):
+        if options['rehash']:
+            renamed = self._rehash(options['dry_run'])
+            self.stdout.write(f'Переименовано ссылок: {renamed}')
+        referenced = self._referenced()
+        files = deleted = freed = 0
+        now = time.time()
+        root = str(default_storage.location)
+        for directory, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            for filename in filenames:
+                if filename.startswith('.'):
+                    continue
+                files += 1
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                if name in referenced:
+                    continue
+                stat = os.stat(path)
+                if now - stat.st_mtime <= options['grace']:
+                    continue
+                deleted += 1
+                freed += stat.st_size
+                if options['dry_run']:
+                    self.stdout.write(f'  {name}')
+                else:
+                    os.remove(path)
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов: {files}, используется: {len(referenced)}. '
+            f'{verb}: {deleted} ({freed / 1024 / 1024:.1f} МБ)'
+        ))
+
+    def _referenced(self):
+        referenced = set()
+        for model, field in storage.file_fields():
+            referenced.update(
+                model._default_manager.exclude(**{field.name: ''})
+                .values_list(field.name, flat=True)
+                .iterator(chunk_size=10000)
+            )
+        referenced.discard(None)
+        return referenced
+
+    def _rehash(self, dry_run):
+        """Сохраняет файлы со старыми именами заново, под хешем."""
+        renamed = 0
+        for model, field in storage.file_fields():
+            rows = model._default_manager.exclude(
+                **{field.name: ''}
+            ).values_list('pk', field.name)
+            names = {}
+            changed = []
+            for pk, name in rows.iterator(chunk_size=10000):
+                if not name or storage.is_hashed(name):
+                    continue
+                if name not in names:
+                    names[name] = self._hashed(field, name, dry_run)
+                if names[name]:
+                    changed.append(model(pk=pk, **{field.attname: names[name]}))
+            renamed += len(changed)
+            if not dry_run:
+                model._default_manager.bulk_update(
+                    changed, [field.name], batch_size=BATCH_SIZE
+                )
+        return renamed
+
+    def _hashed(self, field, name, dry_run):
+        if not default_storage.exists(name):
+            self.stderr.write(f'Нет файла: {name}')
+            return None
+        # В каталог upload_to поля: старые аватары лежат в корне MEDIA_ROOT.
+        target = field.generate_filename(None, posixpath.basename(name))
+        with default_storage.open(name) as content:
+            if dry_run:
+                return default_storage.hashed_name(target, content)
+            return default_storage.save(target, content)
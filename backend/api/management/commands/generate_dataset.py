@@ -0,0 +1,80 @@
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from api.datagen import DatasetGenerator
+from foodgram_backend.bulk import copy_supported
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует крупный синтетический набор данных для воспроизведения\n'
+        'продовых планов запросов: пользователи, рецепты из реального\n'
+        'каталога ингредиентов (популярность по Ципфу), теги, избранное,\n'
+        'корзины и степенной граф подписок.\n'
+        'Запуск: python manage.py generate_dataset --users 100000 '
+        '--recipes 1000000 --seed 42'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--favorites', type=int, default=500000)
+        parser.add_argument('--cart-items', type=int, default=100000)
+        parser.add_argument('--subscriptions', type=int, default=200000)
+        parser.add_argument(
+            '--tags', type=int, default=3,
+            help='Сколько тегов создать (не меньше трех стандартных).',
+        )
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения Ципфа для популярности.',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить даты публикации.',
+        )
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY даже на PostgreSQL.',
+        )
+
+    def handle(self, *args, **options):
+        use_copy = copy_supported() and not options['no_copy']
+        generator = DatasetGenerator(
+            users=options['users'],
+            recipes=options['recipes'],
+            favorites=options['favorites'],
+            cart_items=options['cart_items'],
+            subscriptions=options['subscriptions'],
+            tags=options['tags'],
+            ingredients_per_recipe=options['ingredients_per_recipe'],
+            zipf_exponent=options['zipf'],
+            seed=options['seed'],
+            chunk_size=options['chunk_size'],
+            use_copy=use_copy,
+            days=options['days'],
+            progress=self.stdout.write,
+        )
+        if generator.exists():
+            raise CommandError(
+                f'Набор данных с seed={options["seed"]} уже создан; '
+                'укажите другой --seed.'
+            )
+
+        started = time.monotonic()
+        self.stdout.write(
+            'Запись через ' + ('COPY' if use_copy else 'INSERT') + '...'
+        )
+        try:
+            counts = generator.run()
+        except Exception as exc:
+            raise CommandError(f'Ошибка при generate_dataset: {exc}')
+        parts = [f'{k}: {v}' for k, v in counts.items()]
+        self.stdout.write(self.style.SUCCESS(
+            f'generate_dataset выполнена за '
+            f'{time.monotonic() - started:.1f} с → ' + ', '.join(parts)
+        ))
@@ -0,0 +1,229 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+
+# Выполняется в отдельном интерпретаторе: так же, как воркер gunicorn,
+# загружает WSGI-приложение и обрабатывает один запрос. С preload URLconf
+# импортируется заранее, а запрос обрабатывает дочерний процесс после fork
+# (как gunicorn с preload_app, см. gunicorn.conf.py). Строка-разделитель в
+# stderr отделяет импорты загрузки от импортов первого запроса.
+PROBE = '''
+import json
+import os
+import sys
+import time
+from wsgiref.util import setup_testing_defaults
+
+path, query, host, preload = sys.argv[1:5]
+started = time.perf_counter()
+from foodgram_backend.wsgi import application
+if preload:
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    if os.fork():
+        os.wait()
+        sys.exit()
+loaded = time.perf_counter()
+sys.stderr.write('{marker}\\n')
+environ = {{'PATH_INFO': path, 'QUERY_STRING': query, 'HTTP_HOST': host}}
+setup_testing_defaults(environ)
+statuses = []
+response = application(environ, lambda status, *args: statuses.append(status))
+b''.join(response)
+finished = time.perf_counter()
+print(json.dumps({{
+    'setup_ms': round((loaded - started) * 1000, 1),
+    'first_request_ms': round((finished - loaded) * 1000, 1),
+    'status': statuses[0],
+}}))
+'''
+MARKER = '-- first request --'
+IMPORT_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+PHASES = ('setup', 'first_request')
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет холодный старт воркера: загрузку WSGI-приложения\n'
+        '(django.setup, импорт приложений) и первый запрос, и по\n'
+        'python -X importtime показывает, какие приложения и пакеты\n'
+        'тратят время на импорт. Профиль настроек — через --settings.\n'
+        'Запуск: python manage.py profile_startup --path /api/recipes/'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default='/api/tags/',
+            help='Первый запрос после загрузки.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Сколько запусков для замера времени (берется минимум).',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=15,
+            help='Сколько самых тяжелых приложений и пакетов показать.',
+        )
+        parser.add_argument(
+            '--preload',
+            action='store_true',
+            help=(
+                'Загрузить приложение и URLconf до fork, как gunicorn с '
+                'preload_app; первый запрос — в дочернем процессе.'
+            ),
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Вывести отчет в формате JSON.',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть не меньше 1.')
+        timings = min(
+            (
+                self._probe(options['path'], options['preload'])[0]
+                for _ in range(options['repeat'])
+            ),
+            key=lambda timing: timing['setup_ms'] + timing['first_request_ms'],
+        )
+        _, imports = self._probe(
+            options['path'], options['preload'], importtime=True
+        )
+        report = {
+            'settings': settings.SETTINGS_MODULE,
+            'path': options['path'],
+            **timings,
+            'total_ms': round(
+                timings['setup_ms'] + timings['first_request_ms'], 1
+            ),
+            'phases': {
+                phase: self._by_owner(rows, options['limit'])
+                for phase, rows in zip(PHASES, imports)
+            },
+            'packages': self._by_package(
+                [row for rows in imports for row in rows], options['limit']
+            ),
+        }
+        if options['json']:
+            self.stdout.write(
+                json.dumps(report, ensure_ascii=False, indent=2)
+            )
+            return
+        self._print(report)
+
+    def _probe(self, path, preload, importtime=False):
+        """Запускает PROBE; возвращает замеры и импорты по фазам."""
+        url = urlsplit(path)
+        command = [sys.executable]
+        if importtime:
+            command += ['-X', 'importtime']
+        command += [
+            '-c', PROBE.format(marker=MARKER),
+            url.path, url.query, settings.ALLOWED_HOSTS[0] or 'localhost',
+            '1' if preload else '',
+        ]
+        result = subprocess.run(
+            command,
+            cwd=settings.BASE_DIR,
+            env=dict(
+                os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE
+            ),
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(
+                f'Процесс завершился с ошибкой:\n{result.stderr[-2000:]}'
+            )
+        phases = ([], [])
+        current = phases[0]
+        for line in result.stderr.splitlines():
+            if line == MARKER:
+                current = phases[1]
+                continue
+            match = IMPORT_RE.match(line)
+            if match:
+                current.append((
+                    match[4], len(match[3]) // 2,
+                    int(match[1]), int(match[2]),
+                ))
+        return json.loads(result.stdout.splitlines()[-1]), phases
+
+    def _app(self, module):
+        """Приложение из INSTALLED_APPS, которому принадлежит модуль."""
+        best = None
+        for app_config in apps.get_app_configs():
+            name = app_config.name
+            if (module == name or module.startswith(name + '.')) and (
+                best is None or len(name) > len(best)
+            ):
+                best = name
+        return best
+
+    def _by_owner(self, rows, limit):
+        """
+        Собственное время импорта модулей по приложениям: модуль относится
+        к ближайшему приложению среди себя и импортировавших его модулей
+        (numpy, импортированный api.cook_index, — к api), иначе — к своему
+        пакету верхнего уровня.
+        """
+        owners = Counter()
+        chain = []
+        # -X importtime выводит модуль после вложенных импортов, поэтому
+        # при обходе с конца родитель встречается раньше потомков.
+        for module, depth, own, _ in reversed(rows):
+            chain[depth:] = [module]
+            owner = next(
+                filter(None, map(self._app, reversed(chain))),
+                module.split('.')[0],
+            )
+            owners[owner] += own
+        return {
+            owner: round(microseconds / 1000, 1)
+            for owner, microseconds in owners.most_common(limit)
+        }
+
+    def _by_package(self, rows, limit):
+        """Собственное время импорта модулей по пакетам верхнего уровня."""
+        packages = Counter()
+        for module, _, own, _ in rows:
+            packages[module.split('.')[0]] += own
+        return {
+            package: round(microseconds / 1000, 1)
+            for package, microseconds in packages.most_common(limit)
+        }
+
+    def _print(self, report):
+        self.stdout.write(
+            f'{report["settings"]}: загрузка {report["setup_ms"]} мс, '
+            f'первый запрос {report["path"]} ({report["status"]}) '
+            f'{report["first_request_ms"]} мс, всего {report["total_ms"]} мс'
+        )
+        titles = {
+            'setup': 'Импорты при загрузке по приложениям',
+            'first_request': 'Импорты при первом запросе по приложениям',
+        }
+        for phase, owners in report['phases'].items():
+            self.stdout.write(f'\n{titles[phase]}, мс (-X importtime):')
+            for owner, ms in owners.items():
+                self.stdout.write(f'  {owner:<40} {ms:>8}')
+        self.stdout.write('\nСамые тяжелые пакеты (собственное время), мс:')
+        for package, ms in report['packages'].items():
+            self.stdout.write(f'  {package:<40} {ms:>8}')
@@ -0,0 +1,112 @@
+import json
+
+from django.core.management import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from api.instrumentation import registry
+from users.models import User
+
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?is_favorited=1',
+    '/api/recipes/?is_in_shopping_cart=1',
+    '/api/tags/',
+    '/api/ingredients/?name=а',
+    '/api/users/',
+    '/api/users/subscriptions/',
+    '/api/recipes/download_shopping_cart/',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет запросы к эндпоинтам API внутри процесса и выводит\n'
+        'статистику: число запросов к БД, время в БД, время сериализации\n'
+        'и размер ответа. Сверяет результаты с QUERY_BUDGETS.\n'
+        'Запуск: python manage.py query_report --user admin@example.org'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Путь запроса (можно указать несколько раз).',
+        )
+        parser.add_argument(
+            '--user',
+            help='Email пользователя, от имени которого выполнять запросы.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=1,
+            help='Сколько раз повторить каждый запрос.',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Вывести полный отчет в формате JSON.',
+        )
+        parser.add_argument(
+            '--fail-on-budget',
+            action='store_true',
+            help='Завершиться ошибкой, если превышен бюджет эндпоинта.',
+        )
+
+    def handle(self, *args, **options):
+        headers = {'HTTP_HOST': 'localhost'}
+        if options['user']:
+            try:
+                user = User.objects.get(email=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(
+                    f'Пользователь {options["user"]} не найден.'
+                )
+            token, _ = Token.objects.get_or_create(user=user)
+            headers['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+
+        registry.reset()
+        client = Client(raise_request_exception=False)
+        with override_settings(
+            QUERY_INSTRUMENTATION_ENABLED=True,
+            QUERY_BUDGET_RAISE=False,
+        ):
+            for path in options['paths'] or DEFAULT_PATHS:
+                for _ in range(options['repeat']):
+                    client.get(path, **headers)
+
+        report = registry.snapshot()
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        else:
+            self._write_table(report)
+
+        violated = [
+            endpoint for endpoint, stats in report.items()
+            if stats['budget_violations']
+        ]
+        if violated:
+            message = 'Превышен бюджет: ' + ', '.join(violated)
+            if options['fail_on_budget']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+
+    def _write_table(self, report):
+        header = (
+            f'{"endpoint":<40} {"queries":>8} {"db_ms":>8} '
+            f'{"ser_ms":>8} {"total_ms":>9} {"bytes":>9}'
+        )
+        self.stdout.write(header)
+        for endpoint, stats in report.items():
+            self.stdout.write(
+                f'{endpoint:<40} '
+                f'{stats["queries"]["max"]:>8} '
+                f'{stats["db_ms"]["avg"]:>8} '
+                f'{stats["serialize_ms"]["avg"]:>8} '
+                f'{stats["total_ms"]["avg"]:>9} '
+                f'{stats["size_bytes"]["max"]:>9}'
+            )
@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from api.feed import rebuild_inboxes
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает ленты подписок (FeedEntry) по текущим подпискам и\n'
+        'рецептам. Нужна после массовой загрузки данных (seed_demo,\n'
+        'generate_dataset), которая обходит сигналы.'
+    )
+
+    def handle(self, *args, **options):
+        created = rebuild_inboxes()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты пересобраны, записей: {created}'
+        ))
@@ -1,13 +1,20 @@
 import base64
 import csv
+import hashlib
 import json
 import os
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 from django.conf import settings
 from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
 from django.core.management import BaseCommand, CommandError
+from django.db import transaction
 
+from api.cook_index import cook_index
+from api.instrumentation import QueryCounter
+from foodgram_backend import storage
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -19,6 +26,12 @@ from recipes.models import (
 from users.models import User, Subscription
 
 
+BATCH_SIZE = 1000
+IMAGE_DIR = 'recipes/images/'
+# Скрытый файл: хранится под своим именем, gc_media его не трогает.
+IMAGE_MANIFEST = IMAGE_DIR + '.seed-manifest.json'
+IMAGE_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png')
 DEFAULT_IMAGE_B64 = (
     'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lE\n'
     'QVR42mP8/x8AAwMCAO3GkF8AAAAASUVORK5CYII='
@@ -47,7 +60,6 @@ class Command(BaseCommand):
                 data_dir = os.path.abspath(
                     os.path.join(settings.BASE_DIR, '..', 'data')
                 )
-            ingredients_created = self._ensure_ingredients(data_dir)
 
             users = self._load_json(os.path.join(data_dir, 'users.json'))
             tags = self._load_json(os.path.join(data_dir, 'tags.json'))
@@ -56,17 +68,21 @@ class Command(BaseCommand):
                 os.path.join(data_dir, 'interactions.json')
             )
 
-            created = {
-                'ingredients': ingredients_created,
-                'users': self._ensure_users(users),
-                'tags': self._ensure_tags(tags),
-                'recipes': self._ensure_recipes(recipes, data_dir),
-            }
-
-            created.update(self._ensure_interactions(interactions))
+            self._users: Dict[str, User] = {}
+            with QueryCounter() as counter, transaction.atomic():
+                created = {
+                    'ingredients': self._ensure_ingredients(data_dir),
+                    'users': self._ensure_users(users),
+                    'tags': self._ensure_tags(tags),
+                    'recipes': self._ensure_recipes(recipes, data_dir),
+                }
+                created.update(self._ensure_interactions(interactions))
 
             parts = [f'{k}: {v}' for k, v in created.items()]
-            self.stdout.write('seed_demo выполнена → ' + ', '.join(parts))
+            self.stdout.write(
+                'seed_demo выполнена → ' + ', '.join(parts)
+                + f' (запросов к БД: {counter.count})'
+            )
         except Exception as exc:
             raise CommandError(f'Ошибка при seed_demo: {exc}')
 
@@ -80,7 +96,6 @@ class Command(BaseCommand):
     def _ensure_ingredients(self, data_dir: str) -> int:
         json_path = os.path.join(data_dir, 'ingredients.json')
         csv_path = os.path.join(data_dir, 'ingredients.csv')
-        created = 0
 
         rows: List[Dict] = []
         if os.path.exists(json_path):
@@ -92,26 +107,42 @@ class Command(BaseCommand):
                 for row in reader:
                     if not row or len(row) < 2:
                         continue
-                    name = (row[0] or '').strip()
-                    unit = (row[1] or '').strip()
-                    if not name or not unit:
-                        continue
-                    rows.append({'name': name, 'measurement_unit': unit})
+                    rows.append({'name': row[0], 'measurement_unit': row[1]})
 
+        wanted = {}
         for item in rows:
             name = (item.get('name') or '').strip()
             unit = (item.get('measurement_unit')
                     or item.get('unit') or '').strip()
-            if not name or not unit:
-                continue
-            _, was_created = Ingredient.objects.get_or_create(
-                name=name,
-                measurement_unit=unit,
+            if name and unit:
+                wanted[(name, unit)] = None
+
+        existing = set(
+            Ingredient.objects.values_list('name', 'measurement_unit')
+        )
+        missing = [key for key in wanted if key not in existing]
+        Ingredient.objects.bulk_create(
+            (Ingredient(name=name, measurement_unit=unit)
+             for name, unit in missing),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        self._build_ingredient_index()
+        return len(missing)
+
+    def _build_ingredient_index(self) -> None:
+        """Индекс для поиска ингредиента без учета регистра."""
+        self._ingredients_by_name_unit: Dict[tuple, int] = {}
+        self._ingredients_by_name: Dict[str, int] = {}
+        for pk, name, unit in (
+            Ingredient.objects
+            .order_by('name', 'id')
+            .values_list('id', 'name', 'measurement_unit')
+        ):
+            self._ingredients_by_name_unit.setdefault(
+                (name.lower(), unit.lower()), pk
             )
-            if was_created:
-                created += 1
-
-        return created
+            self._ingredients_by_name.setdefault(name.lower(), pk)
 
     def _ensure_users(self, users: Optional[List[Dict]]) -> int:
         if not users:
@@ -139,23 +170,44 @@ class Command(BaseCommand):
                 },
             ]
 
-        created_count = 0
+        existing = {
+            user.username: user
+            for user in User.objects.filter(
+                username__in=[u['username'] for u in users]
+            )
+        }
+        new_users = []
+        password_updates = []
         for u in users:
-            user, created = User.objects.get_or_create(
-                username=u['username'],
-                defaults={
-                    'email': u['email'],
-                    'first_name': u.get('first_name') or '',
-                    'last_name': u.get('last_name') or '',
-                }
+            user = existing.get(u['username'])
+            if user is None:
+                user = User(
+                    username=u['username'],
+                    email=u['email'],
+                    first_name=u.get('first_name') or '',
+                    last_name=u.get('last_name') or '',
+                )
+                user.set_unusable_password()
+                new_users.append(user)
+            has_password = user.password and user.has_usable_password()
+            if u.get('password') and not has_password:
+                user.set_password(u['password'])
+                if user.pk:
+                    password_updates.append(user)
+
+        User.objects.bulk_create(new_users, ignore_conflicts=True)
+        User.objects.bulk_update(password_updates, ['password'])
+        return len(new_users)
+
+    def _get_users(self, usernames) -> Dict[str, User]:
+        """Возвращает пользователей по username, подгружая недостающих."""
+        missing = {name for name in usernames if name} - set(self._users)
+        if missing:
+            self._users.update(
+                (user.username, user)
+                for user in User.objects.filter(username__in=missing)
             )
-            if created:
-                created_count += 1
-            if u.get('password'):
-                if not user.has_usable_password():
-                    user.set_password(u['password'])
-                    user.save(update_fields=['password'])
-        return created_count
+        return self._users
 
     def _ensure_tags(self, tags: Optional[List[Dict]]) -> int:
         if not tags:
@@ -164,27 +216,24 @@ class Command(BaseCommand):
                 {'name': 'Обед', 'slug': 'lunch'},
                 {'name': 'Ужин', 'slug': 'dinner'},
             ]
-        created_count = 0
+        existing = list(Tag.objects.all())
+        by_slug = {tag.slug: tag for tag in existing}
+        by_name = {tag.name: tag for tag in existing}
+        new_tags = []
+        changed = []
         for t in tags:
             name = t['name']
             slug = t['slug']
-            tag_obj = Tag.objects.filter(slug=slug).first()
-            if not tag_obj:
-                tag_obj = Tag.objects.filter(name=name).first()
-            if tag_obj:
-                changed = False
-                if tag_obj.name != name:
-                    tag_obj.name = name
-                    changed = True
-                if tag_obj.slug != slug:
-                    tag_obj.slug = slug
-                    changed = True
-                if changed:
-                    tag_obj.save(update_fields=['name', 'slug'])
-            else:
-                Tag.objects.create(name=name, slug=slug)
-                created_count += 1
-        return created_count
+            tag_obj = by_slug.get(slug) or by_name.get(name)
+            if tag_obj is None:
+                new_tags.append(Tag(name=name, slug=slug))
+            elif tag_obj.name != name or tag_obj.slug != slug:
+                tag_obj.name = name
+                tag_obj.slug = slug
+                changed.append(tag_obj)
+        Tag.objects.bulk_update(changed, ['name', 'slug'])
+        Tag.objects.bulk_create(new_tags, ignore_conflicts=True)
+        return len(new_tags)
 
     def _ensure_recipes(
         self,
@@ -194,82 +243,100 @@ class Command(BaseCommand):
         if not recipes:
             return 0
 
-        created_count = 0
-        for r in recipes:
-            author = self._get_user_by_username(r.get('author'))
-            if not author:
+        authors = self._get_users(r.get('author') for r in recipes)
+        entries = [
+            (authors[r['author']], r) for r in recipes
+            if r.get('author') in authors
+        ]
+        existing = {}
+        for recipe in Recipe.objects.filter(
+            author__in={author for author, _ in entries},
+            name__in={r['name'] for _, r in entries},
+        ).order_by('id'):
+            existing.setdefault((recipe.author_id, recipe.name), recipe)
+
+        new_recipes = []
+        for author, r in entries:
+            key = (author.id, r['name'])
+            if key in existing:
                 continue
-
-            recipe, created = Recipe.objects.get_or_create(
+            existing[key] = Recipe(
                 author=author,
                 name=r['name'],
-                defaults={
-                    'text': r.get('text') or '',
-                    'cooking_time': int(r.get('cooking_time') or 1),
-                }
+                text=r.get('text') or '',
+                cooking_time=int(r.get('cooking_time') or 1),
             )
-            if created:
-                created_count += 1
-
-            self._assign_image_auto(
+            new_recipes.append(existing[key])
+        Recipe.objects.bulk_create(new_recipes)
+
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        Through = Recipe.tags.through
+        wanted_tags = set()
+        tagged_recipes = set()
+        ingredient_rows = {}
+        image_jobs = []
+        self._index_photos(os.path.join(data_dir, 'photos'))
+        for author, r in entries:
+            recipe = existing[(author.id, r['name'])]
+            source = self._image_source(
                 recipe=recipe,
                 data_dir=data_dir,
                 image_b64=r.get('image_base64'),
                 image_path=r.get('image'),
             )
-
-            tag_slugs = r.get('tags') or []
-            if tag_slugs:
-                tags = list(Tag.objects.filter(slug__in=tag_slugs))
-                if tags:
-                    recipe.tags.set(tags)
-
-            items = r.get('ingredients') or []
-            for item in items:
-                ing = self._find_ingredient(
+            if source:
+                image_jobs.append((recipe, source))
+            slugs = [slug for slug in r.get('tags') or [] if slug in tag_ids]
+            if slugs:
+                tagged_recipes.add(recipe.id)
+                wanted_tags.update((recipe.id, tag_ids[s]) for s in slugs)
+            for item in r.get('ingredients') or []:
+                ingredient_id = self._find_ingredient(
                     item.get('name'),
                     item.get('measurement_unit'),
                 )
-                if not ing:
-                    continue
-                IngredientInRecipe.objects.get_or_create(
-                    recipe=recipe,
-                    ingredient=ing,
-                    defaults={'amount': int(item.get('amount') or 1)},
-                )
-
-        return created_count
-
-    def _assign_image_from_b64(
-        self,
-        recipe: Recipe,
-        data_b64: str,
-        suggested_name: str,
-    ) -> None:
-        try:
-            if ',' in data_b64:
-                data_b64 = data_b64.split(',', 1)[1]
-            binary = base64.b64decode(data_b64)
-            content = ContentFile(binary)
-            recipe.image.save(
-                name=os.path.join('recipes/images/', suggested_name),
-                content=content,
-                save=True,
-            )
-        except Exception:
-            # Не падать на изображении – используем дефолт
-            try:
-                binary = base64.b64decode(DEFAULT_IMAGE_B64)
-                content = ContentFile(binary)
-                recipe.image.save(
-                    name=os.path.join(
-                        'recipes/images/', suggested_name or 'image.png'
-                    ),
-                    content=content,
-                    save=True,
+                if ingredient_id:
+                    ingredient_rows.setdefault(
+                        (recipe.id, ingredient_id),
+                        int(item.get('amount') or 1),
+                    )
+        Recipe.objects.bulk_update(self._ingest_images(image_jobs), ['image'])
+
+        # recipe.tags.set(...) для всех рецептов разом.
+        current_tags = {
+            (recipe_id, tag_id): pk
+            for pk, recipe_id, tag_id in Through.objects.filter(
+                recipe_id__in=tagged_recipes
+            ).values_list('id', 'recipe_id', 'tag_id')
+        }
+        Through.objects.filter(pk__in=[
+            pk for pair, pk in current_tags.items() if pair not in wanted_tags
+        ]).delete()
+        Through.objects.bulk_create(
+            (
+                Through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id, tag_id in wanted_tags - set(current_tags)
+            ),
+            ignore_conflicts=True,
+        )
+        IngredientInRecipe.objects.bulk_create(
+            (
+                IngredientInRecipe(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=amount,
                 )
-            except Exception:
-                pass
+                for (recipe_id, ingredient_id), amount
+                in ingredient_rows.items()
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        # Подбор по продуктам узнает о новых составах из журнала.
+        cook_index.record_changes(
+            {recipe_id for recipe_id, _ in ingredient_rows}
+        )
+        return len(new_recipes)
 
     def _slugify_filename(self, name: str) -> str:
         base = ''.join(
@@ -282,24 +349,17 @@ class Command(BaseCommand):
         self,
         name: Optional[str],
         unit: Optional[str],
-    ) -> Optional[Ingredient]:
+    ) -> Optional[int]:
         if not name:
             return None
-        qs = Ingredient.objects.filter(name__iexact=name.strip())
+        name = name.strip().lower()
         if unit:
-            qs = qs.filter(measurement_unit__iexact=unit.strip())
-        return qs.first()
-
-    def _get_user_by_username(self, username: Optional[str]) -> Optional[User]:
-        if not username:
-            return None
-        try:
-            return User.objects.get(username=username)
-        except User.DoesNotExist:
-            return None
+            return self._ingredients_by_name_unit.get(
+                (name, unit.strip().lower())
+            )
+        return self._ingredients_by_name.get(name)
 
     def _ensure_interactions(self, data: Optional[Dict]) -> Dict[str, int]:
-        created = {'favorites': 0, 'shopping_cart': 0, 'subscriptions': 0}
         if not data:
             data = {
                 'favorites': [
@@ -313,99 +373,96 @@ class Command(BaseCommand):
                     {'user': 'vasya', 'author': 'masha'},
                 ],
             }
-
-        for fav in data.get('favorites', []) or []:
-            user = self._get_user_by_username(fav.get('user'))
-            recipe = Recipe.objects.filter(name=fav.get('recipe')).first()
-            if user and recipe:
-                _, was_created = Favorite.objects.get_or_create(
-                    user=user,
-                    recipe=recipe,
-                )
-                if was_created:
-                    created['favorites'] += 1
-
-        for cart in data.get('shopping_cart', []) or []:
-            user = self._get_user_by_username(cart.get('user'))
-            recipe = Recipe.objects.filter(name=cart.get('recipe')).first()
-            if user and recipe:
-                _, was_created = ShoppingCart.objects.get_or_create(
-                    user=user,
-                    recipe=recipe,
-                )
-                if was_created:
-                    created['shopping_cart'] += 1
-
-        for sub in data.get('subscriptions', []) or []:
-            user = self._get_user_by_username(sub.get('user'))
-            author = self._get_user_by_username(sub.get('author'))
-            if user and author and user != author:
-                _, was_created = Subscription.objects.get_or_create(
-                    user=user,
-                    author=author,
-                )
-                if was_created:
-                    created['subscriptions'] += 1
-
-        return created
-
-    def _assign_image_auto(
-        self,
-        recipe: Recipe,
-        data_dir: str,
-        image_b64: Optional[str],
-        image_path: Optional[str],
-    ) -> None:
-        image_assigned = False
-
-        photos_dir = os.path.join(data_dir, 'photos')
-        photo_full = self._find_photo_by_name(recipe.name, photos_dir)
-        if photo_full and os.path.exists(photo_full):
-            with open(photo_full, 'rb') as f:
-                content = ContentFile(f.read())
-                recipe.image.save(
-                    name=os.path.join(
-                        'recipes/images/', os.path.basename(photo_full)
-                    ),
-                    content=content,
-                    save=True,
-                )
-                image_assigned = True
-
-        if not image_assigned and image_b64:
-            self._assign_image_from_b64(
-                recipe,
-                image_b64,
-                suggested_name=(self._slugify_filename(recipe.name) + '.png'),
-            )
-            image_assigned = True
-
-        if not image_assigned and image_path:
-            full = os.path.join(data_dir, image_path)
-            if os.path.exists(full):
-                with open(full, 'rb') as f:
-                    content = ContentFile(f.read())
-                    recipe.image.save(
-                        name=os.path.join(
-                            'recipes/images/', os.path.basename(full)
-                        ),
-                        content=content,
-                        save=True,
-                    )
-                    image_assigned = True
-
-        if not image_assigned and not recipe.image:
-            self._assign_image_from_b64(
-                recipe,
-                DEFAULT_IMAGE_B64,
-                suggested_name=(self._slugify_filename(recipe.name) + '.png'),
-            )
-
-    def _find_photo_by_name(
-        self,
-        name: Optional[str],
-        photos_dir: str,
-    ) -> Optional[str]:
+        favorites = data.get('favorites', []) or []
+        carts = data.get('shopping_cart', []) or []
+        subscriptions = data.get('subscriptions', []) or []
+
+        users = self._get_users(
+            [item.get('user') for item in favorites + carts + subscriptions]
+            + [item.get('author') for item in subscriptions]
+        )
+        recipe_ids = {}
+        for pk, name in Recipe.objects.filter(
+            name__in={item.get('recipe') for item in favorites + carts}
+        ).values_list('id', 'name'):
+            recipe_ids.setdefault(name, pk)
+
+        def pairs(items, right_key, right_ids, exclude_self=False):
+            result = set()
+            for item in items:
+                user = users.get(item.get('user'))
+                right = right_ids(item.get(right_key))
+                if not user or not right:
+                    continue
+                if exclude_self and user.id == right:
+                    continue
+                result.add((user.id, right))
+            return result
+
+        def author_id(username):
+            author = users.get(username)
+            return author.id if author else None
+
+        return {
+            'favorites': self._create_missing_pairs(
+                Favorite, 'recipe_id',
+                pairs(favorites, 'recipe', recipe_ids.get),
+            ),
+            'shopping_cart': self._create_missing_pairs(
+                ShoppingCart, 'recipe_id',
+                pairs(carts, 'recipe', recipe_ids.get),
+            ),
+            'subscriptions': self._create_missing_pairs(
+                Subscription, 'author_id',
+                pairs(subscriptions, 'author', author_id, exclude_self=True),
+            ),
+        }
+
+    def _create_missing_pairs(self, model, right_field, wanted) -> int:
+        """Создает связи (user_id, right_id), которых еще нет в БД."""
+        if not wanted:
+            return 0
+        existing = set(
+            model.objects.filter(
+                user_id__in={user_id for user_id, _ in wanted}
+            ).values_list('user_id', right_field)
+        )
+        missing = wanted - existing
+        model.objects.bulk_create(
+            (
+                model(**{'user_id': user_id, right_field: right_id})
+                for user_id, right_id in missing
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        return len(missing)
+
+    # region images
+    def _index_photos(self, photos_dir: str) -> None:
+        """Один раз читает каталог photos и строит индексы для поиска."""
+        self._photos_by_stem: Dict[str, str] = {}
+        self._photo_entries: List[Tuple[str, str]] = []
+        if not os.path.isdir(photos_dir):
+            return
+        for fname in sorted(os.listdir(photos_dir)):
+            base, ext = os.path.splitext(fname)
+            if ext.lower() not in PHOTO_EXTENSIONS:
+                continue
+            path = os.path.join(photos_dir, fname)
+            self._photo_entries.append((base, path))
+            # Точное имя "<stem>.<ext>" ищется только с расширением
+            # в нижнем регистре, в порядке PHOTO_EXTENSIONS.
+            if ext not in PHOTO_EXTENSIONS:
+                continue
+            current = self._photos_by_stem.get(base)
+            if current is None or (
+                PHOTO_EXTENSIONS.index(ext)
+                < PHOTO_EXTENSIONS.index(os.path.splitext(current)[1])
+            ):
+                self._photos_by_stem[base] = path
+
+    def _find_photo_by_name(self, name: Optional[str]) -> Optional[str]:
         """
         Ищет файл изображения в каталоге photos, соответств названию рецепта.
         Порядок:
@@ -414,37 +471,149 @@ class Command(BaseCommand):
         3) Поиск по списку файлов: совпадение по базовому имени
            (регистр игнорируется) или по слагу, либо подстрока.
         """
-        if not name or not os.path.isdir(photos_dir):
+        if not name:
             return None
-
-        exts = ('.jpg', '.jpeg', '.png')
-
-        def candidates_for(stem: str):
-            for ext in exts:
-                yield os.path.join(photos_dir, f'{stem}{ext}')
-
-        for path in candidates_for(name):
-            if os.path.exists(path):
-                return path
-
         slug = self._slugify_filename(name)
-        for path in candidates_for(slug):
-            if os.path.exists(path):
+        found = (
+            self._photos_by_stem.get(name)
+            or self._photos_by_stem.get(slug)
+        )
+        if found:
+            return found
+        for base, path in self._photo_entries:
+            if (
+                base.lower() == name.lower()
+                or self._slugify_filename(base) == slug
+                or name.lower() in base.lower()
+            ):
                 return path
+        return None
+
+    def _image_source(
+        self,
+        recipe: Recipe,
+        data_dir: str,
+        image_b64: Optional[str],
+        image_path: Optional[str],
+    ) -> Optional[Tuple[str, str]]:
+        """Откуда брать картинку рецепта: ('path', путь) или ('b64', data)."""
+        photo = self._find_photo_by_name(recipe.name)
+        if photo:
+            return 'path', photo
+        if image_b64:
+            return 'b64', image_b64
+        if image_path:
+            full = os.path.join(data_dir, image_path)
+            if os.path.exists(full):
+                return 'path', full
+        if not recipe.image:
+            return 'b64', DEFAULT_IMAGE_B64
+        return None
 
+    @staticmethod
+    def _decode_b64(data_b64: str) -> bytes:
+        if ',' in data_b64:
+            data_b64 = data_b64.split(',', 1)[1]
         try:
-            for fname in os.listdir(photos_dir):
-                base, ext = os.path.splitext(fname)
-                if ext.lower() not in exts:
-                    continue
-                if (
-                    base == name
-                    or base.lower() == name.lower()
-                    or self._slugify_filename(base) == slug
-                    or name.lower() in base.lower()
-                ):
-                    return os.path.join(photos_dir, fname)
+            return base64.b64decode(data_b64)
         except Exception:
-            return None
+            # Не падать на изображении – используем дефолт
+            return base64.b64decode(DEFAULT_IMAGE_B64)
 
-        return None
+    def _read_source(
+        self,
+        source: Tuple[str, str],
+    ) -> Tuple[str, str, bytes]:
+        """Читает источник и возвращает (sha256, расширение, содержимое)."""
+        kind, value = source
+        if kind == 'path':
+            with open(value, 'rb') as f:
+                content = f.read()
+            ext = os.path.splitext(value)[1].lower()
+        else:
+            content = self._decode_b64(value)
+            ext = '.png'
+        return hashlib.sha256(content).hexdigest(), ext, content
+
+    def _load_manifest(self) -> Dict[str, list]:
+        self._manifest_storage = FileSystemStorage()
+        if not self._manifest_storage.exists(IMAGE_MANIFEST):
+            return {}
+        try:
+            with self._manifest_storage.open(IMAGE_MANIFEST) as f:
+                return json.loads(f.read().decode('utf-8'))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest: Dict[str, list]) -> None:
+        if self._manifest_storage.exists(IMAGE_MANIFEST):
+            self._manifest_storage.delete(IMAGE_MANIFEST)
+        self._manifest_storage.save(
+            IMAGE_MANIFEST,
+            ContentFile(json.dumps(manifest, ensure_ascii=False).encode()),
+        )
+
+    def _ingest_images(
+        self,
+        jobs: List[Tuple[Recipe, Tuple[str, str]]],
+    ) -> List[Recipe]:
+        """
+        Сохраняет картинки рецептов и возвращает рецепты с новым image.
+
+        Хранилище называет файлы по хешу содержимого, поэтому одинаковые
+        фото (в том числе под разными именами) записываются один раз
+        и разделяются рецептами. Неизмененные файлы из photos узнаются
+        по размеру и mtime без чтения; остальное читается и пишется
+        в пуле потоков. Замененные картинки освобождаются
+        (storage.release): bulk_update обходит сигналы.
+        """
+        manifest = self._load_manifest()
+        stats = {}
+        resolved: Dict[Tuple[str, str], str] = {}
+        for _, source in jobs:
+            kind, value = source
+            if kind != 'path' or source in stats:
+                continue
+            stat = os.stat(value)
+            stats[source] = [stat.st_size, stat.st_mtime_ns]
+            known = manifest.get(value)
+            if (
+                known and known[:2] == stats[source]
+                and default_storage.exists(known[2])
+            ):
+                resolved[source] = known[2]
+        pending = list({
+            source for _, source in jobs if source not in resolved
+        })
+
+        with ThreadPoolExecutor(max_workers=IMAGE_WORKERS) as pool:
+            digests: Dict[Tuple[str, str], str] = {}
+            contents: Dict[str, Tuple[str, bytes]] = {}
+            for source, (digest, ext, content) in zip(
+                pending, pool.map(self._read_source, pending)
+            ):
+                digests[source] = digest
+                contents.setdefault(digest, (ext, content))
+            # Один save на содержимое: хранилище не пишет существующий файл.
+            names = dict(zip(contents, pool.map(
+                lambda item: default_storage.save(
+                    f'{IMAGE_DIR}image{item[0]}', ContentFile(item[1])
+                ),
+                contents.values(),
+            )))
+        for source, digest in digests.items():
+            resolved[source] = names[digest]
+            if source in stats:
+                manifest[source[1]] = stats[source] + [names[digest]]
+        if pending:
+            self._save_manifest(manifest)
+
+        changed = []
+        replaced = set()
+        for recipe, source in jobs:
+            if recipe.image.name != resolved[source]:
+                replaced.add(recipe.image.name)
+                recipe.image.name = resolved[source]
+                changed.append(recipe)
+        storage.release(replaced - set(resolved.values()))
+        return changed
@@ -0,0 +1,404 @@
+"""
+Метрики в текстовом формате Prometheus без зависимости от prometheus_client.
+
+Каждый процесс (воркер gunicorn) копит значения в памяти и периодически
+сбрасывает их в собственный файл в METRICS_MULTIPROC_DIR. При выдаче
+/metrics значения всех файлов суммируются, поэтому счетчики и гистограммы
+корректно агрегируются по воркерам, в том числе уже завершившимся: файл
+завершившегося воркера мастер gunicorn вливает в общий архив (archive) и
+удаляет, так что число файлов не растет с перезапусками воркеров.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS_BYTES = (
+    1024, 16384, 65536, 262144, 1048576, 4194304, 10485760
+)
+FILE_PREFIX = 'metrics_'
+ARCHIVE_FILE = f'{FILE_PREFIX}archive.json'
+
+
+class MetricsRegistry:
+    """Значения метрик текущего процесса и их сброс в общий каталог."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        """Обнуляет значения: после fork у воркера свой файл и счетчики."""
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._last_flush = 0.0
+        self._file_name = f'{FILE_PREFIX}{os.getpid()}_{uuid.uuid4().hex}'
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+
+    def inc(self, metric, labels, amount):
+        with self._lock:
+            key = (metric.name, labels)
+            self._counters[key] = self._counters.get(key, 0) + amount
+        self._maybe_flush()
+
+    def observe(self, metric, labels, value):
+        with self._lock:
+            key = (metric.name, labels)
+            state = self._histograms.get(key)
+            if state is None:
+                state = self._histograms[key] = {
+                    'buckets': [0] * (len(metric.buckets) + 1),
+                    'sum': 0.0,
+                    'count': 0,
+                }
+            state['buckets'][bisect_left(metric.buckets, value)] += 1
+            state['sum'] += value
+            state['count'] += 1
+        self._maybe_flush()
+
+    # region multiprocess
+    @staticmethod
+    def _directory():
+        return getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+
+    def _dump(self):
+        with self._lock:
+            return {
+                'counters': [
+                    [name, list(labels), value]
+                    for (name, labels), value in self._counters.items()
+                ],
+                'histograms': [
+                    [name, list(labels), dict(state, buckets=list(
+                        state['buckets']
+                    ))]
+                    for (name, labels), state in self._histograms.items()
+                ],
+            }
+
+    def _maybe_flush(self):
+        directory = self._directory()
+        if not directory:
+            return
+        now = time.monotonic()
+        if now - self._last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        self.flush()
+
+    def flush(self):
+        """Атомарно записывает значения процесса в его файл."""
+        directory = self._directory()
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self._file_name + '.json')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._dump(), f)
+        os.replace(tmp_path, path)
+
+    def _snapshots(self):
+        """Возвращает снимки всех процессов, для текущего — живые значения."""
+        snapshots = [self._dump()]
+        directory = self._directory()
+        if not directory or not os.path.isdir(directory):
+            return snapshots
+        archive = _read_snapshot(os.path.join(directory, ARCHIVE_FILE))
+        # Файлы, уже влитые в архив, но еще не удаленные, не считаются
+        # дважды.
+        skip = {self._file_name + '.json', ARCHIVE_FILE}
+        if archive:
+            snapshots.append(archive)
+            skip.update(archive.get('merged', ()))
+        for fname in os.listdir(directory):
+            if not fname.startswith(FILE_PREFIX) or fname in skip:
+                continue
+            if not fname.endswith('.json'):
+                continue
+            snapshot = _read_snapshot(os.path.join(directory, fname))
+            if snapshot:
+                snapshots.append(snapshot)
+        return snapshots
+    # endregion
+
+    def collect(self):
+        """Суммирует значения всех процессов по метрикам и меткам."""
+        return _merge(self._snapshots())
+
+    def render(self):
+        """Формирует ответ в текстовом формате экспозиции Prometheus."""
+        counters, histograms = self.collect()
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            if metric.type == 'counter':
+                for (key_name, labels), value in sorted(counters.items()):
+                    if key_name == name:
+                        lines.append(
+                            f'{name}{metric.format_labels(labels)} {value}'
+                        )
+                continue
+            for (key_name, labels), state in sorted(histograms.items()):
+                if key_name != name:
+                    continue
+                cumulative = 0
+                bounds = [str(bound) for bound in metric.buckets] + ['+Inf']
+                for bound, count in zip(bounds, state['buckets']):
+                    cumulative += count
+                    bucket_labels = metric.format_labels(
+                        labels, extra=(('le', bound),)
+                    )
+                    lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+                plain = metric.format_labels(labels)
+                lines.append(f'{name}_sum{plain} {state["sum"]}')
+                lines.append(f'{name}_count{plain} {state["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _read_snapshot(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge(snapshots):
+    """Суммирует снимки: (счетчики, гистограммы) по (имени, меткам)."""
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, state in snapshot['histograms']:
+            key = (name, tuple(labels))
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = {
+                    'buckets': list(state['buckets']),
+                    'sum': state['sum'],
+                    'count': state['count'],
+                }
+                continue
+            merged['buckets'] = [
+                a + b for a, b in zip(merged['buckets'], state['buckets'])
+            ]
+            merged['sum'] += state['sum']
+            merged['count'] += state['count']
+    return counters, histograms
+
+
+def archive(directory, pid):
+    """
+    Вливает файлы метрик завершившегося процесса pid в ARCHIVE_FILE и
+    удаляет их. Вызывается мастером gunicorn (child_exit) — единственным
+    писателем архива. Архив перечисляет влитые файлы (merged): пока файл
+    не удален, /metrics пропускает его и не считает значения дважды.
+    """
+    if not directory:
+        return
+    paths = glob.glob(os.path.join(directory, f'{FILE_PREFIX}{pid}_*.json'))
+    if not paths:
+        return
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    previous = _read_snapshot(archive_path)
+    snapshots = [previous] if previous else []
+    snapshots.extend(filter(None, map(_read_snapshot, paths)))
+    counters, histograms = _merge(snapshots)
+    merged = [os.path.basename(path) for path in paths]
+    tmp_path = archive_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'counters': [
+                [name, list(labels), value]
+                for (name, labels), value in counters.items()
+            ],
+            'histograms': [
+                [name, list(labels), state]
+                for (name, labels), state in histograms.items()
+            ],
+            'merged': merged,
+        }, f)
+    os.replace(tmp_path, archive_path)
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        try:
+            os.remove(path + '.tmp')
+        except FileNotFoundError:
+            pass
+
+
+registry = MetricsRegistry()
+atexit.register(registry.flush)
+
+
+class Metric:
+    """Базовая метрика с фиксированным набором меток."""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _labels(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def format_labels(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ''
+        rendered = ','.join(
+            '{}="{}"'.format(
+                key,
+                str(value).replace('\\', r'\\').replace('"', r'\"')
+            )
+            for key, value in pairs
+        )
+        return '{' + rendered + '}'
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        registry.inc(self, self._labels(labels), amount)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        registry.observe(self, self._labels(labels), value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+http_requests_total = Counter(
+    'foodgram_http_requests_total',
+    'Количество HTTP-запросов.',
+    ('route', 'method', 'status'),
+)
+http_request_duration_seconds = Histogram(
+    'foodgram_http_request_duration_seconds',
+    'Время обработки HTTP-запроса.',
+    ('route', 'method'),
+)
+db_queries_per_request = Histogram(
+    'foodgram_db_queries_per_request',
+    'Количество запросов к БД на один HTTP-запрос.',
+    ('route',),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+db_duration_seconds = Histogram(
+    'foodgram_db_duration_seconds',
+    'Суммарное время запросов к БД на один HTTP-запрос.',
+    ('route',),
+)
+cache_requests_total = Counter(
+    'foodgram_cache_requests_total',
+    'Обращения к кешу по результату (hit/miss).',
+    ('cache', 'result'),
+)
+shopping_list_duration_seconds = Histogram(
+    'foodgram_shopping_list_duration_seconds',
+    'Время формирования списка покупок.',
+)
+image_upload_bytes = Histogram(
+    'foodgram_image_upload_bytes',
+    'Размер загружаемых изображений.',
+    ('field',),
+    buckets=SIZE_BUCKETS_BYTES,
+)
+db_connections_opened_total = Counter(
+    'foodgram_db_connections_opened_total',
+    'Новые соединения с БД (при пуле — физические соединения пула).',
+    ('alias',),
+)
+db_pool_checkouts_total = Counter(
+    'foodgram_db_pool_checkouts_total',
+    'Выдачи соединения из пула.',
+    ('alias',),
+)
+db_pool_waits_total = Counter(
+    'foodgram_db_pool_waits_total',
+    'Выдачи, которым пришлось ждать свободного соединения.',
+    ('alias',),
+)
+db_pool_wait_seconds_total = Counter(
+    'foodgram_db_pool_wait_seconds_total',
+    'Суммарное время ожидания соединения из пула.',
+    ('alias',),
+)
+db_pool_errors_total = Counter(
+    'foodgram_db_pool_errors_total',
+    'Ошибки выдачи соединения из пула (в том числе таймауты).',
+    ('alias',),
+)
+db_connect_seconds_total = Counter(
+    'foodgram_db_connect_seconds_total',
+    'Суммарное время установки новых соединений пула.',
+    ('alias',),
+)
+
+
+def record_pool_stats(connections):
+    """Переносит накопленную статистику пулов psycopg в счетчики."""
+    for connection in connections.all(initialized_only=True):
+        pool = getattr(connection, 'pool', None)
+        if pool is None:
+            continue
+        stats = pool.pop_stats()
+        alias = connection.alias
+        db_pool_checkouts_total.inc(stats.get('requests_num', 0), alias=alias)
+        db_pool_waits_total.inc(stats.get('requests_queued', 0), alias=alias)
+        db_pool_wait_seconds_total.inc(
+            stats.get('requests_wait_ms', 0) / 1000, alias=alias
+        )
+        db_pool_errors_total.inc(stats.get('requests_errors', 0), alias=alias)
+        db_connections_opened_total.inc(
+            stats.get('connections_num', 0), alias=alias
+        )
+        db_connect_seconds_total.inc(
+            stats.get('connections_ms', 0) / 1000, alias=alias
+        )
+
+
+def record_cache(cache_name, hit):
+    """Учитывает попадание или промах кеша."""
+    cache_requests_total.inc(cache=cache_name, result='hit' if hit else 'miss')
@@ -0,0 +1,295 @@
+import hashlib
+import logging
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.module_loading import import_string
+
+from api import metrics
+from api.checks import REPLICA_CACHE_MESSAGE, shared_cache
+from foodgram_backend.db_router import use_primary
+from api.instrumentation import (
+    QueryCounter,
+    check_budget,
+    registry,
+    resolve_endpoint,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Эндпоинт превысил бюджет запросов к БД или времени ответа."""
+
+
+class QueryBudgetMiddleware:
+    """
+    Считает запросы к БД, время в БД, время сериализации и размер ответа
+    для каждого эндпоинта и сверяет их с бюджетами из QUERY_BUDGETS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_INSTRUMENTATION_ENABLED:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        endpoint = getattr(request, '_instrumentation_endpoint', None)
+        if endpoint is None:
+            return response
+
+        budgets = settings.QUERY_BUDGETS
+        budget = {**budgets.get('default', {}), **budgets.get(endpoint, {})}
+        violations = check_budget(
+            budget,
+            queries=counter.count,
+            db_ms=counter.duration_ms,
+            total_ms=total_ms,
+        )
+        registry.record(
+            endpoint,
+            queries=counter.count,
+            db_ms=counter.duration_ms,
+            serialize_ms=getattr(request, '_instrumentation_render_ms', 0.0),
+            total_ms=total_ms,
+            size_bytes=self._response_size(response),
+            violated=bool(violations),
+        )
+        if violations:
+            message = (
+                f'Превышен бюджет эндпоинта {endpoint} '
+                f'({request.method} {request.path}): ' + ', '.join(violations)
+            )
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._instrumentation_endpoint = resolve_endpoint(
+            request, view_func
+        )
+
+    def process_template_response(self, request, response):
+        """Замеряет время рендеринга ответа (сериализация в байты)."""
+        start = time.perf_counter()
+
+        def _finish(_response):
+            request._instrumentation_render_ms = (
+                (time.perf_counter() - start) * 1000
+            )
+
+        response.add_post_render_callback(_finish)
+        return response
+
+    @staticmethod
+    def _response_size(response):
+        if getattr(response, 'streaming', False):
+            length = response.get('Content-Length')
+            return int(length) if length else None
+        return len(response.content)
+
+
+@lru_cache(maxsize=None)
+def _router_basenames():
+    from api.urls import api_v1_router
+
+    return frozenset(basename for _, _, basename in api_v1_router.registry)
+
+
+def metrics_route(request, view_func):
+    """
+    Возвращает метку маршрута для метрик: эндпоинты api_v1_router
+    и короткие ссылки; остальные запросы сводятся в 'other'.
+    """
+    initkwargs = getattr(view_func, 'initkwargs', None) or {}
+    if initkwargs.get('basename') in _router_basenames():
+        return resolve_endpoint(request, view_func)
+    match = getattr(request, 'resolver_match', None)
+    if match and match.view_name == 'recipes:recipe-short-link':
+        return match.view_name
+    return 'other'
+
+
+class MetricsMiddleware:
+    """Собирает метрики латентности и запросов к БД для /metrics."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        route = getattr(request, '_metrics_route', 'other')
+        metrics.http_requests_total.inc(
+            route=route,
+            method=request.method,
+            status=response.status_code,
+        )
+        metrics.http_request_duration_seconds.observe(
+            duration, route=route, method=request.method
+        )
+        metrics.db_queries_per_request.observe(counter.count, route=route)
+        metrics.db_duration_seconds.observe(counter.duration, route=route)
+        metrics.record_pool_stats(connections)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_route = metrics_route(request, view_func)
+
+
+class MicrocacheMiddleware:
+    """
+    Управляет микрокешем nginx (proxy_cache, см. infra/nginx.conf) на путях
+    MICROCACHE_PATH_PREFIXES: анонимный GET/HEAD с ответом 200 nginx хранит
+    MICROCACHE_SECONDS секунд (X-Accel-Expires), остальные ответы — нет.
+    Vary: Authorization не дает кешам после nginx отдать анонимный ответ
+    пользователю с токеном.
+    """
+
+    SAFE_METHODS = frozenset(('GET', 'HEAD'))
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixes = tuple(settings.MICROCACHE_PATH_PREFIXES)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not request.path_info.startswith(self.prefixes):
+            return response
+        patch_vary_headers(response, ('Authorization',))
+        if not response.has_header('X-Accel-Expires'):
+            response['X-Accel-Expires'] = str(
+                settings.MICROCACHE_SECONDS
+                if self._cacheable(request, response) else 0
+            )
+        return response
+
+    def _cacheable(self, request, response):
+        return (
+            request.method in self.SAFE_METHODS
+            and response.status_code == 200
+            and 'HTTP_AUTHORIZATION' not in request.META
+            and not response.cookies
+            and not response.has_header('Cache-Control')
+        )
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Read-your-writes для реплик: запрос-запись и чтения того же клиента в
+    течение REPLICA_STICKY_SECONDS после нее идут в основную базу. Клиент
+    узнается по cookie (браузер) и по метке в кеше для заголовка
+    Authorization (API-клиенты без cookie); метку видят другие воркеры,
+    только если кеш общий (REDIS_URL), иначе при старте — предупреждение.
+    """
+
+    COOKIE_NAME = 'primary_until'
+    SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if settings.DATABASE_REPLICAS and not shared_cache():
+            logger.warning(REPLICA_CACHE_MESSAGE)
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        write = request.method not in self.SAFE_METHODS
+        with use_primary(write or self._sticky(request)):
+            response = self.get_response(request)
+        if write and response.status_code < 400:
+            self._mark(request, response)
+        return response
+
+    def _marker_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        digest = hashlib.sha256(authorization.encode()).hexdigest()
+        return f'db:primary:{digest[:32]}'
+
+    def _sticky(self, request):
+        try:
+            until = float(request.COOKIES.get(self.COOKIE_NAME, 0))
+        except ValueError:
+            until = 0
+        if until > time.time():
+            return True
+        key = self._marker_key(request)
+        return bool(key and cache.get(key))
+
+    def _mark(self, request, response):
+        window = settings.REPLICA_STICKY_SECONDS
+        response.set_cookie(
+            self.COOKIE_NAME,
+            str(int(time.time() + window) + 1),
+            max_age=window,
+            httponly=True,
+            samesite='Lax',
+        )
+        key = self._marker_key(request)
+        if key:
+            cache.set(key, True, timeout=window)
+
+
+class PathScopedMiddleware:
+    """
+    Выполняет middleware из SESSION_MIDDLEWARE (сессии, CSRF, пользователь
+    из сессии, сообщения) только для путей вне SESSIONLESS_PATH_PREFIXES.
+    API и короткие ссылки аутентифицируются токеном или анонимны, и этот
+    слой для них — лишняя работа на каждом запросе; /admin/ получает его
+    целиком.
+    """
+
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixes = tuple(settings.SESSIONLESS_PATH_PREFIXES)
+        handler = get_response
+        self.view_middleware = []
+        for path in reversed(settings.SESSION_MIDDLEWARE):
+            middleware = import_string(path)(handler)
+            if hasattr(middleware, 'process_view'):
+                self.view_middleware.insert(0, middleware.process_view)
+            handler = middleware
+        self.scoped_handler = handler
+
+    def _scoped(self, request):
+        return not request.path_info.startswith(self.prefixes)
+
+    def __call__(self, request):
+        if self._scoped(request):
+            return self.scoped_handler(request)
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Django вызывает process_view только у middleware из MIDDLEWARE,
+        # поэтому вложенные (CsrfViewMiddleware) вызываются отсюда.
+        if not self._scoped(request):
+            return None
+        for process_view in self.view_middleware:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
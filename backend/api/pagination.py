@@ -1,4 +1,11 @@
+import base64
+import binascii
+from datetime import datetime
+
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 from foodgram_backend.constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
@@ -10,3 +17,51 @@ class LimitPageNumberPagination(PageNumberPagination):
     page_query_param = 'page'
     page_size_query_param = 'limit'
     max_page_size = MAX_PAGE_SIZE
+
+
+class KeysetPagination:
+    """
+    Курсорная пагинация по ключу (created_at, id) без OFFSET: курсор
+    хранит ключ последнего элемента страницы.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size = DEFAULT_PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        """Возвращает ключ (created_at, id) из запроса или None."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode('ascii'))
+            created_at, pk = raw.decode('utf-8').rsplit('|', 1)
+            return datetime.fromisoformat(created_at), int(pk)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, key):
+        created_at, pk = key
+        raw = f'{created_at.isoformat()}|{pk}'.encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    def get_paginated_response(self, request, data, last_key=None):
+        """Ответ со ссылкой на следующую страницу, если она есть."""
+        next_link = None
+        if last_key is not None:
+            next_link = replace_query_param(
+                request.build_absolute_uri(),
+                self.cursor_query_param,
+                self.encode_cursor(last_key),
+            )
+        return Response({'next': next_link, 'results': data})
@@ -14,5 +14,6 @@ class IsAuthorOrReadOnly(BasePermission):
         """
         return (
             request.method in SAFE_METHODS
-            or obj.author == request.user
+            # По author_id: автор рецепта не загружается отдельным запросом.
+            or obj.author_id == request.user.id
         )
@@ -0,0 +1,215 @@
+"""
+Офлайн-построение похожих рецептов.
+
+Каждый рецепт описывается разреженным вектором признаков: пользователи,
+добавившие его в избранное или список покупок (коллаборативная часть), и
+ингредиенты с весами IDF. Близость — взвешенная сумма косинусных мер по
+обеим частям; она считается блоками строк произведения FᵀF, так что в
+памяти одновременно лежит только блок результата. Для каждого рецепта
+сохраняются top-K соседей.
+"""
+from array import array
+
+import numpy as np
+from scipy import sparse
+
+from django.db import transaction
+
+from foodgram_backend.bulk import ChunkWriter
+from recipes.models import (
+    Favorite,
+    IngredientInRecipe,
+    Recipe,
+    RecipeSimilarity,
+    ShoppingCart
+)
+
+
+FAVORITE_WEIGHT = 1.0
+CART_WEIGHT = 0.5
+# Ингредиент встречается не больше чем в стольких рецептах — не отсекается
+# по max_df даже на небольшом каталоге.
+MIN_DF_LIMIT = 100
+
+
+def _load_pairs(queryset, fields, chunk_size):
+    """Потоково читает пары id в два массива int64."""
+    left, right = array('q'), array('q')
+    for a, b in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        left.append(a)
+        right.append(b)
+    return (
+        np.frombuffer(left, dtype=np.int64),
+        np.frombuffer(right, dtype=np.int64),
+    )
+
+
+def _normalize_columns(matrix):
+    """Делит столбцы (рецепты) на их L2-норму."""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    return matrix @ sparse.diags(1.0 / norms)
+
+
+def top_k(block, offset, k):
+    """
+    Для блока строк близости (рецепты offset.. против всех) возвращает
+    списки (строка, столбец, значение, ранг) первых k соседей строки.
+    """
+    block = block.tocsr()
+    indptr, indices, data = block.indptr, block.indices, block.data
+    result = ([], [], [], [])
+    for row in range(block.shape[0]):
+        cols = indices[indptr[row]:indptr[row + 1]]
+        vals = data[indptr[row]:indptr[row + 1]]
+        keep = (cols != row + offset) & (vals > 0)
+        cols, vals = cols[keep], vals[keep]
+        if len(vals) > k:
+            best = np.argpartition(-vals, k - 1)[:k]
+            cols, vals = cols[best], vals[best]
+        order = np.lexsort((cols, -vals))
+        result[0].append(np.full(len(order), row + offset))
+        result[1].append(cols[order])
+        result[2].append(vals[order])
+        result[3].append(np.arange(len(order)))
+    return tuple(
+        np.concatenate(part) if part else np.empty(0, dtype=np.int64)
+        for part in result
+    )
+
+
+class SimilarityBuilder:
+    """Строит и сохраняет top-K похожих рецептов."""
+
+    def __init__(
+        self,
+        *,
+        top_k=20,
+        alpha=0.7,
+        block_size=2000,
+        max_df=0.05,
+        max_user_items=500,
+        chunk_size=100000,
+        progress=None,
+    ):
+        self.top_k = top_k
+        self.alpha = alpha
+        self.block_size = block_size
+        self.max_df = max_df
+        self.max_user_items = max_user_items
+        self.chunk_size = chunk_size
+        self.progress = progress or (lambda message: None)
+
+    @transaction.atomic
+    def run(self):
+        """Пересчитывает таблицу RecipeSimilarity и возвращает число строк."""
+        recipe_ids = np.fromiter(
+            Recipe.objects.order_by('id').values_list('id', flat=True)
+            .iterator(chunk_size=self.chunk_size),
+            dtype=np.int64,
+        )
+        RecipeSimilarity.objects.all().delete()
+        writer = ChunkWriter(
+            RecipeSimilarity,
+            ('recipe', 'similar', 'score', 'rank'),
+            chunk_size=self.chunk_size,
+        )
+        if len(recipe_ids) < 2:
+            return 0
+        features = self._features(recipe_ids)
+        self.progress(
+            f'Признаки: {features.shape[0]} x {features.shape[1]}, '
+            f'ненулевых {features.nnz}'
+        )
+        features = features.tocsc()
+        transposed = features.T.tocsr()
+        for start in range(0, len(recipe_ids), self.block_size):
+            stop = min(start + self.block_size, len(recipe_ids))
+            rows, cols, vals, ranks = top_k(
+                transposed[start:stop] @ features, start, self.top_k
+            )
+            for row in zip(
+                recipe_ids[rows].tolist(),
+                recipe_ids[cols].tolist(),
+                np.round(vals, 6).tolist(),
+                ranks.tolist(),
+            ):
+                writer.add(row)
+            self.progress(f'Рецепты: {stop}/{len(recipe_ids)}')
+        writer.flush()
+        return writer.written
+
+    def _features(self, recipe_ids):
+        """Матрица признаков x рецепты с уже взвешенными частями."""
+        parts = []
+        interactions = self._interactions(recipe_ids)
+        if interactions is not None:
+            parts.append(np.sqrt(self.alpha) * interactions)
+        ingredients = self._ingredients(recipe_ids)
+        if ingredients is not None:
+            weight = 1 - self.alpha if interactions is not None else 1.0
+            parts.append(np.sqrt(weight) * ingredients)
+        if not parts:
+            return sparse.csr_matrix((1, len(recipe_ids)))
+        return sparse.vstack(parts).tocsr()
+
+    def _matrix(self, feature_ids, recipe_pks, recipe_ids, weights):
+        columns = np.searchsorted(recipe_ids, recipe_pks)
+        # Связи с рецептами, созданными после чтения списка, отбрасываются.
+        known = recipe_ids[np.minimum(columns, len(recipe_ids) - 1)] == (
+            recipe_pks
+        )
+        feature_ids, columns, weights = (
+            feature_ids[known], columns[known], weights[known]
+        )
+        features, rows = np.unique(feature_ids, return_inverse=True)
+        return sparse.csr_matrix(
+            (weights, (rows, columns)),
+            shape=(len(features), len(recipe_ids)),
+        )
+
+    def _interactions(self, recipe_ids):
+        favorite_users, favorite_recipes = _load_pairs(
+            Favorite.objects, ('user_id', 'recipe_id'), self.chunk_size
+        )
+        cart_users, cart_recipes = _load_pairs(
+            ShoppingCart.objects, ('user_id', 'recipe_id'), self.chunk_size
+        )
+        users = np.concatenate((favorite_users, cart_users))
+        if not len(users):
+            return None
+        weights = np.concatenate((
+            np.full(len(favorite_users), FAVORITE_WEIGHT),
+            np.full(len(cart_users), CART_WEIGHT),
+        ))
+        matrix = self._matrix(
+            users,
+            np.concatenate((favorite_recipes, cart_recipes)),
+            recipe_ids,
+            weights,
+        )
+        # Повторы (избранное и корзина) складываются; слишком активные
+        # пользователи дают квадратичное число пар и мало сигнала.
+        active = np.diff(matrix.indptr) <= self.max_user_items
+        return _normalize_columns(matrix[active])
+
+    def _ingredients(self, recipe_ids):
+        ingredients, recipes = _load_pairs(
+            IngredientInRecipe.objects,
+            ('ingredient_id', 'recipe_id'),
+            self.chunk_size,
+        )
+        if not len(ingredients):
+            return None
+        matrix = self._matrix(
+            ingredients, recipes, recipe_ids, np.ones(len(ingredients))
+        )
+        document_frequency = np.diff(matrix.indptr)
+        # Вездесущие ингредиенты (соль, вода) не различают рецепты и делают
+        # произведение плотным.
+        limit = max(self.max_df * len(recipe_ids), MIN_DF_LIMIT)
+        idf = np.log(len(recipe_ids) / np.maximum(document_frequency, 1))
+        idf[document_frequency > limit] = 0
+        weighted = (sparse.diags(idf) @ matrix).tocsr()
+        weighted.eliminate_zeros()
+        return _normalize_columns(weighted)
@@ -1,16 +1,23 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
-from api.services import build_absolute_file_url
+from api import metrics
+from api.cook_index import cook_index
+from api.services import build_absolute_file_url, create_unique
 from foodgram_backend.constants import (
+    COOK_MAX_INGREDIENTS,
+    COOK_MAX_MISSING,
     MIN_COOKING_TIME_MINUTES,
     MIN_INGREDIENT_AMOUNT,
+    RECIPE_BATCH_MAX_SIZE,
 )
 from recipes.models import (
     Favorite,
     Ingredient,
+    IngredientChange,
     IngredientInRecipe,
     Recipe,
     ShoppingCart,
@@ -22,12 +29,72 @@ from users.models import Subscription
 User = get_user_model()
 
 
+def sparse_fields(request, available):
+    """
+    Поля ответа по параметрам ?fields=a,b и ?omit=c: непустое
+    подмножество available или None, если параметров нет. Неизвестные
+    имена и пустой выбор — ошибка валидации (400).
+    """
+    params = getattr(request, 'query_params', None)
+    if not params or not (params.get('fields') or params.get('omit')):
+        return None
+    available = set(available)
+    selected = set(available)
+    for param in ('fields', 'omit'):
+        names = {
+            name.strip() for name in params.get(param, '').split(',')
+        } - {''}
+        if not names:
+            continue
+        unknown = names - available
+        if unknown:
+            raise serializers.ValidationError({param: [
+                'Неизвестные поля: ' + ', '.join(sorted(unknown)) + '.'
+            ]})
+        if param == 'fields':
+            selected &= names
+        else:
+            selected -= names
+    if not selected:
+        raise serializers.ValidationError({
+            'omit': ['Не осталось ни одного поля.']
+        })
+    return selected
+
+
+class SparseFieldsMixin:
+    """
+    Ответ только с полями из ?fields= / без полей из ?omit= (sparse_fields).
+    Действует на корневой сериализатор ответа, вложенные (автор рецепта)
+    отдаются целиком.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+        selected = sparse_fields(self.context.get('request'), fields)
+        if selected is None:
+            return fields
+        return {
+            name: field for name, field in fields.items() if name in selected
+        }
+
+
 # Пользователи:
 class SetAvatarSerializer(serializers.Serializer):
     """Сериализатор установки аватара пользователя из base64-строки."""
 
     avatar = Base64ImageField(required=True)
 
+    def validate_avatar(self, value):
+        """Учитывает размер загружаемого аватара в метриках."""
+        metrics.image_upload_bytes.observe(value.size, field='avatar')
+        return value
+
     def save(self, **kwargs):
         """Декодирует base64 и сохраняет аватар текущего пользователя."""
         user = self.context['request'].user
@@ -45,7 +112,7 @@ class SetAvatarSerializer(serializers.Serializer):
         return instance
 
 
-class UserSerializer(DjoserUserSerializer):
+class UserSerializer(SparseFieldsMixin, DjoserUserSerializer):
     """Сериализатор пользователя для чтения данных профиля."""
 
     is_subscribed = serializers.SerializerMethodField()
@@ -58,6 +125,8 @@ class UserSerializer(DjoserUserSerializer):
 
     def get_is_subscribed(self, obj):
         """Возвращает True, если текущий пользователь подписан на автора."""
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return bool(
             request
@@ -91,6 +160,17 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class IngredientChangeSerializer(serializers.ModelSerializer):
+    """Запись журнала изменений каталога ингредиентов."""
+
+    version = serializers.IntegerField(source='id')
+    id = serializers.IntegerField(source='ingredient_id')
+
+    class Meta:
+        model = IngredientChange
+        fields = ('version', 'operation', 'id', 'name', 'measurement_unit')
+
+
 # Сериализаторы рецептов
 
 class RecipeMinifiedSerializer(serializers.ModelSerializer):
@@ -109,6 +189,32 @@ class RecipeMinifiedSerializer(serializers.ModelSerializer):
         return build_absolute_file_url(request, obj.image)
 
 
+class CookQuerySerializer(serializers.Serializer):
+    """Параметры подбора рецептов по имеющимся ингредиентам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=COOK_MAX_INGREDIENTS,
+    )
+    max_missing = serializers.IntegerField(
+        min_value=0, max_value=COOK_MAX_MISSING, default=0
+    )
+
+    def to_internal_value(self, data):
+        """Принимает ingredients=1,2,3 и повторяющийся параметр."""
+        ingredients = [
+            value
+            for item in data.getlist('ingredients')
+            for value in item.split(',')
+            if value.strip()
+        ]
+        return super().to_internal_value({
+            'ingredients': ingredients,
+            'max_missing': data.get('max_missing', 0),
+        })
+
+
 class IngredientInRecipeReadSerializer(serializers.ModelSerializer):
     """Сериализатор ингредиента в составе рецепта (чтение)."""
 
@@ -124,13 +230,32 @@ class IngredientInRecipeReadSerializer(serializers.ModelSerializer):
 
 
 class IngredientAmountWriteSerializer(serializers.Serializer):
-    """Элемент списка ингредиентов при создании/редактировании рецепта."""
+    """
+    Элемент списка ингредиентов при создании/редактировании рецепта; id
+    заменяет на ингредиент RecipeWriteSerializer — одним запросом на список.
+    """
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField(min_value=1)
     amount = serializers.IntegerField(min_value=MIN_INGREDIENT_AMOUNT)
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+def objects_by_ids(queryset, ids):
+    """
+    Объекты queryset в порядке ids одним запросом и ошибки как у
+    PrimaryKeyRelatedField: {позиция: сообщение} для неизвестных id.
+    """
+    found = queryset.in_bulk(ids)
+    message = serializers.PrimaryKeyRelatedField.default_error_messages[
+        'does_not_exist'
+    ]
+    errors = {
+        position: message.format(pk_value=pk)
+        for position, pk in enumerate(ids) if pk not in found
+    }
+    return [found.get(pk) for pk in ids], errors
+
+
+class RecipeReadSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор рецепта для чтения."""
 
     tags = TagSerializer(many=True, read_only=True)
@@ -164,9 +289,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
     author = serializers.HiddenField(default=serializers.CurrentUserDefault())
     ingredients = IngredientAmountWriteSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all()
-    )
+    tags = serializers.ListField(child=serializers.IntegerField(min_value=1))
     image = Base64ImageField()
     cooking_time = serializers.IntegerField(
         min_value=MIN_COOKING_TIME_MINUTES
@@ -203,9 +326,33 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             })
         return attrs
 
+    def validate_ingredients(self, value):
+        """Заменяет id ингредиентов на объекты одним запросом."""
+        ingredients, errors = objects_by_ids(
+            Ingredient.objects.filter(is_active=True),
+            [item['id'] for item in value],
+        )
+        if errors:
+            raise serializers.ValidationError([
+                {'id': [errors[position]]} if position in errors else {}
+                for position in range(len(value))
+            ])
+        return [
+            {**item, 'id': ingredient}
+            for item, ingredient in zip(value, ingredients)
+        ]
+
+    def validate_tags(self, value):
+        """Заменяет id тегов на объекты одним запросом."""
+        tags, errors = objects_by_ids(Tag.objects.all(), value)
+        if errors:
+            raise serializers.ValidationError(list(errors.values()))
+        return tags
+
     def validate_image(self, value):
         if not value:
             raise serializers.ValidationError('Обязательное поле.')
+        metrics.image_upload_bytes.observe(value.size, field='recipe')
         return value
 
     @staticmethod
@@ -219,6 +366,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             )
             for item in ingredients
         )
+        cook_index.record_change(recipe.id)
 
     def create(self, validated_data):
         """Создает рецепт, устанавливает теги и ингредиенты."""
@@ -242,10 +390,35 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         return instance
 
     def to_representation(self, instance):
-        """Возвращает представление через сериализатор чтения рецепта."""
+        """
+        Возвращает представление через сериализатор чтения рецепта: теги
+        и состав — двумя запросами, автор — текущий пользователь, на себя
+        он не подписан.
+        """
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'ingredient_in_recipes',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient'
+                ),
+            ),
+        )
+        instance.author.is_subscribed = False
         return RecipeReadSerializer(instance, context=self.context).data
 
 
+def recipes_limit(request):
+    """Параметр ?recipes_limit=: неотрицательное число или None."""
+    params = getattr(request, 'query_params', None)
+    try:
+        limit = int(params.get('recipes_limit'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+    return limit if limit >= 0 else None
+
+
 class UserWithRecipesSerializer(UserSerializer):
     """Сериализатор пользователя с его рецептами и их количеством."""
 
@@ -257,47 +430,48 @@ class UserWithRecipesSerializer(UserSerializer):
         read_only_fields = fields
 
     def get_recipes(self, obj):
-        """Возвращает рецепты автора; учитывает параметр recipes_limit."""
-        request = self.context.get('request')
-        limit = None
-        if request:
-            try:
-                raw_limit = request.query_params.get('recipes_limit')
-                limit = int(raw_limit) if raw_limit is not None else None
-            except Exception:
-                limit = None
-        qs = obj.recipes.all()
-        qs = qs[:limit]
+        """
+        Возвращает рецепты автора; учитывает параметр recipes_limit.
+        Список подписок передает их заранее в obj.limited_recipes.
+        """
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            limit = recipes_limit(self.context.get('request'))
+            recipes = obj.recipes.all()[:limit]
         return RecipeMinifiedSerializer(
-            qs,
+            recipes,
             many=True,
             context=self.context
         ).data
 
 
 class SubscriptionCreateSerializer(serializers.ModelSerializer):
-    """Сериализатор создания подписки пользователя на автора."""
+    """
+    Сериализатор создания подписки пользователя на автора; user и author
+    передаются в save().
+    """
 
     class Meta:
         model = Subscription
         fields = ('user', 'author')
+        read_only_fields = fields
 
-    def validate(self, attrs):
-        """Запрещает подписку на себя и повторную подписку."""
-        user = attrs.get('user')
-        author = attrs.get('author')
-
-        if user == author:
+    def create(self, validated_data):
+        """Запрещает подписку на себя; повтор ловит уникальный индекс."""
+        user = validated_data['user']
+        author = validated_data['author']
+        if user.pk == author.pk:
             raise serializers.ValidationError({
                 'detail': 'Нельзя подписаться на себя.'
             })
-
-        if Subscription.objects.filter(user=user, author=author).exists():
+        subscription = create_unique(Subscription, user=user, author=author)
+        if subscription is None:
             raise serializers.ValidationError({
                 'detail': 'Подписка уже существует.'
             })
-
-        return attrs
+        # Автор из ответа — подписка только что оформлена.
+        author.is_subscribed = True
+        return subscription
 
     def to_representation(self, instance):
         """Возвращает данные автора подписки как в списке подписок."""
@@ -308,16 +482,19 @@ class SubscriptionCreateSerializer(serializers.ModelSerializer):
 
 
 class RecipeRelationCreateSerializer(serializers.ModelSerializer):
-    """Базовый сериализатор для связей пользователь↔рецепт."""
+    """
+    Базовый сериализатор для связей пользователь↔рецепт; user и recipe
+    передаются в save().
+    """
 
-    def validate(self, attrs):
-        user = attrs.get('user')
-        recipe = attrs.get('recipe')
+    def create(self, validated_data):
+        """Повтор ловит уникальный индекс, а не отдельный запрос."""
         model = self.Meta.model
-        if model.objects.filter(user=user, recipe=recipe).exists():
+        relation = create_unique(model, **validated_data)
+        if relation is None:
             verbose = getattr(model._meta, 'verbose_name', 'этом списке')
             raise serializers.ValidationError({'detail': f'Уже в {verbose}.'})
-        return attrs
+        return relation
 
     def to_representation(self, instance):
         return RecipeMinifiedSerializer(
@@ -326,12 +503,27 @@ class RecipeRelationCreateSerializer(serializers.ModelSerializer):
         ).data
 
 
+class RecipeBatchSerializer(serializers.Serializer):
+    """Id рецептов для пакетного добавления в избранное и список покупок."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=RECIPE_BATCH_MAX_SIZE,
+    )
+
+    def validate_recipes(self, value):
+        """Убирает повторы, сохраняя порядок."""
+        return list(dict.fromkeys(value))
+
+
 class FavoriteCreateSerializer(RecipeRelationCreateSerializer):
     """Сериализатор добавления рецепта в избранное."""
 
     class Meta:
         model = Favorite
         fields = ('user', 'recipe')
+        read_only_fields = fields
 
 
 class ShoppingCartCreateSerializer(RecipeRelationCreateSerializer):
@@ -340,3 +532,4 @@ class ShoppingCartCreateSerializer(RecipeRelationCreateSerializer):
     class Meta:
         model = ShoppingCart
         fields = ('user', 'recipe')
+        read_only_fields = fields
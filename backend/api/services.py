@@ -1,9 +1,21 @@
+import hashlib
+import os
+import threading
+import time
 from io import BytesIO
+from pathlib import Path
 from typing import Iterable, Optional
 
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.http import HttpResponse
+
 from foodgram_backend.constants import SHOPPING_LIST_FORMAT
 
 
+_pruned_at: dict[Path, float] = {}
+
+
 def build_absolute_file_url(request, file_field) -> Optional[str]:
     """Возвращает абсолютный URL для File/ImageField или None."""
     if not file_field:
@@ -19,6 +31,27 @@ def build_absolute_file_url(request, file_field) -> Optional[str]:
     return url
 
 
+def create_unique(model, **fields):
+    """
+    Создает строку одним INSERT без проверки exists(): при нарушении
+    уникальности (повтор, двойной клик) возвращает None. Точка сохранения
+    нужна только внутри транзакции, чтобы ошибка не прервала ее; в
+    автокоммите INSERT откатывается сам.
+    """
+    using = router.db_for_write(model)
+    try:
+        if connections[using].in_atomic_block:
+            with transaction.atomic(using=using):
+                return model.objects.using(using).create(**fields)
+        return model.objects.using(using).create(**fields)
+    except IntegrityError:
+        # Повтор — только если строка есть. Иначе нарушено другое
+        # ограничение (рецепт или автор удалены, CHECK): ошибка как есть.
+        if model.objects.using(using).filter(**fields).exists():
+            return None
+        raise
+
+
 def format_shopping_list(ingredients: Iterable[dict]) -> BytesIO:
     """Формирует файл со списком покупок в формате, заданном константой."""
     fmt = SHOPPING_LIST_FORMAT.lower()
@@ -35,3 +68,45 @@ def format_shopping_list(ingredients: Iterable[dict]) -> BytesIO:
         buffer.seek(0)
         return buffer
     raise ValueError('Unsupported shopping list format')
+
+
+def protected_file_response(
+    content: bytes, directory: str, filename: str, content_type: str
+) -> HttpResponse:
+    """
+    Ответ с X-Accel-Redirect: файл с именем по хешу содержимого пишется в
+    PROTECTED_MEDIA_ROOT/directory, а отдает его nginx.
+    """
+    digest = hashlib.sha256(content).hexdigest()[:32]
+    relative = f'{directory}/{digest}{Path(filename).suffix}'
+    path = Path(settings.PROTECTED_MEDIA_ROOT) / relative
+    if path.exists():
+        # Свежее время изменения: файл не удалится как устаревший.
+        os.utime(path)
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(
+            f'.{path.name}.{os.getpid()}.{threading.get_ident()}'
+        )
+        temporary.write_bytes(content)
+        os.replace(temporary, path)
+    _prune(path.parent)
+    response = HttpResponse(content_type=content_type)
+    response['X-Accel-Redirect'] = settings.PROTECTED_MEDIA_URL + relative
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _prune(directory: Path) -> None:
+    """Не чаще раза в PROTECTED_MEDIA_TTL удаляет устаревшие файлы."""
+    ttl = settings.PROTECTED_MEDIA_TTL
+    now = time.time()
+    if now - _pruned_at.get(directory, 0) < ttl:
+        return
+    _pruned_at[directory] = now
+    for path in directory.iterdir():
+        try:
+            if now - path.stat().st_mtime > ttl:
+                path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,41 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api import feed, metrics
+from api.cook_index import cook_index
+from recipes.models import Recipe
+from users.models import Subscription
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_new_recipe(sender, instance, created, raw=False, **kwargs):
+    """Раскладывает новый рецепт по лентам подписчиков."""
+    if created and not raw:
+        feed.fan_out_recipe(instance)
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_feed(sender, instance, created, raw=False, **kwargs):
+    """Наполняет ленту рецептами автора при подписке."""
+    if created and not raw:
+        feed.backfill_subscription(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def clear_feed(sender, instance, **kwargs):
+    """Убирает рецепты автора из ленты при отписке."""
+    feed.remove_subscription(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def drop_from_cook_index(sender, instance, **kwargs):
+    """Убирает удаленный рецепт из индекса подбора по продуктам."""
+    cook_index.record_change(instance.id)
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    """Считает новые соединения; соединения пула считает record_pool_stats."""
+    if getattr(connection, 'pool', None) is None:
+        metrics.db_connections_opened_total.inc(alias=connection.alias)
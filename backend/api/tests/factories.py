@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+def create_user(username):
+    return User.objects.create_user(
+        email=f'{username}@example.org',
+        username=username,
+        first_name='Имя',
+        last_name='Фамилия',
+        password='password',
+    )
+
+
+def create_recipe(author, name, **fields):
+    fields.setdefault('image', 'recipes/images/recipe.png')
+    fields.setdefault('text', 'Описание')
+    fields.setdefault('cooking_time', 10)
+    return Recipe.objects.create(author=author, name=name, **fields)
@@ -0,0 +1,128 @@
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.tests.factories import create_recipe, create_user
+from foodgram_backend.constants import RECIPE_BATCH_MAX_SIZE
+from recipes.models import Favorite, ShoppingCart
+
+MISSING_ID = 999999
+ENDPOINTS = (
+    ('/api/recipes/favorite/', Favorite),
+    ('/api/recipes/shopping_cart/', ShoppingCart),
+)
+
+
+class RecipeBatchTests(TestCase):
+    """Пакетное добавление и удаление избранного и списка покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.other = create_user('other')
+        cls.token = Token.objects.create(user=cls.user)
+        author = create_user('author')
+        cls.recipes = [
+            create_recipe(author, f'Рецепт {number}') for number in range(60)
+        ]
+        cls.ids = [recipe.id for recipe in cls.recipes]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def send(self, method, url, recipe_ids, status=200):
+        response = getattr(self.client, method)(
+            url, {'recipes': recipe_ids}, format='json'
+        )
+        self.assertEqual(response.status_code, status, response.data)
+        return response.data
+
+    def statuses(self, data):
+        return [(item['id'], item['status']) for item in data['results']]
+
+    def linked(self, model, user=None):
+        return set(model.objects.filter(
+            user=user or self.user
+        ).values_list('recipe_id', flat=True))
+
+    def test_add_statuses(self):
+        first, second, third = self.ids[:3]
+        for url, model in ENDPOINTS:
+            with self.subTest(url=url):
+                model.objects.create(user=self.user, recipe_id=first)
+                data = self.send('post', url, [
+                    first, second, second, MISSING_ID, third, first,
+                ])
+                self.assertEqual(self.statuses(data), [
+                    (first, 'exists'),
+                    (second, 'added'),
+                    (MISSING_ID, 'not_found'),
+                    (third, 'added'),
+                ])
+                self.assertEqual(self.linked(model), {first, second, third})
+
+    def test_remove_statuses(self):
+        first, second, third = self.ids[:3]
+        for url, model in ENDPOINTS:
+            with self.subTest(url=url):
+                for recipe_id in (first, second):
+                    model.objects.create(user=self.user, recipe_id=recipe_id)
+                model.objects.create(user=self.other, recipe_id=third)
+                data = self.send('delete', url, [
+                    second, second, third, MISSING_ID,
+                ])
+                self.assertEqual(self.statuses(data), [
+                    (second, 'removed'),
+                    (third, 'absent'),
+                    (MISSING_ID, 'absent'),
+                ])
+                self.assertEqual(self.linked(model), {first})
+                self.assertEqual(self.linked(model, self.other), {third})
+
+    def test_batch_size_limit(self):
+        too_many = list(range(1, RECIPE_BATCH_MAX_SIZE + 2))
+        for url, _ in ENDPOINTS:
+            for method in ('post', 'delete'):
+                with self.subTest(url=url, method=method):
+                    data = self.send(method, url, too_many, status=400)
+                    self.assertIn('recipes', data)
+                    self.send(method, url, [], status=400)
+                    self.send(
+                        method, url, too_many[:RECIPE_BATCH_MAX_SIZE]
+                    )
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        # Токен, рецепты с отметкой «уже добавлен», вставка.
+        added = 3
+        # Токен, существующие связи, удаление.
+        removed = 3
+        for url, model in ENDPOINTS:
+            for size in (1, len(self.ids) - 1):
+                with self.subTest(url=url, size=size):
+                    batch = self.ids[:size] + [MISSING_ID]
+                    with self.assertNumQueries(added):
+                        self.send('post', url, batch)
+                    with self.assertNumQueries(removed):
+                        self.send('delete', url, batch)
+                    self.assertEqual(self.linked(model), set())
+
+    def test_clear_shopping_cart(self):
+        for recipe_id in self.ids[:2]:
+            ShoppingCart.objects.create(user=self.user, recipe_id=recipe_id)
+        ShoppingCart.objects.create(user=self.other, recipe_id=self.ids[0])
+        Favorite.objects.create(user=self.user, recipe_id=self.ids[0])
+
+        url = '/api/recipes/shopping_cart/clear/'
+        self.assertEqual(self.client.delete(url).data, {'removed': 2})
+        self.assertEqual(self.client.delete(url).data, {'removed': 0})
+        self.assertEqual(self.linked(ShoppingCart), set())
+        self.assertEqual(self.linked(ShoppingCart, self.other), {self.ids[0]})
+        self.assertEqual(self.linked(Favorite), {self.ids[0]})
+
+    def test_requires_authentication(self):
+        for url, _ in ENDPOINTS:
+            response = APIClient().post(
+                url, {'recipes': self.ids[:1]}, format='json'
+            )
+            self.assertEqual(response.status_code, 401)
@@ -0,0 +1,176 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.cook_index import HAS_NUMPY, CookIndex, cook_index
+from api.tests.factories import create_recipe, create_user
+from recipes.models import Ingredient, IngredientInRecipe, RecipeChange
+
+
+class CookIndexJournalTests(TestCase):
+    """Индекс догоняет журнал RecipeChange, записанный другим процессом."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.salt, cls.egg, cls.milk = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г')
+            for name in ('соль', 'яйцо', 'молоко')
+        )
+        cls.omelette = cls.create_recipe('Омлет', cls.egg, cls.milk)
+
+    @classmethod
+    def create_recipe(cls, name, *ingredients):
+        recipe = create_recipe(cls.author, name)
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=recipe, ingredient=item, amount=1)
+            for item in ingredients
+        )
+        cook_index.record_change(recipe.id)
+        return recipe
+
+    def indexes(self):
+        modes = (False, True) if HAS_NUMPY else (False,)
+        for use_numpy in modes:
+            with self.subTest(use_numpy=use_numpy):
+                index = CookIndex(use_numpy=use_numpy)
+                index.build()
+                yield index
+
+    def found(self, index, *ingredients):
+        _, ranked = index.search(
+            [item.id for item in ingredients], max_missing=0
+        )
+        return [recipe_id for recipe_id, *_ in ranked]
+
+    def test_catches_up_with_new_changed_and_deleted_recipes(self):
+        for index in self.indexes():
+            eggs = self.create_recipe('Яйцо вкрутую', self.egg, self.salt)
+            self.assertEqual(
+                self.found(index, self.egg, self.salt), [eggs.id]
+            )
+
+            IngredientInRecipe.objects.filter(
+                recipe=self.omelette, ingredient=self.milk
+            ).delete()
+            cook_index.record_change(self.omelette.id)
+            self.assertEqual(
+                self.found(index, self.egg), [self.omelette.id]
+            )
+
+            eggs.delete()
+            self.assertEqual(self.found(index, self.egg, self.salt), [
+                self.omelette.id
+            ])
+            self.assertEqual(
+                index._state.version, RecipeChange.current_version()
+            )
+            IngredientInRecipe.objects.create(
+                recipe=self.omelette, ingredient=self.milk, amount=1
+            )
+
+    def test_change_committed_out_of_id_order(self):
+        for index in self.indexes():
+            eggs = self.create_recipe('Яйцо вкрутую', self.egg)
+            # id выдан транзакции, которая зафиксируется позже следующей.
+            late = RecipeChange.objects.create(recipe_id=eggs.id)
+            late.delete()
+            cook_index.record_change(self.omelette.id)
+            self.assertEqual(self.found(index, self.egg), [eggs.id])
+
+            IngredientInRecipe.objects.create(
+                recipe=eggs, ingredient=self.salt, amount=1
+            )
+            RecipeChange.objects.create(id=late.id, recipe_id=eggs.id)
+            self.assertEqual(self.found(index, self.egg), [])
+            self.assertEqual(
+                self.found(index, self.egg, self.salt), [eggs.id]
+            )
+            eggs.delete()
+
+    def test_catch_up_does_not_change_published_snapshot(self):
+        for index in self.indexes():
+            old = index._state
+            sizes = list(old.sizes)
+            postings = {
+                key: list(value) for key, value in old.postings.items()
+            }
+            bitmaps = {
+                key: bytes(value) for key, value in old.bitmaps.items()
+            }
+
+            IngredientInRecipe.objects.create(
+                recipe=self.omelette, ingredient=self.salt, amount=1
+            )
+            cook_index.record_change(self.omelette.id)
+            self.create_recipe('Соленое молоко', self.milk, self.salt)
+            self.found(index, self.salt)
+
+            self.assertIsNot(index._state, old)
+            self.assertEqual(list(old.sizes), sizes)
+            self.assertEqual(
+                {key: list(value) for key, value in old.postings.items()},
+                postings,
+            )
+            self.assertEqual(
+                {key: bytes(value) for key, value in old.bitmaps.items()},
+                bitmaps,
+            )
+            IngredientInRecipe.objects.filter(
+                recipe=self.omelette, ingredient=self.salt
+            ).delete()
+            cook_index.record_change(self.omelette.id)
+
+    def test_generated_recipes_are_journaled(self):
+        for index in self.indexes():
+            call_command(
+                'generate_dataset', users=5, recipes=30, favorites=0,
+                cart_items=0, subscriptions=0, seed=int(index.use_numpy),
+                stdout=StringIO(),
+            )
+            index.search([self.egg.id])
+            self.assertEqual(
+                index._state.size,
+                IngredientInRecipe.objects.values('recipe').distinct().count(),
+            )
+            self.assertEqual(
+                index._state.version, RecipeChange.current_version()
+            )
+
+    def test_up_to_date_search_reads_only_version(self):
+        for index in self.indexes():
+            with self.assertNumQueries(1):
+                self.found(index, self.egg, self.milk)
+
+
+class CookEndpointTests(TestCase):
+    """Удаление рецепта через API сразу видно в подборе."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.egg = Ingredient.objects.create(name='яйцо', measurement_unit='шт')
+        cls.recipe = create_recipe(cls.author, 'Яичница')
+        IngredientInRecipe.objects.create(
+            recipe=cls.recipe, ingredient=cls.egg, amount=2
+        )
+
+    def setUp(self):
+        cook_index._state = None
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def cook(self):
+        response = self.client.get(
+            '/api/recipes/cook/', {'ingredients': self.egg.id}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [card['id'] for card in response.json()['results']]
+
+    def test_deleted_recipe_leaves_index(self):
+        self.assertEqual(self.cook(), [self.recipe.id])
+        response = self.client.delete(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.cook(), [])
@@ -0,0 +1,164 @@
+import base64
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.tests.factories import create_recipe, create_user
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription
+
+FEED_URL = '/api/recipes/feed/'
+
+
+@override_settings(FEED_FANOUT_LIMIT=2)
+class FeedTests(TestCase):
+    """
+    Лента подписок: входящие обычных авторов и рецепты популярного автора
+    (больше FEED_FANOUT_LIMIT подписчиков), подмешанные при чтении.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = create_user('reader')
+        cls.author = create_user('author')
+        cls.star = create_user('star')
+        cls.stranger = create_user('stranger')
+        cls.fans = [create_user(f'fan{number}') for number in range(2)]
+        cls.moment = timezone.now() - timedelta(days=1)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def subscribe(self, user, author):
+        return Subscription.objects.create(user=user, author=author)
+
+    def follow_star(self):
+        for user in (*self.fans, self.reader):
+            self.subscribe(user, self.star)
+        # Подписки закешировали список популярных до того, как star стал
+        # популярным; в жизни он обновляется через FEED_CELEBRITIES_TTL.
+        cache.clear()
+
+    def publish(self, author, name, minutes=0):
+        with mock.patch(
+            'django.utils.timezone.now',
+            return_value=self.moment + timedelta(minutes=minutes),
+        ):
+            return create_recipe(author, name)
+
+    def feed(self, **params):
+        response = self.client.get(FEED_URL, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def names(self, **params):
+        return [recipe['name'] for recipe in self.feed(**params)['results']]
+
+    def inbox(self, user):
+        return set(
+            FeedEntry.objects.filter(user=user)
+            .values_list('recipe__name', flat=True)
+        )
+
+    def test_merges_inbox_and_celebrity_recipes(self):
+        self.subscribe(self.reader, self.author)
+        self.follow_star()
+        self.publish(self.author, 'Автор 1', 1)
+        self.publish(self.star, 'Звезда 1', 2)
+        self.publish(self.author, 'Автор 2', 3)
+        self.publish(self.stranger, 'Чужой', 4)
+
+        data = self.feed()
+        self.assertEqual(
+            [recipe['name'] for recipe in data['results']],
+            ['Автор 2', 'Звезда 1', 'Автор 1'],
+        )
+        self.assertTrue(all(
+            recipe['author']['is_subscribed'] for recipe in data['results']
+        ))
+        self.assertIsNone(data['next'])
+        # Рецепты популярного автора во входящие не пишутся.
+        self.assertEqual(self.inbox(self.reader), {'Автор 1', 'Автор 2'})
+
+    def test_requires_authentication(self):
+        self.assertEqual(APIClient().get(FEED_URL).status_code, 401)
+
+    def test_cursor_round_trip_with_equal_dates(self):
+        self.subscribe(self.reader, self.author)
+        self.follow_star()
+        recipes = [
+            self.publish(author, f'Рецепт {number}')
+            for number, author in enumerate(
+                [self.author, self.star] * 3 + [self.author]
+            )
+        ]
+        self.publish(self.author, 'Старый', -1)
+        expected = [
+            recipe.name
+            for recipe in sorted(recipes, key=lambda r: r.id, reverse=True)
+        ] + ['Старый']
+
+        names = []
+        data = self.feed(limit=2)
+        while True:
+            self.assertLessEqual(len(data['results']), 2)
+            names.extend(recipe['name'] for recipe in data['results'])
+            if data['next'] is None:
+                break
+            response = self.client.get(data['next'])
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+        self.assertEqual(names, expected)
+
+    def test_invalid_cursor_is_404(self):
+        broken = base64.urlsafe_b64encode(b'not-a-date|1').decode()
+        for cursor in ('%%%', 'bm90LWJhc2U2NA', broken):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(FEED_URL, {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_subscription_and_recipe_signals_maintain_inbox(self):
+        self.publish(self.author, 'До подписки', 1)
+        subscription = self.subscribe(self.reader, self.author)
+        self.assertEqual(self.inbox(self.reader), {'До подписки'})
+
+        recipe = self.publish(self.author, 'После подписки', 2)
+        self.assertEqual(
+            self.inbox(self.reader), {'До подписки', 'После подписки'}
+        )
+
+        recipe.delete()
+        self.assertEqual(self.inbox(self.reader), {'До подписки'})
+        self.assertEqual(self.names(), ['До подписки'])
+
+        subscription.delete()
+        self.assertEqual(self.inbox(self.reader), set())
+        self.assertEqual(self.names(), [])
+
+    def test_author_leaving_celebrities_keeps_recipes(self):
+        self.follow_star()
+        self.publish(self.star, 'Популярный период', 1)
+        self.assertEqual(self.inbox(self.reader), set())
+        self.assertEqual(self.names(), ['Популярный период'])
+
+        Subscription.objects.filter(
+            user=self.fans[0], author=self.star
+        ).delete()
+        for user in (self.reader, self.fans[1]):
+            self.assertEqual(self.inbox(user), {'Популярный период'})
+        self.assertEqual(self.inbox(self.fans[0]), set())
+
+        # Кеш популярных авторов истек: рецепт остается в ленте.
+        cache.clear()
+        self.assertEqual(self.names(), ['Популярный период'])
+        self.publish(self.star, 'Обычный период', 2)
+        self.assertEqual(
+            self.names(), ['Обычный период', 'Популярный период']
+        )
+        self.assertEqual(Recipe.objects.filter(author=self.star).count(), 2)
@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient
+
+User = get_user_model()
+
+
+@override_settings(
+    DEBUG=True,
+    QUERY_INSTRUMENTATION_ENABLED=True,
+    QUERY_BUDGET_RAISE=True,
+)
+class IngredientListTests(TestCase):
+    """Каталог ингредиентов укладывается в бюджет запросов с токеном."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г')
+            for name in ('молоко', 'морковь', 'сахар')
+        )
+        user = User.objects.create_user(
+            email='cook@example.org', username='cook',
+            first_name='Иван', last_name='Петров', password='password',
+        )
+        cls.token = Token.objects.create(user=user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_name_search_skips_catalog_version(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/ingredients/', {'name': 'мо'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['name'] for item in response.json()],
+            ['молоко', 'морковь'],
+        )
+        self.assertNotIn('X-Catalog-Version', response)
+
+    def test_full_catalog_has_version(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/ingredients/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+        self.assertIn('X-Catalog-Version', response)
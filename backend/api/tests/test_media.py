@@ -0,0 +1,226 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from api.tests.factories import create_recipe, create_user
+from foodgram_backend import storage
+from recipes.models import Recipe
+
+MEDIA_ROOT = tempfile.mkdtemp()
+GRACE = 300
+
+
+def age(name, seconds=GRACE * 2):
+    """Делает файл старше MEDIA_ORPHAN_GRACE."""
+    moment = time.time() - seconds
+    os.utime(default_storage.path(name), (moment, moment))
+
+
+def stored(directory='recipes/images'):
+    """Все файлы каталога MEDIA_ROOT."""
+    root = default_storage.path(directory)
+    return sorted(
+        os.path.relpath(os.path.join(path, filename), MEDIA_ROOT)
+        for path, _, filenames in os.walk(root)
+        for filename in filenames
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_ORPHAN_GRACE=GRACE)
+class MediaTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def create_recipe(self, name, content):
+        return create_recipe(
+            self.author, name, image=ContentFile(content, name='photo.png')
+        )
+
+
+class HashedStorageTests(MediaTestCase):
+    """Имена по содержимому и дедупликация загрузок."""
+
+    def test_identical_uploads_share_name(self):
+        first = default_storage.save(
+            'recipes/images/a.png', ContentFile(b'same')
+        )
+        second = default_storage.save(
+            'recipes/images/b.PNG', ContentFile(b'same')
+        )
+        other = default_storage.save(
+            'recipes/images/a.png', ContentFile(b'other')
+        )
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(storage.is_hashed(first))
+        self.assertEqual(stored(), sorted([first, other]))
+
+    def test_concurrent_save_keeps_content_address(self):
+        expected = default_storage.hashed_name(
+            'recipes/images/a.png', ContentFile(b'race')
+        )
+        exists = default_storage.exists
+        # Соседний процесс записал файл после проверок этого: одной (до
+        # get_available_name) или двух (до открытия файла с O_EXCL).
+        for blind_checks in (1, 2):
+            with self.subTest(blind_checks=blind_checks):
+                default_storage.save(
+                    'recipes/images/a.png', ContentFile(b'race')
+                )
+                checks = iter(range(blind_checks))
+                with mock.patch.object(
+                    default_storage, 'exists',
+                    lambda name: next(checks, None) is None and exists(name),
+                ):
+                    name = default_storage.save(
+                        'recipes/images/b.png', ContentFile(b'race')
+                    )
+                self.assertEqual(name, expected)
+                self.assertEqual(stored(), [expected])
+                default_storage.delete(expected)
+
+
+class ReleaseTests(MediaTestCase):
+    """Файл удаляется после коммита, когда на него не осталось ссылок."""
+
+    def test_shared_file_survives_replace_and_delete_of_one_row(self):
+        first = self.create_recipe('Первый', b'shared')
+        second = self.create_recipe('Второй', b'shared')
+        name = first.image.name
+        self.assertEqual(second.image.name, name)
+        age(name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.image = ContentFile(b'new', name='photo.png')
+            first.save()
+        self.assertTrue(default_storage.exists(name))
+        replacement = first.image.name
+        self.assertNotEqual(replacement, name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(name))
+        # Замена сохранена только что и переживает удаление до gc_media.
+        self.assertEqual(stored(), [replacement])
+
+    def test_grace_window_keeps_fresh_orphans(self):
+        recipe = self.create_recipe('Рецепт', b'fresh')
+        name = recipe.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assertTrue(default_storage.exists(name))
+
+        recipe = self.create_recipe('Рецепт', b'fresh')
+        age(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.delete()
+        self.assertFalse(default_storage.exists(name))
+
+    def test_release_runs_only_on_commit(self):
+        recipe = self.create_recipe('Рецепт', b'rollback')
+        pk, name = recipe.pk, recipe.image.name
+        age(name)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    recipe.delete()
+                    raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.get(pk=pk).delete()
+            # До коммита файл на месте.
+            self.assertTrue(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(name))
+
+
+class GcMediaTests(MediaTestCase):
+    """Команда gc_media: сбор сирот и переименование старых файлов."""
+
+    def gc_media(self, *args):
+        output = StringIO()
+        call_command('gc_media', *args, stdout=output, stderr=StringIO())
+        return output.getvalue()
+
+    def write(self, name, content):
+        path = default_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+        age(name)
+        return name
+
+    def test_dry_run_and_collect(self):
+        used = self.create_recipe('Рецепт', b'used').image.name
+        age(used)
+        orphan = self.write('recipes/images/ab/orphan.png', b'orphan')
+        hidden = self.write('recipes/images/.seed-manifest.json', b'{}')
+        young = default_storage.save(
+            'recipes/images/young.png', ContentFile(b'young')
+        )
+
+        output = self.gc_media('--dry-run')
+        self.assertIn(orphan, output)
+        self.assertNotIn(young, output)
+        self.assertNotIn(used, output)
+        self.assertTrue(default_storage.exists(orphan))
+
+        self.gc_media()
+        self.assertEqual(stored(), sorted([hidden, used, young]))
+
+        self.gc_media('--grace', '0')
+        self.assertEqual(stored(), sorted([hidden, used]))
+
+    def test_rehash_merges_duplicates(self):
+        legacy = [
+            self.write('recipes/images/old.png', b'legacy'),
+            self.write('recipes/images/old_copy.png', b'legacy'),
+        ]
+        recipes = [
+            create_recipe(self.author, f'Рецепт {number}', image=name)
+            for number, name in enumerate(legacy)
+        ]
+
+        output = self.gc_media('--rehash', '--dry-run')
+        self.assertIn('Переименовано ссылок: 2', output)
+        for recipe, name in zip(recipes, legacy):
+            recipe.refresh_from_db()
+            self.assertEqual(recipe.image.name, name)
+
+        self.gc_media('--rehash')
+        names = set()
+        for recipe in recipes:
+            recipe.refresh_from_db()
+            names.add(recipe.image.name)
+        self.assertEqual(len(names), 1)
+        hashed = names.pop()
+        self.assertTrue(storage.is_hashed(hashed))
+        with default_storage.open(hashed) as file:
+            self.assertEqual(file.read(), b'legacy')
+        # Старые файлы — сироты; новый только что сохранен.
+        self.assertEqual(stored(), [hashed])
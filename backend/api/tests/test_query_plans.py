@@ -0,0 +1,79 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+
+class CheckPlansMixin:
+    min_rows = 1000
+
+    def check_plans(self):
+        output = StringIO()
+        try:
+            call_command(
+                'check_query_plans', min_rows=self.min_rows, stdout=output
+            )
+        except CommandError as error:
+            self.fail(f'{error}\n{output.getvalue()}')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Небольшой набор для SQLite.')
+class QueryPlansTests(CheckPlansMixin, TestCase):
+    """
+    Горячие запросы API на синтетическом наборе (generate_dataset) не
+    читают большие таблицы целиком и используют индексы миграции 0007
+    (check_query_plans).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generate_dataset',
+            users=300,
+            recipes=3000,
+            favorites=10000,
+            cart_items=3000,
+            subscriptions=3000,
+            stdout=StringIO(),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_hot_paths_use_indexes(self):
+        self.check_plans()
+
+    def test_dropped_index_is_reported(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX recipe_author_created_idx')
+        with self.assertRaises(AssertionError) as context:
+            self.check_plans()
+        self.assertIn('recipe_author_created_idx', str(context.exception))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Нужен PostgreSQL.')
+class PostgresQueryPlansTests(CheckPlansMixin, TransactionTestCase):
+    """
+    Те же проверки на PostgreSQL без подсказок планировщику: набора хватает,
+    чтобы индексы выбирались по стоимости. VACUUM (вне транзакции, поэтому
+    TransactionTestCase) заполняет карту видимости, как autovacuum в
+    продакшене.
+    """
+
+    min_rows = 10000
+
+    def test_hot_paths_use_indexes(self):
+        call_command(
+            'generate_dataset',
+            users=5000,
+            recipes=50000,
+            favorites=200000,
+            cart_items=50000,
+            subscriptions=50000,
+            tags=30,
+            stdout=StringIO(),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM ANALYZE')
+        self.check_plans()
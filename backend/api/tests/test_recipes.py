@@ -0,0 +1,107 @@
+import base64
+import io
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.tests.factories import create_user
+from recipes.models import Ingredient, Recipe, Tag
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_data():
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4), (200, 100, 0)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    DEBUG=True,
+    QUERY_INSTRUMENTATION_ENABLED=True,
+    QUERY_BUDGET_RAISE=True,
+)
+class RecipeWriteQueriesTests(TestCase):
+    """Число запросов записи рецепта не зависит от числа ингредиентов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(10)
+        )
+        cls.tags = Tag.objects.bulk_create(
+            Tag(name=f'тег {number}', slug=f'tag{number}')
+            for number in range(3)
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def payload(self, ingredients, tags):
+        return {
+            'ingredients': [
+                {'id': item.id, 'amount': 10} for item in ingredients
+            ],
+            'tags': [tag.id for tag in tags],
+            'image': image_data(),
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }
+
+    def write(self, method, url, data):
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertIn(response.status_code, (200, 201), response.data)
+        return response, len(queries)
+
+    def test_create_and_update(self):
+        small, small_queries = self.write(
+            'post', '/api/recipes/',
+            self.payload(self.ingredients[:1], self.tags[:1]),
+        )
+        large, large_queries = self.write(
+            'post', '/api/recipes/',
+            self.payload(self.ingredients, self.tags),
+        )
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(len(large.data['ingredients']), 10)
+        self.assertFalse(large.data['author']['is_subscribed'])
+
+        url = f'/api/recipes/{small.data["id"]}/'
+        _, small_update = self.write(
+            'patch', url, self.payload(self.ingredients[:1], self.tags[:1])
+        )
+        _, large_update = self.write(
+            'patch', url, self.payload(self.ingredients, self.tags[:1])
+        )
+        self.assertEqual(small_update, large_update)
+        self.assertEqual(
+            Recipe.objects.get(pk=small.data['id']).ingredients.count(), 10
+        )
+
+    def test_unknown_ids(self):
+        payload = self.payload(self.ingredients[:2], self.tags[:1])
+        payload['ingredients'][1]['id'] = 999999
+        payload['tags'] = [999999]
+        response = self.client.post('/api/recipes/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['ingredients'][0], {})
+        self.assertIn('id', response.data['ingredients'][1])
+        self.assertEqual(len(response.data['tags']), 1)
@@ -0,0 +1,36 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.tests.factories import create_recipe, create_user
+from recipes.models import RecipeSimilarity
+
+
+class SimilarRecipesTests(TestCase):
+    """Похожие рецепты: список из RecipeSimilarity и 404."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.recipe = create_recipe(author, 'Борщ')
+        cls.similar = create_recipe(author, 'Щи')
+        RecipeSimilarity.objects.create(
+            recipe=cls.recipe, similar=cls.similar, score=0.9, rank=1
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_similar(self):
+        response = self.client.get(f'/api/recipes/{self.recipe.pk}/similar/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item['id'] for item in response.json()], [self.similar.pk]
+        )
+
+    def test_unknown_recipe_is_404(self):
+        response = self.client.get('/api/recipes/999999/similar/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_non_numeric_id_is_404(self):
+        response = self.client.get('/api/recipes/abc/similar/')
+        self.assertEqual(response.status_code, 404)
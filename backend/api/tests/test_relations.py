@@ -0,0 +1,82 @@
+from django.db import IntegrityError
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from api.services import create_unique
+from api.tests.factories import create_recipe, create_user
+from recipes.models import Favorite
+from users.models import Subscription
+
+
+class DeleteRelationTests(TestCase):
+    """Удаление избранного, покупок и подписки по id из URL."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+        cls.recipe = create_recipe(cls.author, 'Борщ')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_absent_relation_is_400(self):
+        for url in (
+            f'/api/recipes/{self.recipe.pk}/favorite/',
+            f'/api/recipes/{self.recipe.pk}/shopping_cart/',
+            f'/api/users/{self.author.pk}/subscribe/',
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.delete(url).status_code, 400)
+
+    def test_non_numeric_id_is_404(self):
+        for url in (
+            '/api/recipes/abc/favorite/',
+            '/api/recipes/abc/shopping_cart/',
+            '/api/users/abc/subscribe/',
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.delete(url).status_code, 404)
+
+
+class CreateUniqueTests(TestCase):
+    """create_unique: повтор — None, другие нарушения — ошибка."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.recipe = create_recipe(create_user('author'), 'Борщ')
+
+    def test_duplicate_returns_none(self):
+        first = create_unique(Favorite, user=self.user, recipe=self.recipe)
+        self.assertIsNotNone(first)
+        self.assertIsNone(
+            create_unique(Favorite, user=self.user, recipe=self.recipe)
+        )
+        # Транзакция после ошибки в точке сохранения продолжает работать.
+        self.assertEqual(Favorite.objects.count(), 1)
+
+    def test_check_constraint_is_raised(self):
+        with self.assertRaises(IntegrityError):
+            create_unique(Subscription, user=self.user, author=self.user)
+        self.assertFalse(Subscription.objects.exists())
+
+    def test_duplicate_subscription_is_400(self):
+        author = self.recipe.author
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = f'/api/users/{author.pk}/subscribe/'
+        self.assertEqual(client.post(url).status_code, 201)
+        response = client.post(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], 'Подписка уже существует.')
+
+
+class CreateUniqueAutocommitTests(TransactionTestCase):
+    """В автокоммите внешний ключ проверяется сразу при INSERT."""
+
+    def test_missing_recipe_is_raised(self):
+        user = create_user('reader')
+        with self.assertRaises(IntegrityError):
+            create_unique(Favorite, user=user, recipe_id=999999)
@@ -0,0 +1,162 @@
+import time
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.db import connections, transaction
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.middleware import ReplicaRoutingMiddleware
+from api.tests.factories import create_recipe, create_user
+from foodgram_backend.db_router import _use_primary, use_primary
+from recipes.models import Favorite, Tag
+
+LOCMEM = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+REDIS = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://localhost:6379',
+    }
+}
+
+
+class ReplicaCacheCheckTests(SimpleTestCase):
+    """Реплики требуют общего кеша для меток read-your-writes."""
+
+    def warnings(self):
+        return [
+            message.id for message in run_checks()
+            if message.id == 'api.W001'
+        ]
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'], CACHES=LOCMEM)
+    def test_replicas_with_process_cache_warn(self):
+        self.assertEqual(self.warnings(), ['api.W001'])
+        with self.assertLogs('api.middleware', 'WARNING'):
+            ReplicaRoutingMiddleware(lambda request: None)
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'], CACHES=REDIS)
+    def test_replicas_with_shared_cache(self):
+        self.assertEqual(self.warnings(), [])
+
+    @override_settings(DATABASE_REPLICAS=[], CACHES=LOCMEM)
+    def test_no_replicas(self):
+        self.assertEqual(self.warnings(), [])
+
+
+REPLICA = 'replica_1'
+SQLITE_REPLICA = (
+    REPLICA in settings.DATABASE_REPLICAS
+    and settings.DATABASES[REPLICA]['ENGINE'].endswith('sqlite3')
+)
+
+
+@skipUnless(
+    SQLITE_REPLICA,
+    'Нужна SQLite-реплика: DJANGO_USE_SQLITE=True DB_REPLICAS=replica.sqlite3',
+)
+class PrimaryReplicaRouterTests(TestCase):
+    """
+    Маршрутизация на двух SQLite-базах: в основной и в реплике разные
+    теги, так что по ответу видно, какая база его прочитала.
+    """
+
+    # Раннер собирает базы и у пропущенных тестов.
+    databases = {'default', REPLICA} if SQLITE_REPLICA else {'default'}
+
+    @classmethod
+    def setUpTestData(cls):
+        Tag.objects.create(name='Основная', slug='primary')
+        Tag.objects.using(REPLICA).create(name='Реплика', slug='replica')
+        cls.user = create_user('writer')
+        cls.token = Token.objects.create(user=cls.user)
+        cls.recipe = create_recipe(cls.user, 'Омлет')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def tags(self, client=None):
+        response = (client or self.client).get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        return [tag['slug'] for tag in response.json()]
+
+    def favorite(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = self.client.post(
+                f'/api/recipes/{self.recipe.id}/favorite/'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(replica), 0)
+        return response
+
+    def test_anonymous_get_reads_replica(self):
+        with CaptureQueriesContext(connections['default']) as primary:
+            self.assertEqual(self.tags(), ['replica'])
+        self.assertEqual(len(primary), 0)
+
+    def test_writes_use_primary(self):
+        # Рецепт есть только в основной базе: чтение из реплики дало бы 404.
+        self.favorite()
+        self.assertTrue(Favorite.objects.filter(
+            user=self.user, recipe=self.recipe
+        ).exists())
+
+    def test_select_for_update_and_atomic_use_primary(self):
+        with use_primary(False):
+            self.assertEqual(Tag.objects.all().db, REPLICA)
+            self.assertEqual(Tag.objects.select_for_update().db, 'default')
+            with transaction.atomic():
+                self.assertEqual(Tag.objects.all().db, 'default')
+                self.assertEqual(
+                    list(Tag.objects.values_list('slug', flat=True)),
+                    ['primary'],
+                )
+            self.assertEqual(Tag.objects.all().db, REPLICA)
+
+    def test_cookie_keeps_reads_on_primary(self):
+        response = self.favorite()
+        self.assertIn(ReplicaRoutingMiddleware.COOKIE_NAME, response.cookies)
+        cache.clear()
+        self.client.credentials()
+        self.assertEqual(self.tags(), ['primary'])
+
+        self.client.cookies[ReplicaRoutingMiddleware.COOKIE_NAME] = str(
+            int(time.time()) - 1
+        )
+        self.assertEqual(self.tags(), ['replica'])
+
+    def test_authorization_marker_keeps_reads_on_primary(self):
+        self.favorite()
+        # Другой клиент без cookie, но с тем же токеном.
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(self.tags(client), ['primary'])
+
+        cache.clear()
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            client.get('/api/tags/')
+        self.assertGreater(len(replica), 0)
+
+    def test_context_is_reset_after_request(self):
+        self.tags()
+        self.assertTrue(_use_primary.get())
+        self.assertEqual(Tag.objects.all().db, 'default')
+
+        def failing_view(request):
+            self.assertFalse(_use_primary.get())
+            raise RuntimeError
+
+        middleware = ReplicaRoutingMiddleware(failing_view)
+        with self.assertRaises(RuntimeError):
+            middleware(RequestFactory().get('/api/tags/'))
+        self.assertTrue(_use_primary.get())
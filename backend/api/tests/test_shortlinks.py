@@ -0,0 +1,152 @@
+import runpy
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.factories import create_recipe, create_user
+from recipes import shortlinks
+from recipes.models import ShortLinkStats
+
+
+class Base62Tests(SimpleTestCase):
+    """Коды base62: один код на id."""
+
+    def test_round_trip(self):
+        for number in (0, 1, 61, 62, 1000, 62 ** 5, 2 ** 63 - 1):
+            with self.subTest(number=number):
+                code = shortlinks.encode(number)
+                self.assertLessEqual(len(code), shortlinks.MAX_CODE_LENGTH)
+                self.assertEqual(shortlinks.decode(code), number)
+        self.assertEqual(shortlinks.encode(1000), 'g8')
+
+    def test_rejects_invalid_codes(self):
+        for code in ('', '0g8', '00', 'g-8', 'g8/', 'ж', 'z' * 12):
+            with self.subTest(code=code):
+                self.assertIsNone(shortlinks.decode(code))
+        self.assertEqual(shortlinks.decode('0'), 0)
+        with self.assertRaises(ValueError):
+            shortlinks.encode(-1)
+
+
+@override_settings(SHORT_LINK_FLUSH_INTERVAL=3600)
+class ShortLinkTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.recipe = create_recipe(author, 'Борщ')
+        cls.other = create_recipe(author, 'Щи')
+
+    def setUp(self):
+        # Карта id и счетчик процесса не должны зависеть от других тестов.
+        for name, value in (
+            ('recipe_ids', shortlinks.RecipeIdBitmap()),
+            ('clicks', shortlinks.ClickCounter()),
+        ):
+            patcher = mock.patch.object(shortlinks, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def clicks(self):
+        return dict(ShortLinkStats.objects.values_list('recipe', 'clicks'))
+
+
+class ShortLinkViewTests(ShortLinkTestCase):
+    """Редиректы /s/<код> и /s/<id>/ и их кеширование."""
+
+    def assert_cache(self, response, max_age):
+        self.assertEqual(
+            response['Cache-Control'], f'public, max-age={max_age}'
+        )
+
+    def test_redirects(self):
+        location = f'/recipes/{self.recipe.id}'
+        for url in (
+            f'/s/{shortlinks.encode(self.recipe.id)}',
+            f'/s/{self.recipe.id}/',
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 302)
+                self.assertEqual(response['Location'], location)
+                self.assert_cache(response, settings.SHORT_LINK_MAX_AGE)
+        self.assertEqual(settings.SHORT_LINK_MAX_AGE, 60)
+        self.assertEqual(shortlinks.clicks.flush(), 2)
+        self.assertEqual(self.clicks(), {self.recipe.id: 2})
+
+    def test_not_found_is_cached_briefly(self):
+        missing = self.other.id + 1000
+        for url in (
+            f'/s/{shortlinks.encode(missing)}',
+            f'/s/{missing}/',
+            f'/s/0{shortlinks.encode(self.recipe.id)}',
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assert_cache(
+                    response, settings.SHORT_LINK_NOT_FOUND_MAX_AGE
+                )
+        self.assertEqual(settings.SHORT_LINK_NOT_FOUND_MAX_AGE, 60)
+        self.assertEqual(shortlinks.clicks.flush(), 0)
+
+    def test_only_safe_methods(self):
+        code = shortlinks.encode(self.recipe.id)
+        self.assertEqual(self.client.post(f'/s/{code}').status_code, 405)
+
+
+class ClickCounterTests(ShortLinkTestCase):
+    """Переходы пишутся в ShortLinkStats пачкой."""
+
+    def test_flush_upserts_in_one_batch(self):
+        counter = shortlinks.clicks
+        deleted = create_recipe(self.recipe.author, 'Удаленный')
+        for recipe_id in (self.recipe.id, self.recipe.id, self.other.id,
+                          deleted.id):
+            counter.hit(recipe_id)
+        deleted.delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(counter.flush(), 4)
+        # executemany — одна запись журнала: «N times: INSERT ...».
+        inserts = [
+            query['sql'] for query in queries if 'INSERT' in query['sql']
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertTrue(inserts[0].startswith('3 times:'))
+        self.assertEqual(
+            self.clicks(), {self.recipe.id: 2, self.other.id: 1}
+        )
+
+        self.assertEqual(counter.flush(), 0)
+        counter.hit(self.recipe.id)
+        counter.flush()
+        self.assertEqual(
+            self.clicks(), {self.recipe.id: 3, self.other.id: 1}
+        )
+
+    def test_failed_flush_keeps_clicks(self):
+        counter = shortlinks.clicks
+        counter.hit(self.recipe.id)
+        with mock.patch.object(
+            connection, 'cursor', side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                counter.flush()
+        self.assertEqual(counter.flush(), 1)
+        self.assertEqual(self.clicks(), {self.recipe.id: 1})
+
+    def test_worker_exit_flushes(self):
+        hooks = runpy.run_path(str(settings.BASE_DIR / 'gunicorn.conf.py'))
+        shortlinks.clicks.hit(self.recipe.id)
+        hooks['worker_exit'](None, None)
+        self.assertEqual(self.clicks(), {self.recipe.id: 1})
+
+        shortlinks.clicks.hit(self.other.id)
+        shortlinks._flush_at_exit()
+        self.assertEqual(
+            self.clicks(), {self.recipe.id: 1, self.other.id: 1}
+        )
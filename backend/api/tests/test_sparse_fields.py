@@ -0,0 +1,59 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.tests.factories import create_recipe, create_user
+
+
+class SparseFieldsTests(TestCase):
+    """Параметры ?fields= и ?omit= у рецептов и пользователей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.recipe = create_recipe(cls.author, 'Борщ')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def test_selected_fields(self):
+        response = self.client.get(
+            '/api/recipes/', {'fields': 'id,name,author'}
+        )
+        self.assertEqual(response.status_code, 200)
+        recipe = response.json()['results'][0]
+        self.assertEqual(set(recipe), {'id', 'name', 'author'})
+        self.assertEqual(recipe['author']['username'], 'author')
+
+        response = self.client.get(
+            f'/api/recipes/{self.recipe.pk}/', {'omit': 'ingredients,text'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ingredients', response.json())
+        self.assertIn('tags', response.json())
+
+        response = self.client.get(
+            f'/api/users/{self.author.pk}/', {'fields': 'id,username'}
+        )
+        self.assertEqual(response.json(), {
+            'id': self.author.pk, 'username': 'author'
+        })
+
+    def test_unknown_fields_are_400(self):
+        for url, params in (
+            ('/api/recipes/', {'fields': 'nope'}),
+            ('/api/recipes/', {'fields': 'id,nope'}),
+            (f'/api/recipes/{self.recipe.pk}/', {'omit': 'nope'}),
+            ('/api/users/', {'fields': 'nope'}),
+            ('/api/users/me/', {'fields': 'nope'}),
+        ):
+            with self.subTest(url=url, params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(next(iter(params)), response.json())
+
+    def test_nothing_left_is_400(self):
+        response = self.client.get(
+            '/api/recipes/', {'fields': 'id', 'omit': 'id'}
+        )
+        self.assertEqual(response.status_code, 400)
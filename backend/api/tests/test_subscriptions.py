@@ -0,0 +1,58 @@
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.tests.factories import create_recipe, create_user
+from users.models import Subscription
+
+AUTHORS = 6
+RECIPES_PER_AUTHOR = 4
+
+
+@override_settings(
+    DEBUG=True,
+    QUERY_INSTRUMENTATION_ENABLED=True,
+    QUERY_BUDGET_RAISE=True,
+)
+class SubscriptionsQueriesTests(TestCase):
+    """Страница подписок — фиксированное число запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.token = Token.objects.create(user=cls.user)
+        for number in range(AUTHORS):
+            author = create_user(f'author{number}')
+            for recipe in range(RECIPES_PER_AUTHOR):
+                create_recipe(author, f'Рецепт {number}.{recipe}')
+            Subscription.objects.create(user=cls.user, author=author)
+        create_user('stranger')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get(self, params):
+        # Токен, число авторов, авторы страницы, рецепты всех авторов.
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/users/subscriptions/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_page(self):
+        data = self.get({'recipes_limit': 2, 'limit': 5})
+        self.assertEqual(data['count'], AUTHORS)
+        self.assertEqual(len(data['results']), 5)
+        for author in data['results']:
+            self.assertTrue(author['is_subscribed'])
+            self.assertEqual(author['recipes_count'], RECIPES_PER_AUTHOR)
+            self.assertEqual(len(author['recipes']), 2)
+            self.assertTrue(
+                author['recipes'][0]['image'].startswith('http://testserver/')
+            )
+
+    def test_without_recipes_limit(self):
+        data = self.get({'page': 2, 'limit': 4})
+        self.assertEqual(len(data['results']), AUTHORS - 4)
+        for author in data['results']:
+            self.assertEqual(len(author['recipes']), RECIPES_PER_AUTHOR)
@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 
 from api.views import (
     IngredientViewSet,
+    QueryStatsView,
     RecipeViewSet,
     TagViewSet,
     UsersViewSet,
@@ -39,5 +40,10 @@ auth_urlpatterns = [
 
 urlpatterns = [
     path('auth/', include((auth_urlpatterns, 'auth'))),
+    path(
+        'internal/query-stats/',
+        QueryStatsView.as_view(),
+        name='query-stats'
+    ),
     path('', include(api_v1_router.urls)),
 ]
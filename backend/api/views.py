@@ -1,32 +1,48 @@
 from http import HTTPStatus
 
+from django.conf import settings
+from django.db import connections
 from django.db.models import (
     BooleanField,
     Exists,
     OuterRef,
+    Prefetch,
     Sum,
     Value,
     Count,
     F,
 )
-from django.http import FileResponse
+from django.http import FileResponse, HttpResponse
 from django.urls import reverse
+from django.utils.crypto import constant_time_compare
 from djoser.views import UserViewSet as DjoserUserViewSet
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets
+from rest_framework import serializers, viewsets
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import (
     AllowAny,
+    IsAdminUser,
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from api import metrics
+from api.cook_index import cook_index
+from api.feed import feed_keys
+from api.instrumentation import registry as query_stats_registry
 from api.permissions import IsAuthorOrReadOnly
-from api.pagination import LimitPageNumberPagination
+from api.pagination import KeysetPagination, LimitPageNumberPagination
 from api.serializers import (
+    CookQuerySerializer,
     FavoriteCreateSerializer,
+    IngredientChangeSerializer,
+    RecipeBatchSerializer,
     IngredientSerializer,
+    RecipeMinifiedSerializer,
     RecipeReadSerializer,
     RecipeWriteSerializer,
     SetAvatarSerializer,
@@ -35,20 +51,43 @@ from api.serializers import (
     TagSerializer,
     UserSerializer,
     UserWithRecipesSerializer,
+    recipes_limit,
+    sparse_fields,
 )
 from api.filters import NameSearchFilter, RecipeFilter
-from api.services import build_absolute_file_url, format_shopping_list
+from api.services import (
+    build_absolute_file_url,
+    format_shopping_list,
+    protected_file_response,
+)
+from foodgram_backend.constants import (
+    INGREDIENT_CHANGES_PAGE_SIZE,
+    RECOMMENDATIONS_LIMIT,
+    RECOMMENDATIONS_MAX_LIMIT,
+    RECOMMENDATIONS_SEED_SIZE,
+)
+from recipes import shortlinks
 from recipes.models import (
     Favorite,
     Ingredient,
+    IngredientChange,
     IngredientInRecipe,
     Recipe,
+    RecipeSimilarity,
     ShoppingCart,
     Tag
 )
 from users.models import Subscription, User
 
 
+def object_id(value):
+    """id объекта из URL; не число — 404, как у get_object."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise NotFound
+
+
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """Просмотр тегов (список и детальная информация)."""
 
@@ -64,10 +103,46 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
-    queryset = Ingredient.objects.all()
+    queryset = Ingredient.objects.filter(is_active=True)
     filter_backends = (NameSearchFilter,)
     search_fields = ('^name',)
 
+    def list(self, request, *args, **kwargs):
+        """
+        Без since — активный каталог целиком, версия в X-Catalog-Version;
+        с since — изменения каталога после указанной версии. Поиску по
+        name (автодополнение) версия не нужна: лишний запрос не делается.
+        """
+        since = request.query_params.get('since')
+        if since is None:
+            if request.query_params.get('name'):
+                return super().list(request, *args, **kwargs)
+            version = IngredientChange.current_version()
+            response = super().list(request, *args, **kwargs)
+            response['X-Catalog-Version'] = str(version)
+            return response
+        try:
+            since = serializers.IntegerField(min_value=0).run_validation(
+                since
+            )
+        except ValidationError as exc:
+            raise ValidationError({'since': exc.detail})
+        changes = list(
+            IngredientChange.objects.filter(id__gt=since)[
+                :INGREDIENT_CHANGES_PAGE_SIZE + 1
+            ]
+        )
+        has_more = len(changes) > INGREDIENT_CHANGES_PAGE_SIZE
+        changes = changes[:INGREDIENT_CHANGES_PAGE_SIZE]
+        return Response({
+            'version': (
+                changes[-1].id if changes
+                else IngredientChange.current_version()
+            ),
+            'has_more': has_more,
+            'changes': IngredientChangeSerializer(changes, many=True).data,
+        })
+
 
 class UsersViewSet(DjoserUserViewSet):
     """Работа с пользователями и их профилем/подписками."""
@@ -77,11 +152,19 @@ class UsersViewSet(DjoserUserViewSet):
     pagination_class = LimitPageNumberPagination
 
     def get_queryset(self):
-        """Аннотирует количество рецептов пользователя в recipes_count."""
-        base_qs = super().get_queryset()
-        return base_qs.annotate(
-            recipes_count=Count('recipes')
-        ).order_by('username')
+        """
+        recipes_count (подсчет рецептов через JOIN и GROUP BY) нужен только
+        ответу subscribe; остальным действиям — пользователи без аннотаций,
+        list и retrieve — только колонки полей из ?fields= / ?omit=.
+        """
+        base_qs = super().get_queryset().order_by('username')
+        if self.action == 'subscribe':
+            return base_qs.annotate(recipes_count=Count('recipes'))
+        if self.action in ('list', 'retrieve'):
+            fields = sparse_fields(self.request, UserSerializer.Meta.fields)
+            if fields is not None:
+                return base_qs.only('id', *(fields - {'is_subscribed'}))
+        return base_qs
 
     @action(
         detail=False,
@@ -117,7 +200,10 @@ class UsersViewSet(DjoserUserViewSet):
     @avatar.mapping.delete
     def delete_avatar(self, request):
         """Удаляет аватар текущего пользователя, если он установлен."""
-        request.user.avatar.delete(save=True)
+        # Не FieldFile.delete: тот же файл может быть аватаром другого
+        # пользователя, его удалит сигнал, если ссылок не останется.
+        request.user.avatar = None
+        request.user.save(update_fields=('avatar',))
         return Response(status=HTTPStatus.NO_CONTENT)
 
     @action(
@@ -127,16 +213,32 @@ class UsersViewSet(DjoserUserViewSet):
         url_path='subscriptions',
     )
     def subscriptions(self, request):
-        """Возвращает список авторов, на которых подписан пользователь."""
+        """
+        Возвращает список авторов, на которых подписан пользователь.
+        Страница — за три запроса: число авторов, авторы с recipes_count
+        и первые recipes_limit рецептов всех авторов страницы (оконная
+        функция в префетче среза).
+        """
+        recipes = Recipe.objects.only(
+            'id', 'author', 'name', 'image', 'cooking_time'
+        )
         qs = (
             User.objects
             .filter(subscriptions_to_author__user=request.user)
-            .annotate(recipes_count=Count('recipes'))
+            .annotate(
+                recipes_count=Count('recipes'),
+                is_subscribed=Value(True, output_field=BooleanField()),
+            )
+            .prefetch_related(Prefetch(
+                'recipes',
+                queryset=recipes[:recipes_limit(request)],
+                to_attr='limited_recipes',
+            ))
             .order_by('username')
         )
         page = self.paginate_queryset(qs)
         serializer = UserWithRecipesSerializer(
-            page or qs,
+            page if page is not None else qs,
             many=True,
             context={'request': request},
         )
@@ -151,24 +253,28 @@ class UsersViewSet(DjoserUserViewSet):
         url_path='subscribe',
     )
     def subscribe(self, request, id=None):
-        """Оформляет подписку на автора через валидирующий сериализатор."""
+        """
+        Оформляет подписку на автора: автор (с recipes_count для ответа)
+        и вставка — по запросу, повтор дает 400 по уникальному индексу.
+        """
         author = self.get_object()
         serializer = SubscriptionCreateSerializer(
-            data={'user': request.user.id, 'author': author.id},
+            data={},
             context={'request': request},
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        serializer.save(user=request.user, author=author)
         return Response(serializer.data, status=HTTPStatus.CREATED)
 
     @subscribe.mapping.delete
     def unsubscribe(self, request, id=None):
         """Отписывает от автора, если подписка существовала."""
-        author = self.get_object()
         deleted, _ = Subscription.objects.filter(
             user=request.user,
-            author=author,
+            author_id=object_id(id),
         ).delete()
+        if not deleted:
+            get_object_or_404(User.objects.all(), pk=id)
         return Response(
             status=(
                 HTTPStatus.NO_CONTENT if deleted else HTTPStatus.BAD_REQUEST
@@ -193,17 +299,48 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    # Действия, которым рецепт нужен только для 404, проверки прав и
+    # краткого ответа: без select_related, префетчей и флагов.
+    object_fields = {
+        'get_link': ('id',),
+        'favorite': ('id', 'name', 'image', 'cooking_time'),
+        'add_to_cart': ('id', 'name', 'image', 'cooking_time'),
+        'destroy': ('id', 'author', 'image'),
+    }
+    # Действия, отвечающие полным рецептом из queryset; update отвечает
+    # рецептом после записи тегов и ингредиентов, префетч ему не нужен.
+    prefetch_actions = frozenset(('list', 'retrieve', 'feed'))
+    # Поля RecipeReadSerializer -> колонки и префетчи, которые им нужны.
+    read_columns = ('author', 'name', 'image', 'text', 'cooking_time')
+    read_prefetches = {
+        'tags': 'tags',
+        'ingredients': 'ingredient_in_recipes__ingredient',
+    }
+
     def get_queryset(self):
-        """Возвращает queryset с нужными префетчами и аннотациями флагов."""
-        base_qs = (
-            super()
-            .get_queryset()
-            .select_related('author')
-            .prefetch_related('tags', 'ingredient_in_recipes__ingredient')
-        )
+        """Возвращает queryset, достаточный для текущего действия."""
+        base_qs = super().get_queryset()
+        fields = self.object_fields.get(self.action)
+        if fields:
+            return base_qs.only(*fields)
 
         request = getattr(self, 'request', None)
         user = getattr(request, 'user', None)
+        selected = set(RecipeReadSerializer.Meta.fields)
+        if self.action in self.prefetch_actions:
+            # ?fields= / ?omit= (sparse_fields): только нужные колонки,
+            # JOIN и префетчи — карточкам без ингредиентов и текста.
+            selected = sparse_fields(request, selected) or selected
+            base_qs = base_qs.only('id', *(
+                name for name in self.read_columns if name in selected
+            ))
+            for name, lookup in self.read_prefetches.items():
+                if name in selected:
+                    base_qs = base_qs.prefetch_related(lookup)
+        if 'author' in selected:
+            base_qs = base_qs.select_related('author')
+        if not selected & {'is_favorited', 'is_in_shopping_cart'}:
+            return base_qs
 
         if user and user.is_authenticated:
             favorite_exists = Favorite.objects.filter(
@@ -235,11 +372,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @favorite.mapping.delete
     def unfavorite(self, request, pk=None):
         """Удаляет рецепт из избранного пользователя."""
-        self.get_object()
-        deleted, _ = Favorite.objects.filter(
-            user=request.user,
-            recipe_id=pk,
-        ).delete()
+        deleted = self._delete_relation(Favorite, pk)
         return Response(
             status=(
                 HTTPStatus.NO_CONTENT if deleted else HTTPStatus.BAD_REQUEST
@@ -259,11 +392,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @add_to_cart.mapping.delete
     def remove_from_cart(self, request, pk=None):
         """Удаляет рецепт из списка покупок пользователя."""
-        self.get_object()
-        deleted, _ = ShoppingCart.objects.filter(
-            user=request.user,
-            recipe_id=pk,
-        ).delete()
+        deleted = self._delete_relation(ShoppingCart, pk)
         return Response(
             status=(
                 HTTPStatus.NO_CONTENT if deleted else HTTPStatus.BAD_REQUEST
@@ -271,21 +400,252 @@ class RecipeViewSet(viewsets.ModelViewSet):
             data=None if deleted else {'detail': 'Не было в списке покупок.'},
         )
 
+    @action(
+        detail=False,
+        methods=('post',),
+        permission_classes=(IsAuthenticated,),
+        url_path='favorite',
+    )
+    def favorite_batch(self, request):
+        """Добавляет в избранное несколько рецептов сразу."""
+        return self._add_relations(Favorite, request)
+
+    @favorite_batch.mapping.delete
+    def unfavorite_batch(self, request):
+        """Удаляет из избранного несколько рецептов сразу."""
+        return self._remove_relations(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=('post',),
+        permission_classes=(IsAuthenticated,),
+        url_path='shopping_cart',
+    )
+    def add_to_cart_batch(self, request):
+        """Добавляет в список покупок несколько рецептов сразу."""
+        return self._add_relations(ShoppingCart, request)
+
+    @add_to_cart_batch.mapping.delete
+    def remove_from_cart_batch(self, request):
+        """Удаляет из списка покупок несколько рецептов сразу."""
+        return self._remove_relations(ShoppingCart, request)
+
+    @action(
+        detail=False,
+        methods=('delete',),
+        permission_classes=(IsAuthenticated,),
+        url_path='shopping_cart/clear',
+    )
+    def clear_shopping_cart(self, request):
+        """Очищает список покупок пользователя."""
+        deleted, _ = ShoppingCart.objects.filter(user=request.user).delete()
+        return Response({'removed': deleted})
+
+    def _batch_recipe_ids(self, request):
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['recipes']
+
+    def _add_relations(self, model, request):
+        """
+        Пакетное добавление: рецепты и уже добавленные из них проверяются
+        одним запросом, новые связи вставляются одним bulk_create. Статус
+        по каждому id: added, exists или not_found.
+        """
+        recipe_ids = self._batch_recipe_ids(request)
+        linked = dict(
+            Recipe.objects.filter(id__in=recipe_ids)
+            .annotate(linked=Exists(model.objects.filter(
+                user=request.user, recipe=OuterRef('pk')
+            )))
+            .values_list('id', 'linked')
+        )
+        model.objects.bulk_create(
+            [
+                model(user=request.user, recipe_id=pk)
+                for pk in recipe_ids if linked.get(pk) is False
+            ],
+            ignore_conflicts=True,
+        )
+        statuses = {False: 'added', True: 'exists', None: 'not_found'}
+        return Response({'results': [
+            {'id': pk, 'status': statuses[linked.get(pk)]}
+            for pk in recipe_ids
+        ]})
+
+    def _remove_relations(self, model, request):
+        """Пакетное удаление; статус по каждому id: removed или absent."""
+        recipe_ids = self._batch_recipe_ids(request)
+        relations = model.objects.filter(
+            user=request.user, recipe_id__in=recipe_ids
+        )
+        removed = set(relations.values_list('recipe_id', flat=True))
+        if removed:
+            relations.delete()
+        return Response({'results': [
+            {'id': pk, 'status': 'removed' if pk in removed else 'absent'}
+            for pk in recipe_ids
+        ]})
+
     def _create_relation(self, serializer_class, pk):
-        """Общий метод создания связи (избранное/список покупок)."""
-        self.get_object()
-        data = {
-            'user': getattr(self.request.user, 'id', None),
-            'recipe': pk,
-        }
+        """
+        Общий метод создания связи (избранное/список покупок): рецепт с
+        полями для ответа (object_fields) и вставка — по запросу.
+        """
+        recipe = self.get_object()
         serializer = serializer_class(
-            data=data,
+            data={},
             context={'request': self.request}
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        serializer.save(user=self.request.user, recipe=recipe)
         return Response(serializer.data, status=HTTPStatus.CREATED)
 
+    def _delete_relation(self, model, pk):
+        """Удаляет связь; рецепт проверяется, только если ее не было."""
+        deleted, _ = model.objects.filter(
+            user=self.request.user,
+            recipe_id=object_id(pk),
+        ).delete()
+        if not deleted:
+            get_object_or_404(Recipe.objects.all(), pk=pk)
+        return deleted
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(IsAuthenticated,),
+    )
+    def feed(self, request):
+        """Рецепты авторов из подписок пользователя, новые сверху."""
+        paginator = KeysetPagination()
+        limit = paginator.get_page_size(request)
+        keys = feed_keys(
+            request.user, paginator.decode_cursor(request), limit + 1
+        )
+        has_next = len(keys) > limit
+        keys = keys[:limit]
+        recipes = self.get_queryset().in_bulk([pk for _, pk in keys])
+        fields = sparse_fields(request, RecipeReadSerializer.Meta.fields)
+        if fields is None or 'author' in fields:
+            for recipe in recipes.values():
+                # В ленте только авторы из подписок пользователя.
+                recipe.author.is_subscribed = True
+        serializer = RecipeReadSerializer(
+            [recipes[pk] for _, pk in keys if pk in recipes],
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return paginator.get_paginated_response(
+            request, serializer.data, keys[-1] if has_next else None
+        )
+
+    @action(
+        detail=True,
+        methods=('get',),
+        permission_classes=(AllowAny,),
+    )
+    def similar(self, request, pk=None):
+        """Похожие рецепты из заранее посчитанного top-K списка."""
+        pk = object_id(pk)
+        similar_ids = list(
+            RecipeSimilarity.objects.filter(recipe_id=pk)
+            .order_by('rank')
+            .values_list('similar_id', flat=True)[:self._limit(request)]
+        )
+        if not similar_ids and not Recipe.objects.filter(pk=pk).exists():
+            raise NotFound
+        return self._minified_response(similar_ids)
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(IsAuthenticated,),
+    )
+    def recommended(self, request):
+        """
+        Рекомендации: сумма близостей к рецептам из избранного и списка
+        покупок пользователя; без истории — новые рецепты.
+        """
+        user = request.user
+        limit = self._limit(request)
+        seeds = [
+            *Favorite.objects.filter(user=user).order_by('-id')
+            .values_list('recipe_id', flat=True)[:RECOMMENDATIONS_SEED_SIZE],
+            *ShoppingCart.objects.filter(user=user).order_by('-id')
+            .values_list('recipe_id', flat=True)[:RECOMMENDATIONS_SEED_SIZE],
+        ]
+        if not seeds:
+            return self._minified_response(list(
+                Recipe.objects.exclude(author=user)
+                .values_list('id', flat=True)[:limit]
+            ))
+        return self._minified_response(list(
+            RecipeSimilarity.objects.filter(recipe_id__in=seeds)
+            .exclude(similar_id__in=Favorite.objects.filter(
+                user=user
+            ).values('recipe_id'))
+            .exclude(similar_id__in=ShoppingCart.objects.filter(
+                user=user
+            ).values('recipe_id'))
+            .exclude(similar__author=user)
+            .values('similar_id')
+            .annotate(total=Sum('score'))
+            .order_by('-total', 'similar_id')
+            .values_list('similar_id', flat=True)[:limit]
+        ))
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(AllowAny,),
+    )
+    def cook(self, request):
+        """
+        Что приготовить из имеющихся ингредиентов: рецепты, где не хватает
+        не больше max_missing ингредиентов, сначала самые полные.
+        """
+        query = CookQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        total, ranked = cook_index.search(
+            query.validated_data['ingredients'],
+            query.validated_data['max_missing'],
+            self._limit(request),
+        )
+        cards = {
+            card['id']: card
+            for card in self._minified([recipe_id for recipe_id, *_ in ranked])
+        }
+        return Response({
+            'count': total,
+            'results': [
+                {**cards[recipe_id], 'missing': missing, 'matched': matched}
+                for recipe_id, missing, matched in ranked
+                if recipe_id in cards
+            ],
+        })
+
+    def _limit(self, request):
+        try:
+            limit = int(request.query_params.get('limit', ''))
+        except ValueError:
+            return RECOMMENDATIONS_LIMIT
+        return min(max(limit, 1), RECOMMENDATIONS_MAX_LIMIT)
+
+    def _minified(self, recipe_ids):
+        """Краткие карточки рецептов в порядке recipe_ids."""
+        recipes = Recipe.objects.only(
+            'id', 'name', 'image', 'cooking_time'
+        ).in_bulk(recipe_ids)
+        return RecipeMinifiedSerializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes],
+            many=True,
+            context=self.get_serializer_context(),
+        ).data
+
+    def _minified_response(self, recipe_ids):
+        return Response(self._minified(recipe_ids))
+
     @action(
         detail=True,
         methods=('get',),
@@ -297,7 +657,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         recipe = self.get_object()
         short_path = reverse(
             'recipes:recipe-short-link',
-            kwargs={'short_id': recipe.id}
+            kwargs={'code': shortlinks.encode(recipe.id)}
         )
         absolute_url = (
             request.build_absolute_uri(short_path)
@@ -323,7 +683,15 @@ class RecipeViewSet(viewsets.ModelViewSet):
             .annotate(total_amount=Sum('amount'))
             .order_by('name')
         )
-        file_obj = format_shopping_list(ingredients)
+        with metrics.shopping_list_duration_seconds.time():
+            file_obj = format_shopping_list(ingredients)
+        if settings.USE_X_ACCEL_REDIRECT:
+            return protected_file_response(
+                file_obj.getvalue(),
+                'shopping_lists',
+                'shopping-list.txt',
+                'text/plain; charset=utf-8',
+            )
         response = FileResponse(
             file_obj,
             content_type='text/plain; charset=utf-8'
@@ -332,3 +700,32 @@ class RecipeViewSet(viewsets.ModelViewSet):
             'attachment; filename="shopping-list.txt"'
         )
         return response
+
+
+class QueryStatsView(APIView):
+    """Статистика запросов к БД по эндпоинтам (только для администраторов)."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        """Возвращает агрегированные гистограммы текущего процесса."""
+        return Response(query_stats_registry.snapshot())
+
+    def delete(self, request):
+        """Сбрасывает накопленную статистику."""
+        query_stats_registry.reset()
+        return Response(status=HTTPStatus.NO_CONTENT)
+
+
+def metrics_view(request):
+    """Отдает метрики в текстовом формате экспозиции Prometheus."""
+    if settings.METRICS_TOKEN:
+        expected = f'Bearer {settings.METRICS_TOKEN}'
+        provided = request.headers.get('Authorization', '')
+        if not constant_time_compare(provided, expected):
+            return HttpResponse(status=HTTPStatus.UNAUTHORIZED)
+    metrics.record_pool_stats(connections)
+    return HttpResponse(
+        metrics.registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,155 @@
+"""
+Нагрузочный тест API на синтетических данных.
+
+Запуск из каталога backend/:
+    python -m benchmarks --database sqlite --requests 2000 --concurrency 8 \\
+        --output bench.json
+Результат (p50/p95/p99, RPS, запросов к БД на запрос) пишется в JSON,
+чтобы сравнивать прогоны между коммитами.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+
+def build_parser(prog='python -m benchmarks'):
+    parser = argparse.ArgumentParser(prog=prog)
+    parser.add_argument(
+        '--database', choices=('sqlite', 'postgres'), default='sqlite',
+        help='sqlite — временный файл; postgres — переменные POSTGRES_*.',
+    )
+    parser.add_argument('--sqlite-path', help='Путь к файлу SQLite.')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--recipes', type=int, default=2000)
+    parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+    parser.add_argument('--favorites', type=int, default=10000)
+    parser.add_argument('--cart-items', type=int, default=3000)
+    parser.add_argument('--subscriptions', type=int, default=3000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument(
+        '--mix',
+        help=(
+            'Веса сценариев через запятую, например '
+            'anonymous_feed=50,recipe_write=0.'
+        ),
+    )
+    parser.add_argument('--output', help='Файл для JSON-отчета.')
+    return parser
+
+
+def parse_args(argv=None):
+    return build_parser().parse_args(argv)
+
+
+def configure_environment(args):
+    """Настраивает окружение Django до вызова django.setup()."""
+    os.environ.setdefault(
+        'DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings'
+    )
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key')
+    os.environ['DJANGO_DEBUG'] = 'False'
+    os.environ.setdefault(
+        'MEDIA_ROOT', os.path.join(tempfile.gettempdir(), 'foodgram-bench')
+    )
+    if args.database == 'sqlite':
+        os.environ['DJANGO_USE_SQLITE'] = 'True'
+        os.environ['SQLITE_PATH'] = args.sqlite_path or os.path.join(
+            tempfile.gettempdir(), 'foodgram-bench.sqlite3'
+        )
+    else:
+        os.environ['DJANGO_USE_SQLITE'] = 'False'
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_mix(spec, defaults=None):
+    """Веса сценариев: значения по умолчанию, измененные --mix."""
+    from benchmarks.scenarios import DEFAULT_MIX, SCENARIOS
+
+    mix = dict(defaults or DEFAULT_MIX)
+    if spec:
+        for item in spec.split(','):
+            name, _, weight = item.partition('=')
+            if name not in SCENARIOS:
+                sys.exit(f'Неизвестный сценарий: {name}')
+            mix[name] = float(weight)
+    return mix
+
+
+def prepare_dataset(args):
+    """Применяет миграции и наполняет БД; нужен django.setup()."""
+    from django.core.management import call_command
+
+    from benchmarks import dataset
+
+    call_command('migrate', verbosity=0, interactive=False)
+    config = dataset.DatasetConfig(
+        users=args.users,
+        recipes=args.recipes,
+        ingredients_per_recipe=args.ingredients_per_recipe,
+        favorites=args.favorites,
+        cart_items=args.cart_items,
+        subscriptions=args.subscriptions,
+        seed=args.seed,
+    )
+    seeded = dataset.seed(config)
+    return config, seeded, dataset.load_fixtures()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+
+    import django
+
+    django.setup()
+
+    from django.db import connection
+
+    from benchmarks import runner
+
+    mix = build_mix(args.mix)
+    config, seeded, fixtures = prepare_dataset(args)
+
+    result = runner.run(
+        fixtures,
+        mix,
+        total_requests=args.requests,
+        concurrency=args.concurrency,
+        seed=args.seed,
+        warmup=args.warmup,
+    )
+    report = {
+        'revision': git_revision(),
+        'database': connection.vendor,
+        'dataset': config.as_dict(),
+        'seeded': seeded['seeded'],
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'mix': mix,
+        **result,
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Синтетический набор данных для нагрузочного тестирования."""
+from dataclasses import asdict, dataclass
+
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from api.datagen import DatasetGenerator
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+
+BENCH_USERNAME_PREFIX = 'bench_'
+BENCH_EMAIL_DOMAIN = 'bench.example.org'
+BATCH_SIZE = 2000
+
+
+@dataclass
+class DatasetConfig:
+    """Параметры синтетического набора данных."""
+
+    users: int = 200
+    recipes: int = 2000
+    ingredients_per_recipe: int = 8
+    favorites: int = 10000
+    cart_items: int = 3000
+    subscriptions: int = 3000
+    seed: int = 42
+
+    def as_dict(self):
+        return asdict(self)
+
+
+@transaction.atomic
+def seed(config: DatasetConfig) -> dict:
+    """Наполняет БД синтетическими данными, если они еще не созданы."""
+    generator = DatasetGenerator(
+        **config.as_dict(),
+        chunk_size=BATCH_SIZE,
+        username_prefix=BENCH_USERNAME_PREFIX,
+        email_domain=BENCH_EMAIL_DOMAIN,
+    )
+    if generator.exists():
+        return {'seeded': False}
+    generator.run()
+    Token.objects.bulk_create(
+        (
+            Token(key=Token.generate_key(), user_id=pk)
+            for pk in User.objects
+            .filter(email__endswith=BENCH_EMAIL_DOMAIN)
+            .values_list('id', flat=True)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    return {'seeded': True}
+
+
+def load_fixtures():
+    """Возвращает данные, нужные сценариям: токены, теги, рецепты."""
+    tokens = dict(
+        Token.objects
+        .filter(user__email__endswith=BENCH_EMAIL_DOMAIN)
+        .values_list('user_id', 'key')
+    )
+    own_recipes = {}
+    for recipe_id, author_id in (
+        Recipe.objects
+        .filter(author_id__in=tokens)
+        .values_list('id', 'author_id')
+    ):
+        own_recipes.setdefault(author_id, []).append(recipe_id)
+    return {
+        'tokens': tokens,
+        'own_recipes': own_recipes,
+        'tag_ids': list(Tag.objects.values_list('id', flat=True)),
+        'tag_slugs': list(Tag.objects.values_list('slug', flat=True)),
+        'ingredient_ids': list(
+            Ingredient.objects.values_list('id', flat=True)[:1000]
+        ),
+        'ingredient_prefixes': sorted({
+            name[:2].lower()
+            for name in Ingredient.objects.values_list(
+                'name', flat=True
+            )[:1000]
+        }),
+        'recipe_pages': max(Recipe.objects.count() // 6, 1),
+    }
@@ -0,0 +1,167 @@
+"""
+Нагрузка через nginx с микрокешем: анонимные GET ленты, карточек рецептов,
+тегов и поиска ингредиентов. По заголовку X-Cache-Status считается, сколько
+запросов дошло до backend (все, кроме HIT, STALE и UPDATING).
+
+Работает без Django — только HTTP к уже запущенному стеку:
+    cd infra && docker compose up -d --build
+    cd backend && python -m benchmarks.edge --url http://localhost \\
+        --requests 5000 --concurrency 32 --output edge.json
+Для сравнения без кеша: MICROCACHE_SECONDS=0 в .env и перезапуск backend.
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
+SERVED_FROM_CACHE = frozenset(('HIT', 'STALE', 'UPDATING'))
+INGREDIENT_PREFIXES = ('а', 'б', 'в', 'к', 'м', 'с', 'ч', 'я')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.edge')
+    parser.add_argument('--url', default='http://localhost')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument(
+        '--pages', type=int, default=20,
+        help='Сколько страниц ленты запрашивать (чаще — первые).',
+    )
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Файл для JSON-отчета.')
+    return parser.parse_args(argv)
+
+
+class EdgeClient:
+    """Keep-alive соединение на поток; возвращает и X-Cache-Status."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(
+                self.host, self.port, timeout=60
+            )
+        return connection
+
+    def get(self, path):
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                body = response.read()
+                return (
+                    response.status,
+                    response.getheader('X-Cache-Status') or '-',
+                    body,
+                )
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+
+def discover_recipe_ids(client):
+    status, _, body = client.get('/api/recipes/?limit=100')
+    if status != 200:
+        raise SystemExit(f'/api/recipes/: ответ {status}')
+    return [recipe['id'] for recipe in json.loads(body)['results']]
+
+
+def build_plan(rng, total, pages, recipe_ids):
+    """Пути запросов: популярные страницы и рецепты запрашиваются чаще."""
+    page_weights = [1 / page for page in range(1, pages + 1)]
+    recipe_weights = [1 / rank for rank in range(1, len(recipe_ids) + 1)]
+    plan = []
+    for _ in range(total):
+        kind = rng.choices(
+            ('feed', 'recipe', 'tags', 'ingredients'), (5, 3, 1, 2)
+        )[0]
+        if kind == 'feed':
+            page = rng.choices(range(1, pages + 1), page_weights)[0]
+            plan.append(f'/api/recipes/?page={page}')
+        elif kind == 'recipe' and recipe_ids:
+            recipe_id = rng.choices(recipe_ids, recipe_weights)[0]
+            plan.append(f'/api/recipes/{recipe_id}/')
+        elif kind == 'ingredients':
+            prefix = quote(rng.choice(INGREDIENT_PREFIXES))
+            plan.append(f'/api/ingredients/?name={prefix}')
+        else:
+            plan.append('/api/tags/')
+    return plan
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = int(round(q * (len(sorted_values) - 1)))
+    return round(sorted_values[index], 3)
+
+
+def run(client, plan, concurrency):
+    samples = []
+    lock = threading.Lock()
+
+    def execute(path):
+        started = time.perf_counter()
+        status, cache_status, _ = client.get(path)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with lock:
+            samples.append((status, cache_status, elapsed_ms))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(execute, plan))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(sample[2] for sample in samples)
+    statuses = Counter(sample[1] for sample in samples)
+    origin = sum(
+        count for status, count in statuses.items()
+        if status not in SERVED_FROM_CACHE
+    )
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample[0] >= 400),
+        'rps': round(len(samples) / elapsed, 2),
+        'origin_requests': origin,
+        'origin_rps': round(origin / elapsed, 2),
+        'hit_ratio': round(1 - origin / len(samples), 4),
+        'cache_status': dict(statuses.most_common()),
+        'p50_ms': _percentile(latencies, 0.50),
+        'p99_ms': _percentile(latencies, 0.99),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    client = EdgeClient(args.url)
+    rng = random.Random(args.seed)
+    recipe_ids = discover_recipe_ids(client)
+    plan = build_plan(rng, args.requests, args.pages, recipe_ids)
+    report = {
+        'url': args.url,
+        'concurrency': args.concurrency,
+        **run(client, plan, args.concurrency),
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
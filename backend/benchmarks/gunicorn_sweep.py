@@ -0,0 +1,229 @@
+"""
+Подбор настроек gunicorn: сервер запускается с разными классами воркеров,
+числом процессов и потоков на заданном числе CPU, и по HTTP прогоняется та
+же смешанная нагрузка, что и в python -m benchmarks.
+
+Запуск из каталога backend/:
+    python -m benchmarks.gunicorn_sweep --database postgres --cpus 2 \\
+        --cpus 8 --requests 3000 --concurrency 64 --output sweep.json
+Для каждого числа CPU в отчете есть все прогоны и recommended — конфигурация
+с наибольшим RPS без ошибок (при равенстве — с меньшим p99).
+"""
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.__main__ import (
+    build_mix,
+    build_parser,
+    configure_environment,
+    git_revision,
+    prepare_dataset
+)
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+READY_PATH = '/api/tags/'
+READY_TIMEOUT = 60
+
+
+def parse_args(argv=None):
+    parser = build_parser('python -m benchmarks.gunicorn_sweep')
+    parser.add_argument(
+        '--cpus', type=int, action='append',
+        help='Число CPU для сервера (можно указать несколько раз).',
+    )
+    parser.add_argument(
+        '--candidate', action='append', dest='candidates',
+        help=(
+            'Своя конфигурация класс:воркеры:потоки, например gthread:4:8; '
+            'заменяет сетку по умолчанию.'
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+def default_candidates(cpus):
+    """Сетка вокруг обычных рекомендаций для данного числа CPU."""
+    return [
+        ('sync', cpus * 2 + 1, 1),
+        ('gthread', cpus, 8),
+        ('gthread', cpus * 2, 2),
+        ('gthread', cpus * 2, 4),
+        ('gthread', cpus * 2 + 1, 4),
+    ]
+
+
+def parse_candidate(spec):
+    worker_class, workers, threads = spec.split(':')
+    return worker_class, int(workers), int(threads)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _cpu_set(cpus):
+    """Первые cpus из доступных процессу CPU."""
+    available = sorted(os.sched_getaffinity(0))
+    return set(available[:cpus])
+
+
+def start_server(cpus, worker_class, workers, threads):
+    """Запускает gunicorn, привязанный к cpus ядрам; возвращает процесс."""
+    port = _free_port()
+    env = dict(
+        os.environ,
+        GUNICORN_BIND=f'127.0.0.1:{port}',
+        GUNICORN_CPUS=str(cpus),
+        GUNICORN_WORKER_CLASS=worker_class,
+        GUNICORN_WORKERS=str(workers),
+        GUNICORN_THREADS=str(threads),
+        GUNICORN_LOGLEVEL='warning',
+        GUNICORN_ACCESSLOG='',
+    )
+    cpu_set = _cpu_set(cpus)
+    process = subprocess.Popen(
+        (sys.executable, '-m', 'gunicorn', 'foodgram_backend.wsgi'),
+        cwd=BACKEND_DIR,
+        env=env,
+        # Привязка наследуется мастером и всеми воркерами.
+        preexec_fn=lambda: os.sched_setaffinity(0, cpu_set),
+    )
+    return process, port
+
+
+def wait_ready(process, port):
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn завершился с кодом {process.poll()}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn не начал принимать соединения')
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=40)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _better(overall, best):
+    if best is None:
+        return True
+    if overall['errors'] != best['errors']:
+        return overall['errors'] < best['errors']
+    if overall['rps'] != best['rps']:
+        return overall['rps'] > best['rps']
+    return (overall['p99_ms'] or 0) < (best['p99_ms'] or 0)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+
+    import django
+
+    django.setup()
+
+    from django.db import connection
+
+    from benchmarks import runner
+
+    # На SQLite параллельные записи из нескольких процессов упираются в
+    # блокировку файла, а не в настройки gunicorn.
+    defaults = build_mix(None)
+    if args.database == 'sqlite':
+        defaults['recipe_write'] = 0
+    mix = build_mix(args.mix, defaults)
+    config, seeded, fixtures = prepare_dataset(args)
+    vendor = connection.vendor
+    connection.close()
+
+    available = len(os.sched_getaffinity(0))
+    report = {
+        'revision': git_revision(),
+        'database': vendor,
+        'dataset': config.as_dict(),
+        'seeded': seeded['seeded'],
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'mix': mix,
+        'cpus_available': available,
+        'sweeps': [],
+    }
+    for cpus in args.cpus or [available]:
+        if cpus > available:
+            print(
+                f'Доступно {available} CPU, прогон для {cpus} CPU будет '
+                'неточным.', file=sys.stderr,
+            )
+        candidates = (
+            [parse_candidate(spec) for spec in args.candidates]
+            if args.candidates else default_candidates(cpus)
+        )
+        runs = []
+        best = None
+        for worker_class, workers, threads in candidates:
+            process, port = start_server(cpus, worker_class, workers, threads)
+            try:
+                wait_ready(process, port)
+                client = runner.HTTPClient('127.0.0.1', port)
+                client.request('GET', READY_PATH)
+                result = runner.run(
+                    fixtures,
+                    mix,
+                    total_requests=args.requests,
+                    concurrency=args.concurrency,
+                    seed=args.seed,
+                    warmup=args.warmup,
+                    client=client,
+                )
+            finally:
+                stop_server(process)
+            result = {
+                'worker_class': worker_class,
+                'workers': workers,
+                'threads': threads,
+                **result,
+            }
+            overall = result['overall']
+            print(
+                f'cpus={cpus} {worker_class} workers={workers} '
+                f'threads={threads}: {overall["rps"]} rps, '
+                f'p99 {overall["p99_ms"]} ms, {overall["errors"]} ошибок',
+                file=sys.stderr,
+            )
+            runs.append(result)
+            if _better(overall, best and best['overall']):
+                best = result
+        report['sweeps'].append({
+            'cpus': cpus,
+            'runs': runs,
+            'recommended': {
+                key: best[key]
+                for key in ('worker_class', 'workers', 'threads')
+            },
+        })
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
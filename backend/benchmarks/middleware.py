@@ -0,0 +1,144 @@
+"""
+Накладные расходы слоя сессий (SESSION_MIDDLEWARE) на запрос к API.
+
+Сравнивает два варианта: с api.middleware.PathScopedMiddleware, который
+пропускает слой для SESSIONLESS_PATH_PREFIXES, и с тем же слоем для всех
+путей (как до его появления). Замеряется и сам стек middleware вокруг
+пустого ответа, и запрос целиком через WSGI-обработчик.
+
+Запуск из каталога backend/:
+    python -m benchmarks.middleware --requests 20000 --output mw.json
+"""
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.__main__ import configure_environment, git_revision
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.middleware')
+    parser.add_argument(
+        '--database', choices=('sqlite', 'postgres'), default='sqlite',
+    )
+    parser.add_argument('--sqlite-path', help='Путь к файлу SQLite.')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument(
+        '--path', default='/api/tags/',
+        help='Путь для замера запроса целиком.',
+    )
+    parser.add_argument('--output', help='Файл для JSON-отчета.')
+    return parser.parse_args(argv)
+
+
+def _per_request_us(call, requests, rounds):
+    """Медиана по раундам среднего времени вызова, мкс."""
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(requests):
+            call()
+        samples.append((time.perf_counter() - started) / requests * 1e6)
+    return round(statistics.median(samples), 2)
+
+
+def bench_stack(factory, path, requests, rounds):
+    """Только middleware из SESSION_MIDDLEWARE вокруг пустого ответа."""
+    from django.http import HttpResponse
+    from django.test.utils import override_settings
+
+    from api.middleware import PathScopedMiddleware
+
+    def view(request):
+        return HttpResponse()
+
+    def stack(**overrides):
+        with override_settings(**overrides):
+            middleware = PathScopedMiddleware(view)
+
+        def call():
+            request = factory.get(path, HTTP_AUTHORIZATION='Token x')
+            middleware.process_view(request, view, (), {})
+            middleware(request)
+
+        return call
+
+    def bare():
+        factory.get(path, HTTP_AUTHORIZATION='Token x')
+
+    baseline = _per_request_us(bare, requests, rounds)
+    return {
+        'full_stack_us': round(
+            _per_request_us(
+                stack(SESSIONLESS_PATH_PREFIXES=()), requests, rounds
+            ) - baseline, 2
+        ),
+        'scoped_us': round(
+            _per_request_us(stack(), requests, rounds) - baseline, 2
+        ),
+    }
+
+
+def bench_wsgi(path, requests, rounds):
+    """Запрос целиком через WSGIHandler со всеми middleware из MIDDLEWARE."""
+    from django.test.utils import override_settings
+
+    from benchmarks.runner import WSGIClient
+
+    result = {}
+    variants = (
+        ('full_stack_us', {'SESSIONLESS_PATH_PREFIXES': ()}),
+        ('scoped_us', {}),
+    )
+    for name, overrides in variants:
+        with override_settings(QUERY_BUDGET_RAISE=False, **overrides):
+            client = WSGIClient()
+            status, _ = client.request('GET', path)
+            if status != 200:
+                raise SystemExit(f'{path}: ответ {status}')
+            result[name] = _per_request_us(
+                lambda: client.request('GET', path), requests, rounds
+            )
+    return result
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+
+    import django
+
+    django.setup()
+
+    from django.core.management import call_command
+    from django.test import RequestFactory
+
+    call_command('migrate', verbosity=0, interactive=False)
+    factory = RequestFactory(HTTP_HOST='localhost')
+    stack = bench_stack(factory, args.path, args.requests, args.rounds)
+    wsgi = bench_wsgi(args.path, max(args.requests // 10, 1), args.rounds)
+    report = {
+        'revision': git_revision(),
+        'path': args.path,
+        'middleware_stack': {
+            **stack, 'saved_us': round(
+                stack['full_stack_us'] - stack['scoped_us'], 2
+            ),
+        },
+        'wsgi_request': {
+            **wsgi, 'saved_us': round(
+                wsgi['full_stack_us'] - wsgi['scoped_us'], 2
+            ),
+        },
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
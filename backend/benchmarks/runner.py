@@ -0,0 +1,171 @@
+"""Запуск смешанной нагрузки через WSGI-обработчик Django или по HTTP."""
+import http.client
+import io
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIHandler
+
+from api.instrumentation import QueryCounter
+from benchmarks.scenarios import SCENARIOS
+
+
+class WSGIClient:
+    """Минимальный WSGI-клиент: полный стек middleware и URLconf."""
+
+    def __init__(self, host='localhost'):
+        self.handler = WSGIHandler()
+        self.host = host
+
+    def request(self, method, path, token=None, body=None):
+        parts = urlsplit(path)
+        payload = (body or '').encode('utf-8')
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': parts.path,
+            'QUERY_STRING': parts.query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': self.host,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(payload)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(payload),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        if token:
+            environ['HTTP_AUTHORIZATION'] = f'Token {token}'
+        status = {}
+
+        def start_response(status_line, headers, exc_info=None):
+            status['code'] = int(status_line.split(' ', 1)[0])
+
+        result = self.handler(environ, start_response)
+        try:
+            size = sum(len(chunk) for chunk in result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return status['code'], size
+
+
+class HTTPClient:
+    """Клиент для запущенного сервера; keep-alive соединение на поток."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(
+                self.host, self.port, timeout=60
+            )
+        return connection
+
+    def request(self, method, path, token=None, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        payload = (body or '').encode('utf-8')
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, path, payload, headers)
+                response = connection.getresponse()
+                return response.status, len(response.read())
+            except (http.client.HTTPException, OSError):
+                # Воркер перезапустился (max_requests) и закрыл соединение.
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = int(round(q * (len(sorted_values) - 1)))
+    return round(sorted_values[index], 3)
+
+
+def _summarize(samples, elapsed):
+    latencies = sorted(sample['ms'] for sample in samples)
+    queries = [
+        sample['queries'] for sample in samples
+        if sample['queries'] is not None
+    ]
+    errors = sum(1 for sample in samples if sample['status'] >= 400)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'p50_ms': _percentile(latencies, 0.50),
+        'p95_ms': _percentile(latencies, 0.95),
+        'p99_ms': _percentile(latencies, 0.99),
+        'queries_per_request': (
+            round(sum(queries) / len(queries), 2) if queries else None
+        ),
+    }
+
+
+def run(fixtures, mix, total_requests, concurrency, seed=42, warmup=20,
+        client=None):
+    """
+    Выполняет total_requests запросов в concurrency потоков. Без client —
+    внутри процесса через WSGIClient; запросы к БД считаются только так.
+    """
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    client = client or WSGIClient()
+    in_process = isinstance(client, WSGIClient)
+    master_rng = random.Random(seed)
+    plan = master_rng.choices(names, weights=weights, k=total_requests)
+    samples = []
+    samples_lock = threading.Lock()
+
+    def execute(index_and_name):
+        index, name = index_and_name
+        rng = random.Random(seed * 1_000_003 + index)
+        request = SCENARIOS[name](rng, fixtures)
+        start = time.perf_counter()
+        with QueryCounter() as counter:
+            status, size = client.request(
+                request.method, request.path, request.token, request.body
+            )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if index < warmup:
+            return
+        with samples_lock:
+            samples.append({
+                'scenario': name,
+                'status': status,
+                'ms': elapsed_ms,
+                'queries': counter.count if in_process else None,
+                'bytes': size,
+            })
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(execute, enumerate(plan)))
+    elapsed = time.perf_counter() - started
+
+    per_scenario = {}
+    for name in names:
+        scenario_samples = [s for s in samples if s['scenario'] == name]
+        per_scenario[name] = _summarize(scenario_samples, elapsed)
+    return {
+        'overall': _summarize(samples, elapsed),
+        'scenarios': per_scenario,
+        'elapsed_s': round(elapsed, 3),
+    }
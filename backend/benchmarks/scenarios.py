@@ -0,0 +1,102 @@
+"""Сценарии нагрузки: каждый возвращает параметры одного HTTP-запроса."""
+import json
+from urllib.parse import urlencode
+
+
+PNG_2PX = (
+    'data:image/png;base64,'
+    'iVBORw0KGgoAAAANSUhEUgAAAAIAAAACCAIAAAD91JpzAAAAFklEQVR4nGM8UaHBwMDA'
+    'xMDAwMDAAAARqgFsecZ2JgAAAABJRU5ErkJggg=='
+)
+
+DEFAULT_MIX = {
+    'anonymous_feed': 40,
+    'filtered_feed': 20,
+    'ingredient_autocomplete': 20,
+    'subscriptions_feed': 8,
+    'cart_download': 5,
+    'recipe_write': 7,
+}
+
+
+class Request:
+    """Описание запроса, который выполнит воркер."""
+
+    def __init__(self, method, path, token=None, body=None):
+        self.method = method
+        self.path = path
+        self.token = token
+        self.body = body
+
+
+def _random_user(rng, fixtures):
+    user_id = rng.choice(list(fixtures['tokens']))
+    return user_id, fixtures['tokens'][user_id]
+
+
+def anonymous_feed(rng, fixtures):
+    page = rng.randint(1, min(fixtures['recipe_pages'], 50))
+    return Request('GET', f'/api/recipes/?page={page}')
+
+
+def filtered_feed(rng, fixtures):
+    _, token = _random_user(rng, fixtures)
+    tags = '&'.join(
+        f'tags={slug}'
+        for slug in rng.sample(fixtures['tag_slugs'], 1)
+    )
+    flag = rng.choice(('is_favorited=1', 'is_in_shopping_cart=1', ''))
+    return Request('GET', f'/api/recipes/?{tags}&{flag}', token=token)
+
+
+def ingredient_autocomplete(rng, fixtures):
+    prefix = rng.choice(fixtures['ingredient_prefixes'])
+    return Request('GET', f'/api/ingredients/?{urlencode({"name": prefix})}')
+
+
+def subscriptions_feed(rng, fixtures):
+    _, token = _random_user(rng, fixtures)
+    return Request(
+        'GET', '/api/users/subscriptions/?recipes_limit=3', token=token
+    )
+
+
+def cart_download(rng, fixtures):
+    _, token = _random_user(rng, fixtures)
+    return Request(
+        'GET', '/api/recipes/download_shopping_cart/', token=token
+    )
+
+
+def recipe_write(rng, fixtures):
+    user_id, token = _random_user(rng, fixtures)
+    body = {
+        'ingredients': [
+            {'id': ingredient_id, 'amount': rng.randint(1, 500)}
+            for ingredient_id in rng.sample(fixtures['ingredient_ids'], 5)
+        ],
+        'tags': rng.sample(fixtures['tag_ids'], 1),
+        'image': PNG_2PX,
+        'name': f'Нагрузочный рецепт {rng.randint(1, 10 ** 9)}',
+        'text': 'Создан нагрузочным тестом.',
+        'cooking_time': rng.randint(1, 120),
+    }
+    own = fixtures['own_recipes'].get(user_id)
+    if own and rng.random() < 0.5:
+        return Request(
+            'PATCH',
+            f'/api/recipes/{rng.choice(own)}/',
+            token=token,
+            body=json.dumps(body),
+        )
+    return Request('POST', '/api/recipes/', token=token, body=json.dumps(body))
+
+
+SCENARIOS = {
+    'anonymous_feed': anonymous_feed,
+    'filtered_feed': filtered_feed,
+    'ingredient_autocomplete': ingredient_autocomplete,
+    'subscriptions_feed': subscriptions_feed,
+    'cart_download': cart_download,
+    'recipe_write': recipe_write,
+}
@@ -0,0 +1,9 @@
+"""
+URL админки. Модуль импортируется при первом разрешении адреса /admin/ или
+reverse(): тогда же регистрируются модели из admin.py приложений.
+"""
+from django.contrib import admin
+
+admin.autodiscover()
+
+urlpatterns = admin.site.get_urls()
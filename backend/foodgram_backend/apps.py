@@ -0,0 +1,40 @@
+"""
+Админка без autodiscover при старте процесса.
+
+Модули admin.py приложений (и формы django.contrib.auth) импортируются при
+первом обращении к /admin/ (foodgram_backend.admin_urls) или при проверках
+manage.py check, а не в каждом воркере API во время django.setup().
+"""
+from django.conf import settings
+from django.contrib.admin.apps import SimpleAdminConfig
+from django.contrib.admin.checks import check_admin_app, check_dependencies
+from django.core import checks
+
+
+def check_lazy_admin_app(app_configs, **kwargs):
+    """Проверки ModelAdmin после регистрации моделей."""
+    from django.contrib import admin
+
+    admin.autodiscover()
+    return check_admin_app(app_configs, **kwargs)
+
+
+def check_admin_dependencies(**kwargs):
+    """
+    Зависимости админки с учетом middleware, которые для /admin/ выполняет
+    api.middleware.PathScopedMiddleware (SESSION_MIDDLEWARE).
+    """
+    from django.test.utils import override_settings
+
+    with override_settings(
+        MIDDLEWARE=[*settings.MIDDLEWARE, *settings.SESSION_MIDDLEWARE]
+    ):
+        return check_dependencies(**kwargs)
+
+
+class LazyAdminConfig(SimpleAdminConfig):
+    """django.contrib.admin с отложенной регистрацией моделей."""
+
+    def ready(self):
+        checks.register(check_admin_dependencies, checks.Tags.admin)
+        checks.register(check_lazy_admin_app, checks.Tags.admin)
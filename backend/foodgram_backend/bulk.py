@@ -0,0 +1,159 @@
+"""Массовая запись строк: COPY для PostgreSQL, executemany для остальных БД."""
+import csv
+import io
+
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+
+
+PREPARED_FIELD_TYPES = (models.DateField, models.BooleanField)
+
+
+def copy_supported():
+    """Доступен ли COPY FROM STDIN в текущем подключении."""
+    return connection.vendor == 'postgresql'
+
+
+def _to_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for row in rows:
+        writer.writerow(['\\N' if value is None else value for value in row])
+    return buffer.getvalue()
+
+
+def copy_rows(table, columns, rows):
+    """Загружает строки через COPY ... FROM STDIN (psycopg2 и psycopg 3)."""
+    quote = connection.ops.quote_name
+    sql = (
+        f'COPY {quote(table)} ({", ".join(quote(c) for c in columns)}) '
+        "FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    )
+    payload = _to_csv(rows)
+    with connection.cursor() as django_cursor:
+        raw = django_cursor.cursor
+        if hasattr(raw, 'copy_expert'):
+            raw.copy_expert(sql, io.StringIO(payload))
+        else:
+            with raw.copy(sql) as copy:
+                copy.write(payload)
+
+
+def insert_rows(table, columns, rows):
+    """Вставляет строки одним executemany."""
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(columns))
+    sql = (
+        f'INSERT INTO {quote(table)} '
+        f'({", ".join(quote(c) for c in columns)}) VALUES ({placeholders})'
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+class ChunkWriter:
+    """
+    Копит строки модели и записывает их пачками по chunk_size.
+
+    В отличие от bulk_create пишет значения как есть: не вызывает pre_save,
+    поэтому auto_now_add-поля и первичные ключи можно задать явно.
+    """
+
+    def __init__(self, model, fields, chunk_size=10000, use_copy=None):
+        self.model = model
+        self.table = model._meta.db_table
+        model_fields = [model._meta.get_field(name) for name in fields]
+        self.columns = [field.column for field in model_fields]
+        # Даты и булевы значения приводятся к формату конкретной БД.
+        self._prepared = [
+            (index, field)
+            for index, field in enumerate(model_fields)
+            if isinstance(field, PREPARED_FIELD_TYPES)
+        ]
+        self.chunk_size = chunk_size
+        self.use_copy = copy_supported() if use_copy is None else use_copy
+        self.written = 0
+        self._rows = []
+
+    def add(self, row):
+        if self._prepared:
+            row = list(row)
+            for index, field in self._prepared:
+                row[index] = field.get_db_prep_value(row[index], connection)
+        self._rows.append(row)
+        if len(self._rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        if self.use_copy:
+            copy_rows(self.table, self.columns, self._rows)
+        else:
+            insert_rows(self.table, self.columns, self._rows)
+        self.written += len(self._rows)
+        self._rows = []
+
+
+def reset_sequences(*models):
+    """Сдвигает счетчики первичных ключей после вставки с явными id."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if not statements:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def insert_missing(model, fields, rows, use_copy=None):
+    """
+    Добавляет строки, которых еще нет в таблице, и возвращает их число.
+
+    Поля fields должны совпадать с уникальным ограничением модели.
+    На PostgreSQL строки грузятся через COPY во временную таблицу, откуда
+    переносятся одним INSERT ... ON CONFLICT DO NOTHING; на остальных
+    БД существующие ключи вычитываются одним запросом на пачку.
+    """
+    rows = list(dict.fromkeys(tuple(row) for row in rows))
+    if not rows:
+        return 0
+    use_copy = copy_supported() if use_copy is None else use_copy
+    with transaction.atomic():
+        if use_copy:
+            return _copy_insert_missing(model, fields, rows)
+        first = fields[0]
+        existing = set(
+            model.objects.filter(
+                **{f'{first}__in': {row[0] for row in rows}}
+            ).values_list(*fields)
+        )
+        missing = [row for row in rows if row not in existing]
+        if missing:
+            insert_rows(
+                model._meta.db_table,
+                [model._meta.get_field(name).column for name in fields],
+                missing,
+            )
+        return len(missing)
+
+
+def _copy_insert_missing(model, fields, rows):
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(name).column for name in fields]
+    table = quote(model._meta.db_table)
+    temp_name = f'import_{model._meta.db_table}'
+    temp = quote(temp_name)
+    column_list = ', '.join(quote(column) for column in columns)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {temp}')
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {temp} ON COMMIT DROP AS '
+            f'SELECT {column_list} FROM {table} WITH NO DATA'
+        )
+        copy_rows(temp_name, columns, rows)
+        cursor.execute(
+            f'INSERT INTO {table} ({column_list}) '
+            f'SELECT {column_list} FROM {temp} '
+            f'ON CONFLICT ({column_list}) DO NOTHING'
+        )
+        return cursor.rowcount
@@ -14,6 +14,8 @@ RECIPE_NAME_MAX_LENGTH = 256
 # ingredients
 INGREDIENT_NAME_MAX_LENGTH = 128
 MEASUREMENT_UNIT_MAX_LENGTH = 64
+INGREDIENT_OPERATION_MAX_LENGTH = 6
+INGREDIENT_CHANGES_PAGE_SIZE = 1000
 
 # string representation helper
 STR_REPRESENTATION_MAX_LENGTH = 20
@@ -26,6 +28,16 @@ MIN_INGREDIENT_AMOUNT = 1
 DEFAULT_PAGE_SIZE = 6
 MAX_PAGE_SIZE = 100
 
+# recommendations
+RECOMMENDATIONS_LIMIT = 10
+RECOMMENDATIONS_MAX_LIMIT = 20
+RECOMMENDATIONS_SEED_SIZE = 100
+COOK_MAX_INGREDIENTS = 50
+COOK_MAX_MISSING = 10
+
+# favorites/shopping cart batches
+RECIPE_BATCH_MAX_SIZE = 100
+
 # admin/configuration
 ADMIN_INGREDIENT_INLINE_EXTRA = 0
 ADMIN_INGREDIENT_INLINE_MIN_NUM = 1
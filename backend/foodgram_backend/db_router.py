@@ -0,0 +1,63 @@
+"""
+Маршрутизация запросов к БД между основной базой и репликами.
+
+Записи, select_for_update и все запросы внутри транзакции идут в default.
+Чтения идут в случайную реплику из DATABASE_REPLICAS только там, где это
+явно разрешено: api.middleware.ReplicaRoutingMiddleware выключает
+use_primary для безопасных HTTP-запросов, кроме чтений в течение
+REPLICA_STICKY_SECONDS после записи того же клиента (read-your-writes).
+Команды управления и фоновые потоки читают из основной базы.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+_use_primary = ContextVar('use_primary', default=True)
+
+
+@contextmanager
+def use_primary(enabled=True):
+    """Внутри блока чтения идут в основную базу (enabled) или в реплики."""
+    token = _use_primary.set(enabled)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+def in_transaction(connection):
+    """
+    Открыта ли транзакция приложения. Атомарные блоки, которыми TestCase
+    оборачивает тесты, не считаются — как и в проверке durable в Django.
+    """
+    if not connection.in_atomic_block:
+        return False
+    # Без atomic-блоков транзакция открыта через set_autocommit(False).
+    return not connection.atomic_blocks or any(
+        not block._from_testcase for block in connection.atomic_blocks
+    )
+
+
+class PrimaryReplicaRouter:
+    """Чтения — в реплики, записи — в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or _use_primary.get()
+            or in_transaction(connections[DEFAULT_DB_ALIAS])
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
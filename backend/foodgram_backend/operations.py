@@ -0,0 +1,127 @@
+"""
+Операции миграций для индексов на больших таблицах.
+
+На PostgreSQL индексы создаются через CREATE INDEX CONCURRENTLY — без
+блокировки записи на время построения; такие миграции должны быть
+неатомарными (atomic = False). На остальных СУБД (SQLite в разработке)
+выполняется обычный CREATE INDEX.
+"""
+from django.db import NotSupportedError
+from django.db.migrations.operations import AddIndex
+from django.db.migrations.operations.base import Operation
+
+
+def _concurrently(schema_editor, operation):
+    """True для PostgreSQL; проверяет, что миграция вне транзакции."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return False
+    if schema_editor.connection.in_atomic_block:
+        raise NotSupportedError(
+            f'{operation.__class__.__name__} нельзя выполнять в транзакции '
+            '(укажите atomic = False в миграции).'
+        )
+    return True
+
+
+class AddIndexConcurrently(AddIndex):
+    """AddIndex, который на PostgreSQL строит индекс CONCURRENTLY."""
+
+    atomic = False
+
+    def describe(self):
+        return (
+            f'Concurrently create index {self.index.name} '
+            f'on {self.model_name}'
+        )
+
+    def database_forwards(
+        self, app_label, schema_editor, from_state, to_state
+    ):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if _concurrently(schema_editor, self):
+            schema_editor.add_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.add_index(model, self.index)
+
+    def database_backwards(
+        self, app_label, schema_editor, from_state, to_state
+    ):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if _concurrently(schema_editor, self):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, self.index)
+
+
+class AddRawIndexConcurrently(Operation):
+    """
+    Индекс, который нельзя описать в Meta модели: на автоматической
+    промежуточной таблице M2M или с классом операторов PostgreSQL. В
+    состояние моделей не попадает (как и индексы *_like самого Django).
+    vendors ограничивает СУБД, на которых индекс создается.
+    """
+
+    reversible = True
+    atomic = False
+
+    def __init__(self, name, table, columns, condition=None, vendors=None):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.condition = condition
+        self.vendors = vendors
+
+    def deconstruct(self):
+        kwargs = {
+            'name': self.name,
+            'table': self.table,
+            'columns': self.columns,
+        }
+        if self.condition:
+            kwargs['condition'] = self.condition
+        if self.vendors:
+            kwargs['vendors'] = self.vendors
+        return self.__class__.__qualname__, (), kwargs
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def _applies(self, schema_editor):
+        return (
+            self.vendors is None
+            or schema_editor.connection.vendor in self.vendors
+        )
+
+    def database_forwards(
+        self, app_label, schema_editor, from_state, to_state
+    ):
+        if not self._applies(schema_editor):
+            return
+        quote = schema_editor.quote_name
+        concurrently = _concurrently(schema_editor, self)
+        sql = (
+            f'CREATE INDEX {"CONCURRENTLY " if concurrently else ""}'
+            f'IF NOT EXISTS {quote(self.name)} '
+            f'ON {quote(self.table)} ({self.columns})'
+        )
+        if self.condition:
+            sql += f' WHERE {self.condition}'
+        schema_editor.execute(sql)
+
+    def database_backwards(
+        self, app_label, schema_editor, from_state, to_state
+    ):
+        if not self._applies(schema_editor):
+            return
+        concurrently = _concurrently(schema_editor, self)
+        schema_editor.execute(
+            f'DROP INDEX {"CONCURRENTLY " if concurrently else ""}'
+            f'IF EXISTS {schema_editor.quote_name(self.name)}'
+        )
+
+    def describe(self):
+        return f'Concurrently create index {self.name} on {self.table}'
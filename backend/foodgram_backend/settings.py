@@ -1,4 +1,5 @@
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -14,8 +15,8 @@ DEBUG = os.getenv('DJANGO_DEBUG', 'False') == 'True'
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
 INSTALLED_APPS = [
-    # Django
-    'django.contrib.admin',
+    # Django (админка регистрирует модели при первом обращении)
+    'foodgram_backend.apps.LazyAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -36,13 +37,26 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'api.middleware.MicrocacheMiddleware',
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.QueryBudgetMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'api.middleware.PathScopedMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+# Слой браузерных страниц (админка): api.middleware.PathScopedMiddleware
+# выполняет его для всех путей, кроме SESSIONLESS_PATH_PREFIXES, — там
+# аутентификация только по токену.
+SESSION_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+SESSIONLESS_PATH_PREFIXES = ('/api/', '/s/', '/metrics')
+# CsrfViewMiddleware подключен через SESSION_MIDDLEWARE.
+SILENCED_SYSTEM_CHECKS = ['security.W003']
 
 ROOT_URLCONF = 'foodgram_backend.urls'
 
@@ -70,9 +84,12 @@ if os.getenv('DJANGO_USE_SQLITE', 'False') == 'True':
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': BASE_DIR / 'db.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
         }
     }
+    # Покрывающие индексы (INCLUDE) рассчитаны на PostgreSQL; SQLite
+    # строит их без неключевых столбцов.
+    SILENCED_SYSTEM_CHECKS += ['models.W040']
 else:
     DATABASES = {
         'default': {
@@ -84,6 +101,54 @@ else:
             'PORT': os.getenv('DB_PORT', '5432')
         }
     }
+    # Пул соединений Django (psycopg 3 + psycopg_pool): соединения
+    # выдаются воркеру из пула процесса. Без этих пакетов — постоянные
+    # соединения (CONN_MAX_AGE). Размеры пула — см. README.
+    if (
+        os.getenv('DB_POOL', 'False') == 'True'
+        and find_spec('psycopg') and find_spec('psycopg_pool')
+    ):
+        DATABASES['default']['OPTIONS'] = {'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '4')),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '600')),
+        }}
+
+# Пул несовместим с постоянными соединениями: с пулом CONN_MAX_AGE = 0.
+# Проверка соединения перед повторным использованием отсекает разорванные
+# (рестарт PostgreSQL, pgbouncer, таймауты).
+DATABASES['default'].update(
+    CONN_MAX_AGE=(
+        0 if 'pool' in DATABASES['default'].get('OPTIONS', {})
+        else int(os.getenv('DB_CONN_MAX_AGE', '60'))
+    ),
+    CONN_HEALTH_CHECKS=True,
+)
+
+# Реплики для чтения: DB_REPLICAS — через запятую хосты PostgreSQL
+# (host или host:port) или, для SQLite, пути к файлам.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+    filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1
+):
+    alias = f'replica_{number}'
+    config = {**DATABASES['default']}
+    if config['ENGINE'].endswith('sqlite3'):
+        # В тестах у SQLite-реплики своя база: по данным видно, откуда
+        # прочитан ответ (api/tests/test_replicas.py).
+        config['NAME'] = replica.strip()
+    else:
+        host, _, port = replica.strip().partition(':')
+        config.update(
+            HOST=host, PORT=port or config['PORT'],
+            TEST={'MIRROR': 'default'},
+        )
+    DATABASES[alias] = config
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['foodgram_backend.db_router.PrimaryReplicaRouter']
+# Сколько секунд после записи клиент читает из основной базы.
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -122,10 +187,52 @@ else:
 
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = (BASE_DIR / 'media') if DEBUG else '/app/media'
+MEDIA_ROOT = os.getenv('MEDIA_ROOT') or (
+    (BASE_DIR / 'media') if DEBUG else '/app/media'
+)
+# Загрузки именуются по хешу содержимого, одинаковые хранятся одним файлом
+# (foodgram_backend.storage). Файл без ссылок удаляется, если он не
+# сохранялся последние MEDIA_ORPHAN_GRACE секунд; остальные собирает
+# python manage.py gc_media.
+MEDIA_ORPHAN_GRACE = int(os.getenv('MEDIA_ORPHAN_GRACE', '300'))
+STORAGES = {
+    'default': {
+        'BACKEND': 'foodgram_backend.storage.HashedFileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Файлы, доступные только после проверки прав: Django пишет их в
+# PROTECTED_MEDIA_ROOT и отвечает X-Accel-Redirect на PROTECTED_MEDIA_URL,
+# а отдает их nginx (internal-локация в infra/nginx.conf). Без
+# USE_X_ACCEL_REDIRECT (нет nginx) файл отдает Django. Файлы старше
+# PROTECTED_MEDIA_TTL секунд удаляются.
+USE_X_ACCEL_REDIRECT = os.getenv('USE_X_ACCEL_REDIRECT', 'False') == 'True'
+PROTECTED_MEDIA_URL = '/protected/'
+PROTECTED_MEDIA_ROOT = os.getenv('PROTECTED_MEDIA_ROOT') or (
+    (BASE_DIR / 'protected') if DEBUG else '/app/protected'
+)
+PROTECTED_MEDIA_TTL = int(os.getenv('PROTECTED_MEDIA_TTL', '3600'))
 
 AUTH_USER_MODEL = 'users.User'
 
+# Общий кеш: Redis, если задан REDIS_URL, иначе память процесса.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
@@ -174,3 +281,76 @@ LOGGING = {
         'level': os.getenv('DJANGO_LOG_LEVEL', 'INFO'),
     },
 }
+
+# Инструментирование запросов к БД и бюджеты эндпоинтов (api.middleware).
+# Ключ бюджета: '<basename>.<action>' для вьюсетов или имя URL.
+QUERY_INSTRUMENTATION_ENABLED = (
+    os.getenv('QUERY_INSTRUMENTATION_ENABLED', 'True') == 'True'
+)
+QUERY_BUDGET_RAISE = (
+    os.getenv('QUERY_BUDGET_RAISE', str(DEBUG)) == 'True'
+)
+QUERY_BUDGETS = {
+    'default': {'queries': 20, 'db_ms': 300, 'total_ms': 1000},
+    'recipes.list': {'queries': 13},
+    'recipes.retrieve': {'queries': 6},
+    'users.list': {'queries': 10},
+    'users.retrieve': {'queries': 4},
+    'users.subscriptions': {'queries': 4},
+    # Полный каталог с токеном: пользователь, версия каталога, список.
+    'ingredients.list': {'queries': 3},
+    'tags.list': {'queries': 2},
+    'recipes.download_shopping_cart': {'queries': 4},
+    'recipes.feed': {'queries': 8},
+    'recipes.similar': {'queries': 3},
+    'recipes.recommended': {'queries': 5},
+    # Версия журнала и, если индекс отстал, изменения и состав рецептов.
+    'recipes.cook': {'queries': 5},
+    'recipes.favorite_batch': {'queries': 5},
+    'recipes.unfavorite_batch': {'queries': 5},
+    'recipes.add_to_cart_batch': {'queries': 5},
+    'recipes.remove_from_cart_batch': {'queries': 5},
+    'recipes.clear_shopping_cart': {'queries': 4},
+}
+
+# Метрики Prometheus (/metrics). Для нескольких воркеров gunicorn укажите
+# общий каталог METRICS_MULTIPROC_DIR: каждый процесс пишет туда свой файл.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR') or None
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN') or None
+
+# Лента подписок (/api/recipes/feed/). Рецепты авторов, у которых больше
+# FEED_FANOUT_LIMIT подписчиков, не раскладываются по лентам при записи,
+# а подмешиваются при чтении.
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', '1000'))
+FEED_BACKFILL_SIZE = int(os.getenv('FEED_BACKFILL_SIZE', '100'))
+FEED_CELEBRITIES_TTL = int(os.getenv('FEED_CELEBRITIES_TTL', '300'))
+
+# Индекс подбора рецептов по ингредиентам пересобирается не реже, чем раз в
+# COOK_INDEX_TTL секунд (и сразу после чужих изменений рецептов).
+COOK_INDEX_TTL = int(os.getenv('COOK_INDEX_TTL', '600'))
+
+# Короткие ссылки /s/<код> (recipes.shortlinks): сколько секунд nginx/CDN и
+# браузер кешируют редирект и 404, как часто пересобирается карта id
+# рецептов и записываются накопленные переходы. Переходы, обслуженные
+# кешем, не считаются: чем дольше кешируется редирект, тем меньше счетчик.
+SHORT_LINK_MAX_AGE = int(os.getenv('SHORT_LINK_MAX_AGE', '60'))
+SHORT_LINK_NOT_FOUND_MAX_AGE = int(
+    os.getenv('SHORT_LINK_NOT_FOUND_MAX_AGE', '60')
+)
+SHORT_LINK_BITMAP_TTL = int(os.getenv('SHORT_LINK_BITMAP_TTL', '300'))
+SHORT_LINK_FLUSH_INTERVAL = float(
+    os.getenv('SHORT_LINK_FLUSH_INTERVAL', '10')
+)
+
+# Микрокеш nginx (proxy_cache в infra/nginx.conf): анонимные GET на этих
+# путях nginx отдает из кеша MICROCACHE_SECONDS секунд
+# (api.middleware.MicrocacheMiddleware); 0 — не кешировать.
+MICROCACHE_SECONDS = int(os.getenv('MICROCACHE_SECONDS', '5'))
+MICROCACHE_PATH_PREFIXES = (
+    '/api/recipes/',
+    '/api/tags/',
+    '/api/ingredients/',
+    '/api/users/',
+)
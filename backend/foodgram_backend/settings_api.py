@@ -0,0 +1,46 @@
+"""
+Профиль настроек для процессов, которые обслуживают только API:
+DJANGO_SETTINGS_MODULE=foodgram_backend.settings_api.
+
+API аутентифицирует запросы только токеном (TokenAuthentication), поэтому
+админка, сессии и сообщения ему не нужны: их приложения не загружаются при
+старте, а middleware не выполняются на каждом запросе. /admin/ и
+collectstatic обслуживает процесс с основными настройками.
+"""
+from foodgram_backend.settings import *  # noqa: F401,F403
+from foodgram_backend.settings import (
+    INSTALLED_APPS,
+    MIDDLEWARE,
+    REST_FRAMEWORK,
+    TEMPLATES
+)
+
+API_EXCLUDED_APPS = (
+    'foodgram_backend.apps.LazyAdminConfig',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+)
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS if app not in API_EXCLUDED_APPS
+]
+# Сессии, CSRF и сообщения не нужны ни одному пути (см. SESSION_MIDDLEWARE).
+SESSION_MIDDLEWARE = []
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware != 'api.middleware.PathScopedMiddleware'
+]
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'OPTIONS': {
+        'context_processors': [
+            processor
+            for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+            if not processor.startswith('django.contrib.messages')
+        ],
+    },
+}]
+# Browsable API рассчитан на сессию в браузере.
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+}
@@ -0,0 +1,180 @@
+"""
+Хранилище загруженных файлов с именами по хешу содержимого.
+
+Файл recipes/images/photo.png сохраняется как
+recipes/images/<2 знака хеша>/<хеш>.png: у содержимого один адрес, и
+файл по этому адресу никогда не меняется. Поэтому nginx отдает такие
+файлы с Cache-Control: immutable на год (infra/nginx.conf), а одинаковые
+загрузки хранятся одним файлом, на который ссылаются несколько строк.
+
+Число ссылок на файл — число строк моделей, чьи FileField хранят его
+имя. Файл, на который больше не ссылается ни одна строка (картинку
+заменили, рецепт удалили), удаляется после коммита (release); то, что
+не удалилось сразу, собирает команда gc_media.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import time
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import FileField
+
+
+HASH_LENGTH = 32
+HASHED_NAME_RE = re.compile(
+    rf'(^|/)([0-9a-f]{{2}})/\2[0-9a-f]{{{HASH_LENGTH - 2}}}\.[0-9a-z]+$'
+)
+
+
+class HashedFileSystemStorage(FileSystemStorage):
+    """FileSystemStorage, именующий файлы по sha256 содержимого."""
+
+    def hashed_name(self, name, content):
+        """Имя в том же каталоге (upload_to) по хешу содержимого."""
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        digest = digest.hexdigest()[:HASH_LENGTH]
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Такое же содержимое уже сохранено: тот же файл. Новое время
+            # изменения защищает его от удаления, пока строка с новой
+            # ссылкой не закоммичена (см. release).
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                pass
+            else:
+                return name
+        try:
+            return super().save(name, content, max_length=max_length)
+        except FileExistsError:
+            # Параллельное сохранение того же содержимого успело раньше.
+            return name
+
+    def get_available_name(self, name, max_length=None):
+        """
+        Имя по хешу не меняется: если файл уже есть, в нем то же
+        содержимое, и вместо имени с суффиксом — FileExistsError (save
+        вернет существующее имя).
+        """
+        if self.exists(name):
+            raise FileExistsError(name)
+        return name
+
+
+def is_hashed(name):
+    return bool(HASHED_NAME_RE.search(name))
+
+
+@lru_cache(maxsize=None)
+def _model_file_fields(model):
+    return tuple(
+        field for field in model._meta.concrete_fields
+        if isinstance(field, FileField)
+        and isinstance(field.storage, HashedFileSystemStorage)
+    )
+
+
+def file_fields():
+    """(модель, поле) для всех FileField в HashedFileSystemStorage."""
+    return [
+        (model, field)
+        for model in apps.get_models()
+        for field in _model_file_fields(model)
+    ]
+
+
+def references(name):
+    """Сколько строк ссылаются на файл."""
+    return sum(
+        model._default_manager.filter(**{field.name: name}).count()
+        for model, field in file_fields()
+    )
+
+
+def release(names):
+    """
+    После коммита удаляет файлы, на которые не осталось ссылок. Файлы,
+    сохраненные менее MEDIA_ORPHAN_GRACE секунд назад, остаются: ссылка
+    на них может быть в еще не закоммиченной транзакции.
+    """
+    names = {name for name in names if name}
+    if not names:
+        return
+
+    def delete_unreferenced():
+        now = time.time()
+        for name in names:
+            try:
+                age = now - os.path.getmtime(default_storage.path(name))
+            except FileNotFoundError:
+                continue
+            if age > settings.MEDIA_ORPHAN_GRACE and not references(name):
+                default_storage.delete(name)
+
+    transaction.on_commit(delete_unreferenced)
+
+
+def remember_replaced_files(sender, instance, update_fields=None, raw=False,
+                            **kwargs):
+    """
+    pre_save: запоминает прежние имена файлов, если файл заменен или
+    очищен; остальные сохранения обходятся без лишнего запроса.
+    """
+    if raw or instance.pk is None:
+        return
+    names = [
+        field.attname for field in _model_file_fields(sender)
+        if (update_fields is None or field.name in update_fields)
+        and (
+            not getattr(instance, field.attname)
+            or not getattr(instance, field.attname)._committed
+        )
+    ]
+    if not names:
+        return
+    previous = sender._default_manager.filter(pk=instance.pk).values(
+        *names
+    ).first()
+    if previous:
+        instance._replaced_files = previous
+
+
+def release_replaced_files(sender, instance, raw=False, **kwargs):
+    """post_save: освобождает файлы, замененные в этом сохранении."""
+    previous = instance.__dict__.pop('_replaced_files', None)
+    if raw or not previous:
+        return
+    release(
+        name for attname, name in previous.items()
+        if name != getattr(instance, attname).name
+    )
+
+
+def release_deleted_files(sender, instance, **kwargs):
+    """post_delete: освобождает файлы удаленной строки."""
+    release(
+        getattr(instance, field.attname).name
+        for field in _model_file_fields(sender)
+    )
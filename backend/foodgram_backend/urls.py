@@ -1,22 +1,28 @@
+from django.apps import apps
 from django.conf import settings
 from django.conf.urls.static import static
-from django.contrib import admin
 from django.urls import include, path
 
+from api.views import metrics_view
+
 
 urlpatterns = [
-    path(
-        'admin/',
-        admin.site.urls
-    ),
     path('', include('recipes.urls')
          ),
     path(
         'api/',
         include('api.urls')
     ),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
+if apps.is_installed('django.contrib.admin'):
+    # Имя модуля вместо include(): URLconf админки импортируется только при
+    # обращении к /admin/ или reverse().
+    urlpatterns.insert(
+        0, path('admin/', ('foodgram_backend.admin_urls', 'admin', 'admin'))
+    )
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL,
                           document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,128 @@
+"""
+Настройки gunicorn; файл подхватывается автоматически из рабочего каталога
+(gunicorn foodgram_backend.wsgi).
+
+Число воркеров и потоков считается от доступных процессу CPU и
+переопределяется переменными GUNICORN_*. Значения по умолчанию выбраны
+прогоном python -m benchmarks.gunicorn_sweep (см. README).
+"""
+import glob
+import os
+import sys
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _cpu_count():
+    """CPU, доступные процессу (учитывает taskset/cpuset контейнера)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+cpus = _env_int('GUNICORN_CPUS', _cpu_count())
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# gthread: потоки воркера ждут БД параллельно, память одного процесса
+# делится между ними; gevent/eventlet — для долгих соединений (нужен пул
+# соединений с БД, см. DB_POOL); sync — один запрос на процесс.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+if worker_class == 'gthread':
+    workers = _env_int('GUNICORN_WORKERS', cpus * 2)
+    threads = _env_int('GUNICORN_THREADS', 4)
+elif worker_class in ('gevent', 'eventlet'):
+    workers = _env_int('GUNICORN_WORKERS', cpus + 1)
+    worker_connections = _env_int('GUNICORN_WORKER_CONNECTIONS', 100)
+else:
+    workers = _env_int('GUNICORN_WORKERS', cpus * 2 + 1)
+
+# Приложение импортируется в мастере до fork: воркеры делят память
+# модулей (copy-on-write) и стартуют быстрее.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+# Перезапуск воркера после max_requests (± jitter, чтобы не все разом)
+# ограничивает рост памяти; файл метрик перезапущенного воркера вливается
+# в архив (child_exit).
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 200)
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+# Соединения от nginx переиспользуются.
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+# Файл heartbeat в памяти: запись на диск контейнера может блокироваться.
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.getenv('GUNICORN_ACCESSLOG') or None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+
+
+def on_starting(server):
+    """Удаляет файлы метрик воркеров прошлого запуска."""
+    directory = os.getenv('METRICS_MULTIPROC_DIR')
+    if directory:
+        for path in glob.glob(os.path.join(directory, 'metrics_*.json*')):
+            os.remove(path)
+
+
+def when_ready(server):
+    """
+    С preload_app импортирует URLconf (вьюхи, сериализаторы, djoser) и
+    строит индекс подбора рецептов в мастере: воркеры получают их через
+    fork и не тратят время на первом запросе.
+    """
+    if preload_app:
+        from django.urls import get_resolver
+
+        get_resolver().url_patterns
+
+        from api.cook_index import cook_index
+
+        cook_index.warm_up()
+
+
+def pre_fork(server, worker):
+    """Соединения с БД мастера (preload) не должны достаться воркерам."""
+    if 'django.db' in sys.modules:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def post_fork(server, worker):
+    """Сразу создает файл метрик воркера: он виден в /metrics до запросов."""
+    from api import metrics
+
+    metrics.registry.flush()
+
+
+def post_worker_init(worker):
+    """Без preload_app строит индекс подбора рецептов до первого запроса."""
+    if not preload_app:
+        from api.cook_index import cook_index
+
+        cook_index.warm_up()
+
+
+def worker_exit(server, worker):
+    """Сохраняет метрики и переходы по ссылкам завершающегося воркера."""
+    from api import metrics
+    from recipes import shortlinks
+
+    metrics.registry.flush()
+    shortlinks.clicks.flush()
+
+
+def child_exit(server, worker):
+    """
+    В мастере после завершения воркера (в том числе по max_requests или
+    таймауту): вливает его файл метрик в общий архив и удаляет файл.
+    """
+    from api import metrics
+
+    metrics.archive(os.getenv('METRICS_MULTIPROC_DIR'), worker.pid)
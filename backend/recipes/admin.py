@@ -15,6 +15,7 @@ from recipes.models import (
     IngredientInRecipe,
     Recipe,
     ShoppingCart,
+    ShortLinkStats,
     Tag
 )
 
@@ -23,8 +24,9 @@ from recipes.models import (
 class IngredientAdmin(admin.ModelAdmin):
     """Отображение ингредиентов и поиск по названию в админ-панели."""
 
-    list_display = ('id', 'name', 'measurement_unit')
+    list_display = ('id', 'name', 'measurement_unit', 'is_active')
     list_display_links = ('id', 'name')
+    list_filter = ('is_active',)
     search_fields = ('name',)
     ordering = ('name',)
 
@@ -129,3 +131,17 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe')
     list_display_links = ('recipe',)
     search_fields = ('user__username', 'recipe__name')
+
+
+@admin.register(ShortLinkStats)
+class ShortLinkStatsAdmin(admin.ModelAdmin):
+    """Переходы по коротким ссылкам рецептов (только просмотр)."""
+
+    list_display = ('recipe', 'clicks')
+    list_select_related = ('recipe',)
+    search_fields = ('recipe__name',)
+    ordering = ('-clicks',)
+    readonly_fields = ('recipe', 'clicks')
+
+    def has_add_permission(self, request):
+        return False
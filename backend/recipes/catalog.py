@@ -0,0 +1,172 @@
+"""
+Синхронизация каталога ингредиентов с файлом-источником.
+
+Состояние таблицы держится в памяти только в виде 64-битных хешей
+(название, единица) и названия, поэтому сравнение каталога из миллионов
+строк не требует загрузки самих строк. Файл читается дважды: сначала
+отмечаются строки без изменений, затем для остальных решается, что это —
+правка существующего ингредиента (то же название, другая единица) или
+новый ингредиент. Ингредиенты, которых нет в файле, скрываются
+(is_active=False), а не удаляются: на них ссылаются рецепты.
+"""
+from collections import defaultdict
+from hashlib import blake2b
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from recipes.models import Ingredient, IngredientChange
+
+
+def row_hash(*parts):
+    """64-битный хеш строки каталога."""
+    digest = blake2b(
+        '\x1f'.join(parts).encode('utf-8'), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def log_inserted_after(last_id):
+    """
+    Одним INSERT ... SELECT пишет в журнал ингредиенты с id > last_id,
+    добавленные массовой вставкой в обход сигналов.
+    """
+    quote = connection.ops.quote_name
+    change = IngredientChange._meta
+    ingredient = Ingredient._meta
+    columns = ', '.join(quote(change.get_field(name).column) for name in (
+        'ingredient', 'operation', 'name', 'measurement_unit', 'created_at'
+    ))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(change.db_table)} ({columns}) '
+            f'SELECT {quote("id")}, %s, {quote("name")}, '
+            f'{quote("measurement_unit")}, %s '
+            f'FROM {quote(ingredient.db_table)} WHERE {quote("id")} > %s '
+            f'ORDER BY {quote("id")}',
+            [IngredientChange.Operation.INSERT, timezone.now(), last_id],
+        )
+
+
+class IngredientCatalogSync:
+    """Применяет к таблице Ingredient разницу с файлом каталога."""
+
+    def __init__(self, chunk_size=10000):
+        self.chunk_size = chunk_size
+        self.stats = {
+            'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0,
+        }
+
+    @transaction.atomic
+    def run(self, read_rows):
+        """
+        read_rows() должна каждый раз заново возвращать итератор пар
+        (название, единица). Возвращает версию каталога после синхронизации.
+        """
+        by_row = {}
+        by_name = defaultdict(list)
+        for pk, name, unit, is_active in (
+            Ingredient.objects.order_by('id')
+            .values_list('id', 'name', 'measurement_unit', 'is_active')
+            .iterator(chunk_size=self.chunk_size)
+        ):
+            by_row[row_hash(name, unit)] = (pk, is_active)
+            by_name[row_hash(name)].append(pk)
+
+        matched = set()
+        restored = []
+        for name, unit in read_rows():
+            found = by_row.get(row_hash(name, unit))
+            if not found or found[0] in matched:
+                continue
+            pk, is_active = found
+            matched.add(pk)
+            if is_active:
+                self.stats['unchanged'] += 1
+            else:
+                restored.append(Ingredient(
+                    pk=pk, name=name, measurement_unit=unit, is_active=True
+                ))
+                self._flush_updates(restored)
+
+        seen = set()
+        updated, inserted = [], []
+        for name, unit in read_rows():
+            key = row_hash(name, unit)
+            if key in by_row or key in seen:
+                continue
+            seen.add(key)
+            candidates = by_name.get(row_hash(name), [])
+            while candidates and candidates[-1] in matched:
+                candidates.pop()
+            if candidates:
+                pk = candidates.pop()
+                matched.add(pk)
+                updated.append(Ingredient(
+                    pk=pk, name=name, measurement_unit=unit, is_active=True
+                ))
+                self._flush_updates(updated)
+            else:
+                inserted.append(
+                    Ingredient(name=name, measurement_unit=unit)
+                )
+                self._flush_inserts(inserted)
+        self._flush_updates(restored, force=True)
+        self._flush_updates(updated, force=True)
+        self._flush_inserts(inserted, force=True)
+
+        deleted = []
+        for pk, is_active in by_row.values():
+            if is_active and pk not in matched:
+                deleted.append(pk)
+                self._flush_deletes(deleted)
+        self._flush_deletes(deleted, force=True)
+        return IngredientChange.current_version()
+
+    def _ready(self, batch, force):
+        return batch and (force or len(batch) >= self.chunk_size)
+
+    def _log(self, ingredients, operation):
+        IngredientChange.objects.bulk_create(
+            IngredientChange.for_ingredient(ingredient, operation)
+            for ingredient in ingredients
+        )
+
+    def _flush_updates(self, batch, force=False):
+        if not self._ready(batch, force):
+            return
+        Ingredient.objects.bulk_update(
+            batch, ('name', 'measurement_unit', 'is_active')
+        )
+        self._log(batch, IngredientChange.Operation.UPDATE)
+        self.stats['updated'] += len(batch)
+        batch.clear()
+
+    def _flush_inserts(self, batch, force=False):
+        if not self._ready(batch, force):
+            return
+        Ingredient.objects.bulk_create(batch)
+        if any(ingredient.pk is None for ingredient in batch):
+            # БД без RETURNING: перечитываем id по натуральному ключу.
+            ids = {
+                (name, unit): pk
+                for name, unit, pk in Ingredient.objects.filter(
+                    name__in={ingredient.name for ingredient in batch}
+                ).values_list('name', 'measurement_unit', 'id')
+            }
+            for ingredient in batch:
+                ingredient.pk = ids[
+                    (ingredient.name, ingredient.measurement_unit)
+                ]
+        self._log(batch, IngredientChange.Operation.INSERT)
+        self.stats['inserted'] += len(batch)
+        batch.clear()
+
+    def _flush_deletes(self, batch, force=False):
+        if not self._ready(batch, force):
+            return
+        removed = list(Ingredient.objects.filter(pk__in=batch))
+        Ingredient.objects.filter(pk__in=batch).update(is_active=False)
+        self._log(removed, IngredientChange.Operation.DELETE)
+        self.stats['deleted'] += len(batch)
+        batch.clear()
@@ -1,109 +1,210 @@
 import csv
 import json
 import os
+import time
+from itertools import islice
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
 
-from recipes.models import Ingredient
+from foodgram_backend.bulk import copy_supported, insert_missing
+from recipes.catalog import IngredientCatalogSync, log_inserted_after
+from recipes.models import Ingredient, IngredientChange
+
+
+DEFAULT_FILES = ('ingredients.json', 'ingredients.csv')
+HEADER_NAMES = {'name', 'measurement_unit', 'unit', 'название'}
+READ_SIZE = 1 << 16
+
+
+def iter_csv(path):
+    """Построчно читает CSV, пропуская строку заголовка."""
+    with open(path, encoding='utf-8', newline='') as csvfile:
+        for index, row in enumerate(csv.reader(csvfile)):
+            if index == 0 and HEADER_NAMES & {
+                cell.strip().lower() for cell in row
+            }:
+                continue
+            if len(row) < 2:
+                continue
+            yield {'name': row[0], 'measurement_unit': row[1]}
+
+
+def iter_json(path):
+    """
+    Потоково читает JSON-массив объектов (или JSON Lines),
+    держа в памяти только текущий буфер.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as f:
+        buffer = ''
+        position = 0
+        eof = False
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    return
+                buffer, position = f.read(READ_SIZE), 0
+                eof = not buffer
+                continue
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    raise
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            if end == len(buffer) and not eof:
+                # Число или строка могли оборваться на границе буфера.
+                chunk = f.read(READ_SIZE)
+                if chunk:
+                    buffer, position = buffer[position:] + chunk, 0
+                    continue
+                eof = True
+            position = end
+            yield item
+
+
+READERS = {
+    '.csv': iter_csv,
+    '.json': iter_json,
+    '.jsonl': iter_json,
+    '.ndjson': iter_json,
+}
 
 
 class Command(BaseCommand):
     help = (
         'Импортирует ИСКЛЮЧИТЕЛЬНО ингредиенты из директории data/.\n'
-        'Поддерживает CSV/JSON. Использует bulk_create(ignore_conflicts).'
+        'Поддерживает CSV/JSON/JSON Lines. Файл читается потоково пачками;\n'
+        'на PostgreSQL пачка грузится через COPY во временную таблицу и\n'
+        'INSERT ... ON CONFLICT (name, measurement_unit) DO NOTHING.\n'
+        'С --sync каталог приводится к содержимому файла: добавления,\n'
+        'правки и скрытие пропавших ингредиентов пишутся в журнал версий.'
     )
 
-    def handle(self, *args, **options):
-        """Импортирует данные по карте модель→файл(ы), если файлы найдены."""
-        model_file_map = {
-            Ingredient: ['ingredients.json', 'ingredients.csv'],
-        }
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            help='Файл каталога; по умолчанию data/ingredients.{json,csv}.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=10000)
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY даже на PostgreSQL.',
+        )
+        parser.add_argument(
+            '--sync', action='store_true',
+            help=(
+                'Синхронизировать каталог с файлом: ингредиенты, которых '
+                'нет в файле, скрываются.'
+            ),
+        )
 
-        data_dir = os.path.join(settings.BASE_DIR, '..', 'data')
-        data_dir = os.path.abspath(data_dir)
+    def handle(self, *args, **options):
+        file_path = options['path'] or self._default_path()
+        if not file_path:
+            self.stdout.write(
+                self.style.WARNING('Файлы для импорта не найдены.')
+            )
+            return
+        ext = os.path.splitext(file_path)[1].lower()
+        if ext not in READERS:
+            raise CommandError(f'Неподдерживаемый формат файла: {file_path}')
 
-        created_summary = {}
+        started = time.monotonic()
+        stats = {
+            'inserted': 0, 'unchanged': 0, 'updated': 0, 'deleted': 0,
+            'skipped': 0,
+        }
         try:
-            for model, filenames in model_file_map.items():
-                file_path = None
-                for fname in filenames:
-                    candidate = os.path.join(data_dir, fname)
-                    if os.path.exists(candidate):
-                        file_path = candidate
-                        break
-                if not file_path:
-                    continue
-
-                instances = []
-                ext = os.path.splitext(file_path)[1].lower()
-                if ext not in {'.csv', '.json'}:
-                    raise CommandError(
-                        f'Неподдерживаемый формат файла: {file_path}'
-                    )
-
-                if ext == '.csv':
-                    with open(file_path, encoding='utf-8') as csvfile:
-                        reader = csv.reader(csvfile)
-                        rows = list(reader)
-                        rows_iter = []
-                        if rows:
-                            header_like = False
-                            first = [
-                                c.strip().lower() for c in (rows[0] or [])
-                            ]
-                            if first and (
-                                'name' in first
-                                or 'measurement_unit' in first
-                                or 'unit' in first
-                                or 'название' in first
-                            ):
-                                header_like = True
-                            data_rows = rows[1:] if header_like else rows
-                            for r in data_rows:
-                                if len(r) < 2:
-                                    continue
-                                rows_iter.append({
-                                    'name': r[0],
-                                    'measurement_unit': r[1],
-                                })
-                else:
-                    with open(file_path, encoding='utf-8') as f:
-                        rows_iter = json.load(f)
-
-                for row in rows_iter:
-                    # Только ингредиенты
-                    name = (row.get('name') or '').strip()
-                    unit = (
-                        row.get('measurement_unit')
-                        or row.get('unit')
-                        or ''
-                    ).strip()
-                    if not name or not unit:
-                        continue
-                    instances.append(Ingredient(
-                        name=name,
-                        measurement_unit=unit,
-                    ))
-
-                if not instances:
-                    continue
-
-                model.objects.bulk_create(instances, ignore_conflicts=True)
-                created_summary[model.__name__] = len(instances)
-
-            if created_summary:
-                parts = [
-                    f'{name}: {count}'
-                    for name, count in created_summary.items()
-                ]
-                msg = (
-                    'Импорт завершён. Создано (попыток): ' + ', '.join(parts)
-                )
-                self.stdout.write(self.style.SUCCESS(msg))
+            if options['sync']:
+                mode = 'sync'
+                version = self._sync(file_path, ext, stats, options)
             else:
-                self.stdout.write(
-                    self.style.WARNING('Файлы для импорта не найдены.')
+                use_copy = copy_supported() and not options['no_copy']
+                mode = 'COPY' if use_copy else 'INSERT'
+                version = self._import(
+                    file_path, ext, stats, options, use_copy
                 )
+        except CommandError:
+            raise
         except Exception as exc:
             raise CommandError(f'Ошибка при импорте: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершён за {time.monotonic() - started:.1f} с '
+            f'({mode}). '
+            f'Добавлено: {stats["inserted"]}, '
+            f'без изменений: {stats["unchanged"]}, '
+            f'обновлено: {stats["updated"]}, '
+            f'скрыто: {stats["deleted"]}, '
+            f'пропущено: {stats["skipped"]}. '
+            f'Версия каталога: {version}.'
+        ))
+
+    def _import(self, file_path, ext, stats, options, use_copy):
+        """Добавляет новые ингредиенты, не трогая существующие."""
+        rows = self._clean(READERS[ext](file_path), stats)
+        while True:
+            chunk = list(islice(rows, options['chunk_size']))
+            if not chunk:
+                break
+            with transaction.atomic():
+                last_id = Ingredient.objects.aggregate(
+                    top=Max('id')
+                )['top'] or 0
+                inserted = insert_missing(
+                    Ingredient, ('name', 'measurement_unit'), chunk,
+                    use_copy=use_copy,
+                )
+                if inserted:
+                    log_inserted_after(last_id)
+            stats['inserted'] += inserted
+            stats['unchanged'] += len(chunk) - inserted
+        return IngredientChange.current_version()
+
+    def _sync(self, file_path, ext, stats, options):
+        """Приводит каталог к содержимому файла."""
+        passes = []
+
+        def read_rows():
+            passes.append({'skipped': 0})
+            return self._clean(READERS[ext](file_path), passes[-1])
+
+        sync = IngredientCatalogSync(chunk_size=options['chunk_size'])
+        version = sync.run(read_rows)
+        stats.update(sync.stats, skipped=passes[0]['skipped'])
+        return version
+
+    def _default_path(self):
+        data_dir = os.path.abspath(
+            os.path.join(settings.BASE_DIR, '..', 'data')
+        )
+        for fname in DEFAULT_FILES:
+            candidate = os.path.join(data_dir, fname)
+            if os.path.exists(candidate):
+                return candidate
+        return None
+
+    def _clean(self, items, stats):
+        """Нормализует записи в пары (название, единица)."""
+        for row in items:
+            if not isinstance(row, dict):
+                stats['skipped'] += 1
+                continue
+            name = (row.get('name') or '').strip()
+            unit = (
+                row.get('measurement_unit')
+                or row.get('unit')
+                or ''
+            ).strip()
+            if not name or not unit:
+                stats['skipped'] += 1
+                continue
+            yield name, unit
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_alter_recipe_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='is_active',
+            field=models.BooleanField(db_default=True, default=True, verbose_name='В каталоге'),
+        ),
+        migrations.CreateModel(
+            name='IngredientChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(choices=[('insert', 'Добавление'), ('update', 'Изменение'), ('delete', 'Удаление')], max_length=6, verbose_name='Операция')),
+                ('name', models.CharField(max_length=128, verbose_name='Название')),
+                ('measurement_unit', models.CharField(max_length=64, verbose_name='Единица измерения')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата изменения')),
+                ('ingredient', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='changes', to='recipes.ingredient', verbose_name='Ингредиент')),
+            ],
+            options={
+                'verbose_name': 'Изменение каталога ингредиентов',
+                'verbose_name_plural': 'Изменения каталога ингредиентов',
+                'ordering': ('id',),
+            },
+        ),
+    ]
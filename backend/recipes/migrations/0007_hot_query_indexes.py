@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+from foodgram_backend.operations import (
+    AddIndexConcurrently,
+    AddRawIndexConcurrently
+)
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY на PostgreSQL не работает в транзакции.
+    atomic = False
+
+    dependencies = [
+        ('recipes', '0006_recipesimilarity'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-created_at'], name='recipe_author_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='ingredientinrecipe',
+            index=models.Index(fields=['recipe', 'ingredient'], include=('amount',), name='ingredient_in_recipe_cover_idx'),
+        ),
+        # Фильтр ?tags=: от тега к рецептам только по индексу.
+        AddRawIndexConcurrently(
+            name='recipe_tags_tag_recipe_idx',
+            table='recipes_recipe_tags',
+            columns='"tag_id", "recipe_id"',
+        ),
+        # Поиск ?name= — UPPER(name) LIKE 'ПРЕФИКС%'; без text_pattern_ops
+        # индекс не подходит для LIKE при локали, отличной от C.
+        AddRawIndexConcurrently(
+            name='ingredient_upper_name_like_idx',
+            table='recipes_ingredient',
+            columns='UPPER("name") text_pattern_ops',
+            condition='"is_active"',
+            vendors=('postgresql',),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShortLinkStats',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='short_link_stats', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('clicks', models.PositiveBigIntegerField(default=0, verbose_name='Переходы')),
+            ],
+            options={
+                'verbose_name': 'Статистика короткой ссылки',
+                'verbose_name_plural': 'Статистика коротких ссылок',
+            },
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.core.validators import MinValueValidator
 
 from foodgram_backend.constants import (
     INGREDIENT_NAME_MAX_LENGTH,
+    INGREDIENT_OPERATION_MAX_LENGTH,
     MEASUREMENT_UNIT_MAX_LENGTH,
     MIN_COOKING_TIME_MINUTES,
     MIN_INGREDIENT_AMOUNT,
@@ -25,6 +26,11 @@ class Ingredient(models.Model):
         max_length=MEASUREMENT_UNIT_MAX_LENGTH,
         verbose_name='Единица измерения'
     )
+    is_active = models.BooleanField(
+        default=True,
+        db_default=True,
+        verbose_name='В каталоге'
+    )
 
     class Meta:
         verbose_name = 'Ингредиент'
@@ -42,6 +48,67 @@ class Ingredient(models.Model):
         return self.name[:STR_REPRESENTATION_MAX_LENGTH]
 
 
+class IngredientChange(models.Model):
+    """Запись журнала изменений каталога ингредиентов; id — версия."""
+
+    class Operation(models.TextChoices):
+        INSERT = 'insert', 'Добавление'
+        UPDATE = 'update', 'Изменение'
+        DELETE = 'delete', 'Удаление'
+
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='changes',
+        verbose_name='Ингредиент'
+    )
+    operation = models.CharField(
+        max_length=INGREDIENT_OPERATION_MAX_LENGTH,
+        choices=Operation.choices,
+        verbose_name='Операция'
+    )
+    name = models.CharField(
+        max_length=INGREDIENT_NAME_MAX_LENGTH,
+        verbose_name='Название'
+    )
+    measurement_unit = models.CharField(
+        max_length=MEASUREMENT_UNIT_MAX_LENGTH,
+        verbose_name='Единица измерения'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата изменения'
+    )
+
+    class Meta:
+        verbose_name = 'Изменение каталога ингредиентов'
+        verbose_name_plural = 'Изменения каталога ингредиентов'
+        ordering = ('id',)
+
+    def __str__(self):
+        """Возвращает версию и тип изменения."""
+        return f'{self.id}: {self.operation}'
+
+    @classmethod
+    def current_version(cls):
+        """Номер последнего изменения каталога (0, если их не было)."""
+        # MAX(id) читает один край индекса на любой СУБД.
+        return cls.objects.aggregate(
+            version=models.Max('id')
+        )['version'] or 0
+
+    @classmethod
+    def for_ingredient(cls, ingredient, operation):
+        """Запись журнала со снимком текущих полей ингредиента."""
+        return cls(
+            ingredient_id=ingredient.id,
+            operation=operation,
+            name=ingredient.name,
+            measurement_unit=ingredient.measurement_unit,
+        )
+
+
 class Tag(models.Model):
     """Модель тега рецепта."""
 
@@ -111,6 +178,14 @@ class Recipe(models.Model):
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-created_at',)
+        indexes = (
+            # Рецепты автора (фильтр author, профиль, подписки) сразу в
+            # порядке ленты, без сортировки.
+            models.Index(
+                fields=('author', '-created_at'),
+                name='recipe_author_created_idx'
+            ),
+        )
 
     def __str__(self):
         """Возвращает отображаемое название рецепта."""
@@ -146,6 +221,14 @@ class IngredientInRecipe(models.Model):
                 name='unique_ingredient_per_recipe'
             ),
         )
+        indexes = (
+            # Список покупок читает состав рецептов только из индекса.
+            models.Index(
+                fields=('recipe', 'ingredient'),
+                include=('amount',),
+                name='ingredient_in_recipe_cover_idx'
+            ),
+        )
 
     def __str__(self):
         """Возвращает отображаемое имя ингредиента в рецепте."""
@@ -156,6 +239,37 @@ class IngredientInRecipe(models.Model):
         return text[:STR_REPRESENTATION_MAX_LENGTH]
 
 
+class RecipeChange(models.Model):
+    """
+    Запись журнала изменений состава рецептов; id — версия индекса
+    подбора по продуктам (api.cook_index).
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='changes',
+        verbose_name='Рецепт'
+    )
+
+    class Meta:
+        verbose_name = 'Изменение состава рецепта'
+        verbose_name_plural = 'Изменения состава рецептов'
+        ordering = ('id',)
+
+    def __str__(self):
+        """Возвращает версию и id рецепта."""
+        return f'{self.id}: {self.recipe_id}'
+
+    @classmethod
+    def current_version(cls):
+        """Номер последнего изменения (0, если их не было)."""
+        return cls.objects.aggregate(
+            version=models.Max('id')
+        )['version'] or 0
+
+
 class UserRecipeRelation(models.Model):
     """Абстрактная связь пользователя и рецепта (избранное/покупки)."""
 
@@ -199,3 +313,122 @@ class ShoppingCart(UserRecipeRelation):
     class Meta(UserRecipeRelation.Meta):
         verbose_name = 'Позиция в списке покупок'
         verbose_name_plural = 'Список покупок'
+
+
+class FeedEntry(models.Model):
+    """
+    Рецепт во входящей ленте подписчика (fan-out при записи).
+
+    author и created_at дублируют поля рецепта: по ним лента удаляется при
+    отписке и читается по индексу без соединения с рецептами.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-created_at', '-recipe'),
+                name='feed_entry_user_keyset_idx'
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='feed_entry_user_author_idx'
+            ),
+        )
+
+    def __str__(self):
+        """Возвращает подписчика и рецепт записи."""
+        return f'{self.user_id}: {self.recipe_id}'
+
+
+class RecipeSimilarity(models.Model):
+    """Похожий рецепт из top-K списка соседей (строится офлайн)."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_entries',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Близость'
+    )
+    rank = models.PositiveSmallIntegerField(
+        verbose_name='Позиция'
+    )
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'rank'),
+                name='unique_recipe_similarity_rank'
+            ),
+        )
+
+    def __str__(self):
+        """Возвращает пару рецептов."""
+        return f'{self.recipe_id} → {self.similar_id}'
+
+
+class ShortLinkStats(models.Model):
+    """
+    Переходы по короткой ссылке рецепта. Счетчик пополняется пачками
+    (recipes.shortlinks.ClickCounter), а не строкой на каждый переход.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='short_link_stats',
+        verbose_name='Рецепт'
+    )
+    clicks = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Переходы'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика короткой ссылки'
+        verbose_name_plural = 'Статистика коротких ссылок'
+
+    def __str__(self):
+        """Возвращает рецепт и число переходов."""
+        return f'{self.recipe_id}: {self.clicks}'
@@ -0,0 +1,241 @@
+"""
+Короткие ссылки на рецепты: /s/<код>, где код — id рецепта в base62.
+
+Существование рецепта проверяется по битовой карте id в памяти процесса
+(бит на id: миллион рецептов — 125 КБ), без запроса к БД. Карта строится
+при первом обращении и пересобирается в фоне раз в SHORT_LINK_BITMAP_TTL
+секунд; создание и удаление рецептов в этом процессе применяются к ней
+сразу (recipes.signals). id больше максимального на момент построения
+(рецепт создан другим процессом) проверяется запросом к БД.
+
+Переходы копятся в памяти процесса и записываются в ShortLinkStats одной
+пачкой не чаще раза в SHORT_LINK_FLUSH_INTERVAL секунд, в фоновом потоке.
+"""
+import atexit
+import logging
+import os
+import string
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Max
+
+from recipes.models import Recipe, ShortLinkStats
+
+
+logger = logging.getLogger(__name__)
+
+ALPHABET = string.digits + string.ascii_letters
+BASE = len(ALPHABET)
+# 62 ** 11 > 2 ** 63: длиннее не бывает id BigAutoField.
+MAX_CODE_LENGTH = 11
+_DIGITS = {char: value for value, char in enumerate(ALPHABET)}
+
+
+def encode(number):
+    """Код base62 для неотрицательного id."""
+    if number < 0:
+        raise ValueError('id не может быть отрицательным.')
+    chars = []
+    while True:
+        number, rest = divmod(number, BASE)
+        chars.append(ALPHABET[rest])
+        if not number:
+            return ''.join(reversed(chars))
+
+
+def decode(code):
+    """
+    id по коду или None. Коды с ведущими нулями не принимаются: у рецепта
+    один адрес, и кеш nginx не хранит копии под разными ключами.
+    """
+    if not code or len(code) > MAX_CODE_LENGTH:
+        return None
+    if len(code) > 1 and code[0] == ALPHABET[0]:
+        return None
+    number = 0
+    for char in code:
+        digit = _DIGITS.get(char)
+        if digit is None:
+            return None
+        number = number * BASE + digit
+    return number
+
+
+class RecipeIdBitmap:
+    """Множество id существующих рецептов: бит на id."""
+
+    def __init__(self):
+        self._bits = None
+        self._max_id = 0
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        # Изменения, пришедшие во время пересборки: применяются к новой
+        # карте, иначе рецепт, созданный в это время, потеряется.
+        self._changes = []
+
+    def build(self):
+        """Синхронно строит карту из БД."""
+        max_id = Recipe.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        bits = bytearray(max_id // 8 + 1)
+        ids = Recipe.objects.filter(id__lte=max_id).values_list(
+            'id', flat=True
+        )
+        for recipe_id in ids.iterator(chunk_size=100000):
+            bits[recipe_id >> 3] |= 1 << (recipe_id & 7)
+        with self._lock:
+            for recipe_id, present in self._changes:
+                self._set(bits, recipe_id, present)
+            self._changes = []
+            self._bits = bits
+            self._max_id = max_id
+            self._built_at = time.monotonic()
+        return bits
+
+    def __contains__(self, recipe_id):
+        bits = self._current()
+        if recipe_id < len(bits) * 8 and bits[recipe_id >> 3] & (
+            1 << (recipe_id & 7)
+        ):
+            return True
+        if recipe_id <= self._max_id:
+            return False
+        exists = Recipe.objects.filter(id=recipe_id).exists()
+        if exists:
+            self.add(recipe_id)
+        return exists
+
+    def add(self, recipe_id):
+        self._change(recipe_id, True)
+
+    def discard(self, recipe_id):
+        self._change(recipe_id, False)
+
+    def _change(self, recipe_id, present):
+        with self._lock:
+            if self._rebuilding:
+                self._changes.append((recipe_id, present))
+            if self._bits is not None:
+                self._bits = self._set(self._bits, recipe_id, present)
+
+    @staticmethod
+    def _set(bits, recipe_id, present):
+        if recipe_id >= len(bits) * 8:
+            if not present:
+                return bits
+            # Запас, чтобы не расширять карту на каждом новом рецепте.
+            bits = bits + bytearray(recipe_id // 8 + 1 - len(bits) + 1024)
+        if present:
+            bits[recipe_id >> 3] |= 1 << (recipe_id & 7)
+        else:
+            bits[recipe_id >> 3] &= ~(1 << (recipe_id & 7)) & 0xFF
+        return bits
+
+    def _current(self):
+        bits = self._bits
+        if bits is None:
+            return self.build()
+        if time.monotonic() - self._built_at > settings.SHORT_LINK_BITMAP_TTL:
+            self._rebuild_in_background()
+        return bits
+
+    def _rebuild_in_background(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def rebuild():
+            try:
+                self.build()
+            except Exception:
+                logger.exception('Не удалось пересобрать карту рецептов')
+            finally:
+                self._rebuilding = False
+                connections.close_all()
+
+        threading.Thread(target=rebuild, daemon=True).start()
+
+
+class ClickCounter:
+    """Счетчик переходов процесса с пакетной записью в ShortLinkStats."""
+
+    def __init__(self):
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        """После fork у воркера свои несохраненные переходы."""
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._last_flush = time.monotonic()
+        self._flushing = False
+
+    def hit(self, recipe_id):
+        with self._lock:
+            self._pending[recipe_id] += 1
+            due = not self._flushing and (
+                time.monotonic() - self._last_flush
+                >= settings.SHORT_LINK_FLUSH_INTERVAL
+            )
+            if due:
+                self._flushing = True
+        if due:
+            threading.Thread(
+                target=self._flush_in_background, daemon=True
+            ).start()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Не удалось записать переходы по ссылкам')
+        finally:
+            self._flushing = False
+            connections.close_all()
+
+    def flush(self):
+        """Записывает накопленные переходы; возвращает их число."""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        quote = connection.ops.quote_name
+        table = quote(ShortLinkStats._meta.db_table)
+        # Удаленные после перехода рецепты пропускаются через SELECT.
+        sql = (
+            f'INSERT INTO {table} ({quote("recipe_id")}, {quote("clicks")}) '
+            f'SELECT {quote("id")}, %s FROM {quote(Recipe._meta.db_table)} '
+            f'WHERE {quote("id")} = %s '
+            f'ON CONFLICT ({quote("recipe_id")}) DO UPDATE SET '
+            f'{quote("clicks")} = {table}.{quote("clicks")} '
+            f'+ EXCLUDED.{quote("clicks")}'
+        )
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, [
+                    (count, recipe_id)
+                    for recipe_id, count in sorted(pending.items())
+                ])
+        except Exception:
+            with self._lock:
+                self._pending.update(pending)
+            raise
+        return sum(pending.values())
+
+
+def _flush_at_exit():
+    try:
+        clicks.flush()
+    except Exception:
+        logger.exception('Не удалось записать переходы по ссылкам')
+
+
+recipe_ids = RecipeIdBitmap()
+clicks = ClickCounter()
+atexit.register(_flush_at_exit)
@@ -0,0 +1,50 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from foodgram_backend import storage
+from recipes import shortlinks
+from recipes.models import Ingredient, IngredientChange, Recipe
+
+
+@receiver(post_save, sender=Ingredient)
+def log_ingredient_save(sender, instance, created, raw=False, **kwargs):
+    """Пишет в журнал каталога правки ингредиента по одному (админка)."""
+    if raw:
+        return
+    if not instance.is_active:
+        operation = IngredientChange.Operation.DELETE
+    elif created:
+        operation = IngredientChange.Operation.INSERT
+    else:
+        operation = IngredientChange.Operation.UPDATE
+    IngredientChange.for_ingredient(instance, operation).save()
+
+
+@receiver(post_delete, sender=Ingredient)
+def log_ingredient_delete(sender, instance, **kwargs):
+    """Фиксирует физическое удаление ингредиента."""
+    IngredientChange.for_ingredient(
+        instance, IngredientChange.Operation.DELETE
+    ).save()
+
+
+@receiver(post_save, sender=Recipe)
+def add_short_link_target(sender, instance, created, raw=False, **kwargs):
+    """Новый рецепт сразу доступен по короткой ссылке."""
+    if created and not raw:
+        recipe_id = instance.id
+        transaction.on_commit(lambda: shortlinks.recipe_ids.add(recipe_id))
+
+
+@receiver(post_delete, sender=Recipe)
+def drop_short_link_target(sender, instance, **kwargs):
+    """Короткая ссылка удаленного рецепта отвечает 404."""
+    recipe_id = instance.id
+    transaction.on_commit(lambda: shortlinks.recipe_ids.discard(recipe_id))
+
+
+# Картинка рецепта: файл удаляется, когда на него не остается ссылок.
+pre_save.connect(storage.remember_replaced_files, sender=Recipe)
+post_save.connect(storage.release_replaced_files, sender=Recipe)
+post_delete.connect(storage.release_deleted_files, sender=Recipe)
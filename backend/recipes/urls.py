@@ -1,10 +1,21 @@
-from django.urls import path
+from django.urls import path, re_path
 
-from recipes.views import recipe_short_link
+from recipes.shortlinks import MAX_CODE_LENGTH
+from recipes.views import recipe_short_link, recipe_short_link_legacy
 
 
 app_name = 'recipes'
 
 urlpatterns = [
-    path('s/<int:short_id>/', recipe_short_link, name='recipe-short-link'),
+    # Прежний формат с id рецепта отличается от кода завершающим слешем.
+    path(
+        's/<int:short_id>/',
+        recipe_short_link_legacy,
+        name='recipe-short-link-legacy'
+    ),
+    re_path(
+        rf'^s/(?P<code>[0-9A-Za-z]{{1,{MAX_CODE_LENGTH}}})$',
+        recipe_short_link,
+        name='recipe-short-link'
+    ),
 ]
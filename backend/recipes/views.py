@@ -1,7 +1,46 @@
-from django.http import HttpRequest, HttpResponseRedirect
-from django.shortcuts import redirect
+from django.conf import settings
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseNotFound,
+    HttpResponseRedirect
+)
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
 
+from recipes import shortlinks
 
-def recipe_short_link(_: HttpRequest, short_id: int) -> HttpResponseRedirect:
-    """Перенаправляет короткий URL рецепта на полный URL страницы рецепта."""
-    return redirect(f'/recipes/{short_id}', permanent=False)
+
+def _redirect_to_recipe(recipe_id: int | None) -> HttpResponse:
+    """
+    Редирект на страницу рецепта. Переход считается, только если дошел до
+    бэкенда, поэтому редирект временный (302, браузер не запоминает его
+    навсегда) и кешируется nginx/CDN ненадолго (SHORT_LINK_MAX_AGE);
+    отсутствующий рецепт — короткий 404.
+    """
+    if recipe_id is None or recipe_id not in shortlinks.recipe_ids:
+        response = HttpResponseNotFound()
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.SHORT_LINK_NOT_FOUND_MAX_AGE
+        )
+        return response
+    shortlinks.clicks.hit(recipe_id)
+    response = HttpResponseRedirect(f'/recipes/{recipe_id}')
+    patch_cache_control(
+        response, public=True, max_age=settings.SHORT_LINK_MAX_AGE
+    )
+    return response
+
+
+@require_safe
+def recipe_short_link(_: HttpRequest, code: str) -> HttpResponse:
+    """Перенаправляет короткий URL /s/<код> на страницу рецепта."""
+    return _redirect_to_recipe(shortlinks.decode(code))
+
+
+@require_safe
+def recipe_short_link_legacy(_: HttpRequest, short_id: int) -> HttpResponse:
+    """Ссылки прежнего формата /s/<id>/, выданные до base62-кодов."""
+    return _redirect_to_recipe(short_id)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 09:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_subscription_author_alter_subscription_user'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='avatar',
+            field=models.ImageField(blank=True, upload_to='users/avatars/', verbose_name='аватар пользователя'),
+        ),
+    ]
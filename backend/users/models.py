@@ -41,6 +41,7 @@ class User(AbstractUser):
         unique=True
     )
     avatar = models.ImageField(
+        upload_to='users/avatars/',
         verbose_name='аватар пользователя',
         blank=True
     )
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from foodgram_backend import storage
+from users.models import User
+
+
+# Аватар: файл удаляется, когда на него не остается ссылок.
+pre_save.connect(storage.remember_replaced_files, sender=User)
+post_save.connect(storage.release_replaced_files, sender=User)
+post_delete.connect(storage.release_deleted_files, sender=User)
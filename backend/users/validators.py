@@ -1,6 +1,6 @@
 import re
 
-from rest_framework import serializers
+from django.core.exceptions import ValidationError
 
 USERNAME_REGEX = r'^[\w.@+-]+\Z'
 
@@ -8,7 +8,7 @@ USERNAME_REGEX = r'^[\w.@+-]+\Z'
 def validate_username_value(value: str) -> str:
     """Валидирует username по regex."""
     if not re.fullmatch(USERNAME_REGEX, value):
-        raise serializers.ValidationError(
+        raise ValidationError(
             'Имя пользователя содержит запрещённые символы.'
         )
     return value